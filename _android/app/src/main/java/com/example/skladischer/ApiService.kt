@@ -7,6 +7,7 @@ import com.example.skladischer.data.RegistrationRequest
 import com.example.skladischer.data.Storage
 import com.example.skladischer.data.StorageRequest
 import com.example.skladischer.data.User
+import okhttp3.ResponseBody
 import retrofit2.Call
 import retrofit2.http.Body
 import retrofit2.http.DELETE
@@ -75,6 +76,14 @@ interface ApiService {
         @Body newItem: ItemRequest
     ): Call<Void>
 
+    @GET("users/{username}/{storage_name}/{item_id}/image")
+    fun getItemImage(
+        @Header("Authorization") token: String,
+        @Path("username") username: String,
+        @Path("storage_name") storageName: String,
+        @Path("item_id") itemId: String
+    ): Call<ResponseBody>
+
     @DELETE("users/{username}/{storage_name}/{item_id}")
     fun deleteItem(
         @Header("Authorization") token: String,
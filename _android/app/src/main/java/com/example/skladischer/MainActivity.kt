@@ -2,7 +2,6 @@ package com.example.skladischer
 
 import ItemsAdapter
 import StorageAdapter
-import android.graphics.BitmapFactory
 import android.os.Bundle
 import android.util.Log
 import android.view.View
@@ -29,10 +28,7 @@ import com.example.skladischer.ui.theme.SkladischerTheme
 import com.google.gson.Gson
 import java.io.BufferedReader
 import java.io.InputStreamReader
-import kotlin.io.encoding.Base64
-import kotlin.io.encoding.ExperimentalEncodingApi
 
-@OptIn(ExperimentalEncodingApi::class)
 class MainActivity : ComponentActivity() {
 
     private val userViewModel: UserViewModel by viewModels()
@@ -87,11 +83,11 @@ class MainActivity : ComponentActivity() {
             detailItemDate.text = "Date Added: ${selectedItem.date_added}"
             detailItemDescription.text = selectedItem.description ?: "No description"
 
-            // Generate QR code from base64 string
-            val decodedBytes = Base64.decode(selectedItem.image_base64)
-            val bitmap = BitmapFactory.decodeByteArray(decodedBytes, 0, decodedBytes.size)
-
-            qrCodeImageView.setImageBitmap(bitmap)
+            // Load the item code image, it is no longer sent with the item.
+            qrCodeImageView.setImageDrawable(null)
+            userViewModel.fetchItemImage(selectedItem.code_id, this) { bitmap ->
+                qrCodeImageView.setImageBitmap(bitmap)
+            }
 
             itemsRecView.visibility = View.GONE
             detailItemFrame.visibility = View.VISIBLE
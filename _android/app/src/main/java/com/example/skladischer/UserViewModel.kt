@@ -1,6 +1,8 @@
 package com.example.skladischer
 
 import android.content.Context
+import android.graphics.Bitmap
+import android.graphics.BitmapFactory
 import android.widget.Toast
 import androidx.lifecycle.LiveData
 import androidx.lifecycle.MutableLiveData
@@ -10,6 +12,7 @@ import com.example.skladischer.data.Storage
 import com.example.skladischer.data.Item
 import com.example.skladischer.data.ItemRequest
 import com.example.skladischer.data.StorageRequest
+import okhttp3.ResponseBody
 import retrofit2.Call
 import retrofit2.Callback
 import retrofit2.Response
@@ -147,6 +150,25 @@ class UserViewModel : ViewModel() {
         })
     }
 
+    fun fetchItemImage(itemId: String, context: Context, onLoaded: (Bitmap) -> Unit) {
+        val storageName = _selectedStorage.value!!.name
+        RetrofitClient.apiService.getItemImage(token, username, storageName, itemId).enqueue(object : Callback<ResponseBody> {
+            override fun onResponse(call: Call<ResponseBody>, response: Response<ResponseBody>) {
+                val body = response.body()
+                if (response.isSuccessful && body != null) {
+                    val bytes = body.bytes()
+                    onLoaded(BitmapFactory.decodeByteArray(bytes, 0, bytes.size))
+                } else {
+                    Toast.makeText(context, "Failed to fetch item code: ${response.code()}", Toast.LENGTH_SHORT).show()
+                }
+            }
+
+            override fun onFailure(call: Call<ResponseBody>, t: Throwable) {
+                Toast.makeText(context, "Error: ${t.message}", Toast.LENGTH_SHORT).show()
+            }
+        })
+    }
+
     fun deleteItem(itemId: String, context: Context) {
         val storageName = _selectedStorage.value!!.name
         RetrofitClient.apiService.deleteItem(token, username, storageName, itemId).enqueue(object : Callback<Void> {
@@ -13,7 +13,6 @@ data class Storage(
 
 data class Item(
     val code_id: String,
-    val image_base64: String,
     val name: String,
     val amount: Int,
     val description: String?,
@@ -2,19 +2,23 @@
 # Date created: 5.12.2024
 
 # REST FastAPI dependencies.
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from typing import List
 from fastapi.responses import PlainTextResponse, JSONResponse
 
 # OAuth2 authentication dependencies.
 from fastapi.security import (
     OAuth2PasswordBearer,
     OAuth2PasswordRequestForm)
-from skladischer_auth.token_utils import validate_token_with_username
+from skladischer_auth.token_utils import validate_token_with_username, decode_token
 
 # Internal dependencies.
 from ..services import credentials_utils as utils
 from ..helpers.error import ErrorResponse as Err
+from ..helpers.rate_limit_helpers import check_login_rate, check_import_rate, login_address
+from ..config import ADMIN_USERNAMES
 from ..models.token import Token
+from ..models.credentials import CredentialsCreate, CredentialsImportResult
 
 # Logging default library.
 from ..logger_setup import get_logger
@@ -52,22 +56,63 @@ async def create_credentials(credentials: OAuth2PasswordRequestForm = Depends())
 
     return result
 
+@router.post("/import-credentials", status_code=200, response_model=CredentialsImportResult)
+async def import_credentials(users: List[CredentialsCreate], token: str = Depends(auth_schema)):
+    """
+    This endpoint allows administrators to create many user credentials at once.
+    Administrators are listed in ``ADMIN_USERNAMES`` and their imports are rate limited.
+
+    Args:
+        users (List[CredentialsCreate]): The usernames and passwords of the users to create.
+        token (OAuth2PasswordRequestForm): The administrators credentials.
+
+    Raises:
+        HTTPException: If the token is not of an administrator, there are too many imports
+                       or an error occurs during the import.
+
+    Returns:
+        CredentialsImportResult: The created usernames and the errors of the users that failed.
+    """
+
+    logger.debug(f"Request to import {len(users)} credentials.")
+    claims = decode_token(token)
+    if claims is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token.")
+    if claims["username"] not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=403, detail="Only administrators can import credentials.")
+
+    limited = await check_import_rate(claims["username"])
+    if isinstance(limited, Err):
+        raise HTTPException(status_code=limited.code, detail=limited.message)
+
+    result = await utils.import_credentials(users)
+    if isinstance(result, Err):
+        raise HTTPException(status_code=result.code, detail=result.message)
+
+    return result
+
 @router.post("/login", response_model=Token)
-async def validate_credentials(credentials: OAuth2PasswordRequestForm = Depends()):
+async def validate_credentials(request: Request, credentials: OAuth2PasswordRequestForm = Depends()):
     """
     This endpoint validates the details of a user based on their username and password.
+    Logins are rate limited per username and per client address before the password is checked.
 
     Args:
+        request (Request): The request, used for the address of the client forwarded by the ingress.
         credentials (OAuth2PasswordRequestForm): The users credentials.
 
     Raises:
-        HTTPException: If an error occurs during user validation.
+        HTTPException: If an error occurs during user validation or there are too many login attempts.
 
     Returns:
         Token: The retrieved username.
     """
 
     logger.debug(f"Request to create login endpoint.")
+    limited = await check_login_rate(credentials.username, login_address(request.client.host if request.client else None))
+    if isinstance(limited, Err):
+        raise HTTPException(status_code=limited.code, detail=limited.message)
+
     result = await utils.validate_credentials(credentials)
     if isinstance(result, Err):
         raise HTTPException(status_code=result.code, detail=result.message)
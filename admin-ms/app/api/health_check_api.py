@@ -2,29 +2,62 @@
 # Date created: 5.12.2024
 
 # REST FastAPI dependencies.
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import PlainTextResponse
 
+from motor.motor_asyncio import AsyncIOMotorCollection
+
 # Internal dependencies.
-from ..helpers.database_helpers import get_collection
+from ..helpers.database_helpers import collection_dependency, ping_collection
+from ..helpers.password_helpers import password_stats
+from ..helpers.rate_limit_helpers import rate_limit_stats
+from ..googlerpc.grpc_channels import check_channels
+from ..googlerpc.grpc_client import STORAGE_MS_TARGET, SENSOR_MS_TARGET
 
 router = APIRouter()
 
 @router.get("/liveness", status_code=200, response_class=PlainTextResponse)
-async def health():
+async def health(collection: AsyncIOMotorCollection | None = Depends(collection_dependency)):
     """
     This endpoint allows liveness check for Kubernetes clusters.
+    It pings the shared database collection and revalidates it if the ping fails.
     """
 
-    if await get_collection() is None:
+    if collection is None or not await ping_collection():
         raise HTTPException(status_code=400, detail="Database not found.")
     return "Status OK."
 
-# NOTE: Currently no special init conditions.
 @router.get("/readiness", status_code=200, response_class=PlainTextResponse)
 async def readiness():
     """
     This endpoint allows readiness check for Kubernetes clusters.
+    It fails if an RPC channel is not open or cannot connect to its server.
+    """
+
+    states = check_channels(STORAGE_MS_TARGET, SENSOR_MS_TARGET)
+    if any(state in (None, "TRANSIENT_FAILURE") for state in states.values()):
+        raise HTTPException(status_code=400, detail="RPC channels are not connected.")
+    return "Status OK."
+
+@router.get("/metrics", status_code=200, response_class=PlainTextResponse)
+async def metrics():
+    """
+    This endpoint exposes in-process counters in Prometheus text format.
     """
 
-    return "Status OK."
\ No newline at end of file
+    stats = password_stats()
+    limits = rate_limit_stats()
+    return (f"password_hashes_total {stats['hashes']}\n"
+            f"password_checks_total {stats['checks']}\n"
+            f"password_rejected_total {stats['rejected']}\n"
+            f"password_in_flight {stats['in_flight']}\n"
+            f"password_workers {stats['workers']}\n"
+            f"password_queue_limit {stats['queue_limit']}\n"
+            f"password_wait_seconds_total {stats['wait_seconds']:.6f}\n"
+            f"password_work_seconds_total {stats['work_seconds']:.6f}\n"
+            f"login_allowed_total {limits['allowed']}\n"
+            f"login_rejected_total{{reason=\"username\"}} {limits['rejected_username']}\n"
+            f"login_rejected_total{{reason=\"ip\"}} {limits['rejected_ip']}\n"
+            f"import_rejected_total {limits['rejected_import']}\n"
+            f"login_rate_limit_backend_errors_total {limits['backend_errors']}\n"
+            f"login_rate_limit_memory_buckets {limits['memory_buckets']}\n")
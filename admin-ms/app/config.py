@@ -15,8 +15,57 @@ MONGO_URL = os.getenv("DATABASE_URL")
 DATABASE_NAME = os.getenv("DATABASE_NAME")
 COLLECTION = os.getenv("COLLECTION")
 
+# Database connection pool.
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 60000))
+
+# Password hashing runs on this many threads, further requests wait in a queue
+# of limited length and are rejected when it is full.
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", os.cpu_count() or 1))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", 64))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+
+# Login rate limiting. Every login takes a token from the bucket of its username and of its
+# client address, buckets refill per minute up to their burst. The backend is 'memory' or 'mongo'.
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_COLLECTION = os.getenv("RATE_LIMIT_COLLECTION", "rate-limits")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))
+RATE_LIMIT_TTL = int(os.getenv("RATE_LIMIT_TTL", 3600))
+LOGIN_USER_BURST = int(os.getenv("LOGIN_USER_BURST", 5))
+LOGIN_USER_PER_MINUTE = float(os.getenv("LOGIN_USER_PER_MINUTE", 5))
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", 20))
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", 60))
+
+# Proxies, such as the ingress, trusted to forward the client address in 'X-Forwarded-For'.
+# Comma separated addresses or networks, requests coming straight from them are not limited by address.
+# Do not use '*', it trusts the leftmost 'X-Forwarded-For' entry, which clients can choose freely.
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+# User provisioning in the other microservices. Provisioning left unfinished for
+# longer than the timeout, for example by a crash, is resumed in the background.
+PROVISION_TIMEOUT = float(os.getenv("PROVISION_TIMEOUT", 60.0))
+PROVISION_RESUME_INTERVAL = float(os.getenv("PROVISION_RESUME_INTERVAL", 60.0))
+DEPROVISION_ATTEMPTS = int(os.getenv("DEPROVISION_ATTEMPTS", 3))
+DEPROVISION_BACKOFF = float(os.getenv("DEPROVISION_BACKOFF", 0.5))
+
+# Bulk credentials import. Users are provisioned in batches with one streaming call per service.
+# Only the listed administrators may import, each at most at the given rate of requests.
+ADMIN_USERNAMES = [name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()]
+IMPORT_MAX_USERS = int(os.getenv("IMPORT_MAX_USERS", 200))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 100))
+IMPORT_BURST = int(os.getenv("IMPORT_BURST", 2))
+IMPORT_PER_MINUTE = float(os.getenv("IMPORT_PER_MINUTE", 1))
+
 # Other microservices.
 STORAGE_MS_HOST = os.getenv("STORAGE_MS_HOST")
 SENSOR_MS_HOST = os.getenv("SENSOR_MS_HOST")
 
+# GRPC client channels.
+GRPC_TIMEOUT = float(os.getenv("GRPC_TIMEOUT", 5.0))
+GRPC_KEEPALIVE_TIME_MS = int(os.getenv("GRPC_KEEPALIVE_TIME_MS", 30000))
+GRPC_KEEPALIVE_TIMEOUT_MS = int(os.getenv("GRPC_KEEPALIVE_TIMEOUT_MS", 10000))
+GRPC_MAX_ATTEMPTS = int(os.getenv("GRPC_MAX_ATTEMPTS", 3))
+GRPC_BATCH_TIMEOUT = float(os.getenv("GRPC_BATCH_TIMEOUT", 300.0))
+
 GOOGLE_CLOUD_LOGGING = os.getenv("GOOGLE_CLOUD_LOGGING")
\ No newline at end of file
@@ -6,4 +6,14 @@ from .grpc_client import (
     create_sensor_user,
     create_storage_user,
     delete_sensor_user,
-    delete_storage_user)
+    delete_storage_user,
+    create_sensor_users,
+    create_storage_users,
+    delete_sensor_users,
+    delete_storage_users)
+
+from .grpc_channels import (
+    get_channel,
+    open_channels,
+    check_channels,
+    close_channels)
\ No newline at end of file
@@ -0,0 +1,103 @@
+# Author: Nina Mislej
+# Date created: 5.12.2024
+
+# Internal dependencies.
+from ..config import (
+    GRPC_KEEPALIVE_TIME_MS,
+    GRPC_KEEPALIVE_TIMEOUT_MS,
+    GRPC_MAX_ATTEMPTS)
+
+# GRPC Logic.
+import json
+import grpc
+
+# logger default library.
+from ..logger_setup import get_logger
+logger = get_logger("admin-ms.googlerpc")
+
+# Retry policy applied to every method called over the pooled channels.
+# Only 'UNAVAILABLE' is retried since the request never reached the server in that case.
+SERVICE_CONFIG = {
+    "methodConfig": [{
+        "name": [{}],
+        "retryPolicy": {
+            "maxAttempts": GRPC_MAX_ATTEMPTS,
+            "initialBackoff": "0.1s",
+            "maxBackoff": "2s",
+            "backoffMultiplier": 2,
+            "retryableStatusCodes": ["UNAVAILABLE"]
+        }
+    }]
+}
+
+CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", GRPC_KEEPALIVE_TIME_MS),
+    ("grpc.keepalive_timeout_ms", GRPC_KEEPALIVE_TIMEOUT_MS),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.enable_retries", 1),
+    ("grpc.service_config", json.dumps(SERVICE_CONFIG))
+]
+
+# Long-lived channels, one per target. HTTP/2 multiplexes concurrent calls over each of them.
+_channels: dict[str, grpc.aio.Channel] = {}
+
+def get_channel(target: str) -> grpc.aio.Channel:
+    """
+    Returns the pooled channel for ``target``, creating it if needed.
+    A channel that was shut down is replaced with a new one.
+
+    Args:
+        target (str): The address of the remote server in `host:port` format.
+
+    Returns:
+        grpc.aio.Channel: The shared channel for the target.
+    """
+
+    channel = _channels.get(target)
+    if channel is None or channel.get_state() == grpc.ChannelConnectivity.SHUTDOWN:
+        logger.debug(f"Opening RPC channel to {target}.")
+        channel = grpc.aio.insecure_channel(target, options=CHANNEL_OPTIONS)
+        _channels[target] = channel
+    return channel
+
+def open_channels(*targets: str):
+    """
+    Creates channels for all ``targets`` and starts connecting them in the background.
+    Should be called once at service startup.
+
+    Args:
+        targets (str): The addresses of the remote servers in `host:port` format.
+    """
+
+    for target in targets:
+        get_channel(target).get_state(try_to_connect=True)
+
+def check_channels(*targets: str) -> dict[str, str | None]:
+    """
+    Reports the connectivity state of the pooled channels for ``targets``.
+    Idle channels are asked to reconnect.
+
+    Args:
+        targets (str): The addresses of the remote servers in `host:port` format.
+
+    Returns:
+        dict[str, str | None]: The name of the connectivity state for each target,
+            or None if its channel is not open.
+    """
+
+    return {target: _channels[target].get_state(try_to_connect=True).name if target in _channels else None
+            for target in targets}
+
+async def close_channels(grace: float | None = None):
+    """
+    Closes all pooled channels. Should be called once at service shutdown.
+
+    Args:
+        grace (float | None): Seconds to wait for active calls to finish.
+    """
+
+    for target, channel in list(_channels.items()):
+        logger.debug(f"Closing RPC channel to {target}.")
+        await channel.close(grace)
+    _channels.clear()
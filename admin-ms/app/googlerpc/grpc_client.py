@@ -2,8 +2,9 @@
 # Date created: 5.12.2024
 
 # Internal dependencies.
-from ..config import STORAGE_MS_HOST, SENSOR_MS_HOST
+from ..config import STORAGE_MS_HOST, SENSOR_MS_HOST, GRPC_TIMEOUT, GRPC_BATCH_TIMEOUT
 from ..helpers.error import ErrorResponse as Err
+from .grpc_channels import get_channel
 
 # GRPC Logic.
 import asyncio
@@ -19,6 +20,9 @@ import grpc
 from ..logger_setup import get_logger
 logger = get_logger("admin-ms.googlerpc")
 
+STORAGE_MS_TARGET = f"{STORAGE_MS_HOST}:{PORT_STORAGE}"
+SENSOR_MS_TARGET = f"{SENSOR_MS_HOST}:{PORT_SENSOR}"
+
 async def create_storage_user(username : str) -> Err | str:
     """
     Sends a GRPC request to the UserService from Storage server to create a user with the given username.
@@ -31,9 +35,8 @@ async def create_storage_user(username : str) -> Err | str:
     """
 
     try:
-        async with grpc.aio.insecure_channel(f"{STORAGE_MS_HOST}:{PORT_STORAGE}") as channel:
-            stub = storage_pb_grpc.StorageServiceStub(channel)
-            response = await stub.CreateUser(storage_pb.UserRequest(username=username))
+        stub = storage_pb_grpc.StorageServiceStub(get_channel(STORAGE_MS_TARGET))
+        response = await stub.CreateUser(storage_pb.UserRequest(username=username), timeout=GRPC_TIMEOUT)
         return response.username
 
     except Exception as e:
@@ -51,9 +54,8 @@ async def create_sensor_user(username : str) -> Err | str:
         ErrorResponse | str: The username of the created user or an error response if an error occurred.
     """
     try:
-        async with grpc.aio.insecure_channel(f"{SENSOR_MS_HOST}:{PORT_SENSOR}") as channel:
-            stub = sensor_pb_grpc.SensorServiceStub(channel)
-            response = await stub.CreateUser(sensor_pb.UserRequest(username=username))
+        stub = sensor_pb_grpc.SensorServiceStub(get_channel(SENSOR_MS_TARGET))
+        response = await stub.CreateUser(sensor_pb.UserRequest(username=username), timeout=GRPC_TIMEOUT)
         return response.username
 
     except Exception as e:
@@ -71,9 +73,8 @@ async def delete_storage_user(username : str) -> Err | str:
         ErrorResponse | str: The username of the created user or an error response if an error occurred.
     """
     try:
-        async with grpc.aio.insecure_channel(f"{STORAGE_MS_HOST}:{PORT_STORAGE}") as channel:
-            stub = storage_pb_grpc.StorageServiceStub(channel)
-            response = await stub.DeleteUser(storage_pb.UserRequest(username=username))
+        stub = storage_pb_grpc.StorageServiceStub(get_channel(STORAGE_MS_TARGET))
+        response = await stub.DeleteUser(storage_pb.UserRequest(username=username), timeout=GRPC_TIMEOUT)
         return response.username
 
     except Exception as e:
@@ -92,11 +93,120 @@ async def delete_sensor_user(username : str) -> Err | str:
     """
 
     try:
-        async with grpc.aio.insecure_channel(f"{SENSOR_MS_HOST}:{PORT_SENSOR}") as channel:
-            stub = sensor_pb_grpc.SensorServiceStub(channel)
-            response = await stub.DeleteUser(sensor_pb.UserRequest(username=username))
+        stub = sensor_pb_grpc.SensorServiceStub(get_channel(SENSOR_MS_TARGET))
+        response = await stub.DeleteUser(sensor_pb.UserRequest(username=username), timeout=GRPC_TIMEOUT)
         return response.username
 
     except Exception as e:
         logger.warning(f"RPC failure: {e}")
         return Err(message=f"RPC Client Error: {e}", code=400)
+
+async def stream_users(call, message, usernames : list[str]) -> Err | dict[str, Err | str]:
+    """
+    Sends the usernames over a streaming GRPC call and collects a result for every user.
+
+    Args:
+        call: The streaming stub method, for example ``StorageServiceStub.CreateUsers``.
+        message: The request message type.
+        usernames (list[str]): The usernames sent.
+
+    Returns:
+        ErrorResponse | dict[str, ErrorResponse | str]: An error response if the call failed, or the
+            username or an error response for every user otherwise.
+    """
+
+    async def requests():
+        for username in usernames:
+            yield message(username=username)
+
+    results = {}
+    async for response in call(requests(), timeout=GRPC_BATCH_TIMEOUT):
+        if response.error:
+            results[response.username] = Err(message=f"RPC Server Error: {response.error}", code=400)
+        else:
+            results[response.username] = response.username
+
+    for username in usernames:
+        if username not in results:
+            results[username] = Err(message=f"RPC Server Error: No result for '{username}'.", code=400)
+    return results
+
+async def create_storage_users(usernames : list[str]) -> Err | dict[str, Err | str]:
+    """
+    Sends a streaming GRPC request to the Storage server to create many users with a single call.
+
+    Args:
+        usernames (list[str]): The unique usernames of the users created.
+
+    Returns:
+        ErrorResponse | dict[str, ErrorResponse | str]: An error response if the call failed, or the
+            username or an error response for every user otherwise.
+    """
+
+    try:
+        stub = storage_pb_grpc.StorageServiceStub(get_channel(STORAGE_MS_TARGET))
+        return await stream_users(stub.CreateUsers, storage_pb.UserRequest, usernames)
+
+    except Exception as e:
+        logger.warning(f"RPC failure: {e}")
+        return Err(message=f"RPC Client Error: {e}", code=400)
+
+async def create_sensor_users(usernames : list[str]) -> Err | dict[str, Err | str]:
+    """
+    Sends a streaming GRPC request to the Sensor server to create many users with a single call.
+
+    Args:
+        usernames (list[str]): The unique usernames of the users created.
+
+    Returns:
+        ErrorResponse | dict[str, ErrorResponse | str]: An error response if the call failed, or the
+            username or an error response for every user otherwise.
+    """
+
+    try:
+        stub = sensor_pb_grpc.SensorServiceStub(get_channel(SENSOR_MS_TARGET))
+        return await stream_users(stub.CreateUsers, sensor_pb.UserRequest, usernames)
+
+    except Exception as e:
+        logger.warning(f"RPC failure: {e}")
+        return Err(message=f"RPC Client Error: {e}", code=400)
+
+async def delete_storage_users(usernames : list[str]) -> Err | dict[str, Err | str]:
+    """
+    Sends a streaming GRPC request to the Storage server to delete many users with a single call.
+
+    Args:
+        usernames (list[str]): The unique usernames of the users deleted.
+
+    Returns:
+        ErrorResponse | dict[str, ErrorResponse | str]: An error response if the call failed, or the
+            username or an error response for every user otherwise.
+    """
+
+    try:
+        stub = storage_pb_grpc.StorageServiceStub(get_channel(STORAGE_MS_TARGET))
+        return await stream_users(stub.DeleteUsers, storage_pb.UserRequest, usernames)
+
+    except Exception as e:
+        logger.warning(f"RPC failure: {e}")
+        return Err(message=f"RPC Client Error: {e}", code=400)
+
+async def delete_sensor_users(usernames : list[str]) -> Err | dict[str, Err | str]:
+    """
+    Sends a streaming GRPC request to the Sensor server to delete many users with a single call.
+
+    Args:
+        usernames (list[str]): The unique usernames of the users deleted.
+
+    Returns:
+        ErrorResponse | dict[str, ErrorResponse | str]: An error response if the call failed, or the
+            username or an error response for every user otherwise.
+    """
+
+    try:
+        stub = sensor_pb_grpc.SensorServiceStub(get_channel(SENSOR_MS_TARGET))
+        return await stream_users(stub.DeleteUsers, sensor_pb.UserRequest, usernames)
+
+    except Exception as e:
+        logger.warning(f"RPC failure: {e}")
+        return Err(message=f"RPC Client Error: {e}", code=400)
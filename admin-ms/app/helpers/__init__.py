@@ -3,7 +3,25 @@ The `helpers` module provides generic helper functions for managing the database
 """
 
 from .database_helpers import (
-    get_collection)
+    get_collection,
+    resolve_collection,
+    invalidate_collection,
+    ping_collection,
+    collection_dependency,
+    ensure_indexes,
+    close_client)
+
+from .password_helpers import (
+    hash_password,
+    check_password,
+    close_executor,
+    password_stats)
+
+from .rate_limit_helpers import (
+    check_login_rate,
+    check_import_rate,
+    login_address,
+    rate_limit_stats)
 
 from .error import (
     ErrorResponse)
\ No newline at end of file
@@ -0,0 +1,134 @@
+# Author: Nina Mislej
+# Date created: 14.01.2025
+
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from bcrypt import hashpw, checkpw, gensalt
+
+from .error import ErrorResponse as Err
+from ..config import PASSWORD_WORKERS, PASSWORD_QUEUE_LIMIT, BCRYPT_ROUNDS
+
+# Logging default library.
+from ..logger_setup import get_logger
+logger = get_logger("admin-ms.helpers")
+
+# NOTE: Hashing and checking a password takes a few hundred milliseconds of CPU time.
+#       bcrypt releases the GIL meanwhile, so a thread pool runs as many of them at once
+#       as it has workers and the event loop keeps serving other requests.
+#       Requests beyond the workers wait in a queue of limited length and are rejected when it is full.
+_executor: ThreadPoolExecutor | None = None
+
+_stats = {"hashes": 0, "checks": 0, "rejected": 0, "in_flight": 0, "wait_seconds": 0.0, "work_seconds": 0.0}
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Return the thread pool used for password hashing, creating it on first use.
+
+    Returns:
+        ThreadPoolExecutor: The hashing thread pool.
+    """
+
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="password")
+    return _executor
+
+def close_executor():
+    """
+    Shut down the hashing thread pool, waiting for running jobs.
+    """
+
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+async def run_hashing(function, *args):
+    """
+    Run a hashing function in the thread pool and record its timing.
+
+    Args:
+        function (Callable): The blocking function.
+        *args: The arguments of the function.
+
+    Returns:
+        ErrorResponse | Any: The error response if the queue is full, or the result of the function.
+    """
+
+    if _stats["in_flight"] >= PASSWORD_WORKERS + PASSWORD_QUEUE_LIMIT:
+        _stats["rejected"] += 1
+        logger.warning("Password hashing queue is full, rejecting request.")
+        return Err(message=f"Too many requests, try again later.", code=503)
+
+    def timed():
+        started = time.perf_counter()
+        return function(*args), started, time.perf_counter()
+
+    def finished_job():
+        _stats["in_flight"] -= 1
+
+    loop = asyncio.get_running_loop()
+    def job_done(_):
+        try:
+            loop.call_soon_threadsafe(finished_job)
+        except RuntimeError:
+            # NOTE: The event loop was closed, nothing is counted anymore.
+            pass
+
+    # NOTE: A job keeps running if its request is cancelled, so it is counted until the job finishes.
+    submitted = time.perf_counter()
+    _stats["in_flight"] += 1
+    job = get_executor().submit(timed)
+    job.add_done_callback(job_done)
+    result, started, finished = await asyncio.wrap_future(job)
+
+    _stats["wait_seconds"] += started - submitted
+    _stats["work_seconds"] += finished - started
+    return result
+
+async def hash_password(password: str) -> Err | str:
+    """
+    Hash a password with a new salt.
+
+    Args:
+        password (str): The plain password.
+
+    Returns:
+        ErrorResponse | str: The error response if the queue is full, or the hashed password.
+    """
+
+    result = await run_hashing(hashpw, password.encode('utf8'), gensalt(rounds=BCRYPT_ROUNDS))
+    if isinstance(result, Err):
+        return result
+    _stats["hashes"] += 1
+    return result.decode('utf8')
+
+async def check_password(password: str, hashed: str) -> Err | bool:
+    """
+    Check a password against its hash.
+
+    Args:
+        password (str): The plain password.
+        hashed (str): The stored hash of the password.
+
+    Returns:
+        ErrorResponse | bool: The error response if the queue is full, or whether the password matches.
+    """
+
+    result = await run_hashing(checkpw, password.encode('utf8'), hashed.encode('utf8'))
+    if isinstance(result, Err):
+        return result
+    _stats["checks"] += 1
+    return result
+
+def password_stats() -> dict:
+    """
+    Return the counters of the hashing thread pool.
+
+    Returns:
+        dict: Completed hashes and checks, rejected requests, jobs running or queued
+            and the total seconds jobs waited in the queue and ran.
+    """
+
+    return {**_stats, "workers": PASSWORD_WORKERS, "queue_limit": PASSWORD_QUEUE_LIMIT}
@@ -0,0 +1,244 @@
+# Author: Nina Mislej
+# Date created: 14.01.2025
+
+import math
+import time
+import ipaddress
+from collections import OrderedDict
+from pymongo import ReturnDocument
+
+from .error import ErrorResponse as Err
+from .database_helpers import client
+from ..config import (
+    DATABASE_NAME,
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_COLLECTION,
+    RATE_LIMIT_MAX_KEYS,
+    RATE_LIMIT_TTL,
+    LOGIN_USER_BURST,
+    LOGIN_USER_PER_MINUTE,
+    LOGIN_IP_BURST,
+    LOGIN_IP_PER_MINUTE,
+    IMPORT_BURST,
+    IMPORT_PER_MINUTE,
+    FORWARDED_ALLOW_IPS)
+
+# Logging default library.
+from ..logger_setup import get_logger
+logger = get_logger("admin-ms.helpers")
+
+# NOTE: Every login takes a token from the bucket of its username and of its client address.
+#       Buckets refill continuously up to their burst size, so a client can retry a few times
+#       in a row but a flood of logins is rejected before the database or bcrypt are reached.
+#       The memory store is per process. The shared store keeps buckets in MongoDB, so all
+#       replicas share the limit, and falls back to the memory store if the database fails.
+class MemoryBuckets:
+    """
+    Token buckets kept in memory, the least recently used are dropped beyond ``max_keys``.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self.buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, burst: int, rate: float) -> float:
+        """
+        Take a token from a bucket.
+
+        Args:
+            key (str): The bucket key.
+            burst (int): The size of the bucket.
+            rate (float): The refilled tokens per second.
+
+        Returns:
+            float: Zero if a token was taken, or the seconds until one is available otherwise.
+        """
+
+        now = time.monotonic()
+        tokens, updated = self.buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate if rate > 0 else math.inf
+
+        self.buckets[key] = (tokens, now)
+        if len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return wait
+
+class MongoBuckets:
+    """
+    Token buckets kept in a MongoDB collection shared by all replicas.
+    Each bucket is refilled and taken from with a single atomic update,
+    buckets unused for ``RATE_LIMIT_TTL`` seconds are removed by a TTL index.
+    """
+
+    def __init__(self, collection_name: str = RATE_LIMIT_COLLECTION):
+        self.collection = client[DATABASE_NAME].get_collection(collection_name)
+        self.indexed = False
+
+    async def take(self, key: str, burst: int, rate: float) -> float:
+        """
+        Take a token from a bucket.
+
+        Args:
+            key (str): The bucket key.
+            burst (int): The size of the bucket.
+            rate (float): The refilled tokens per second.
+
+        Returns:
+            float: Zero if a token was taken, or the seconds until one is available otherwise.
+        """
+
+        if not self.indexed:
+            await self.collection.create_index("updated_at", expireAfterSeconds=RATE_LIMIT_TTL)
+            self.indexed = True
+
+        # NOTE: The time is taken from the database server, so the clocks of the replicas do not matter.
+        elapsed = {"$divide": [{"$subtract": ["$$NOW", {"$ifNull": ["$updated_at", "$$NOW"]}]}, 1000]}
+        refilled = {"$min": [burst, {"$add": [{"$ifNull": ["$tokens", burst]}, {"$multiply": [elapsed, rate]}]}]}
+        bucket = await self.collection.find_one_and_update(
+            {"_id": key},
+            [{"$set": {"tokens": refilled, "updated_at": "$$NOW"}},
+             {"$set": {"taken": {"$gte": ["$tokens", 1]},
+                       "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", 1]}, "$tokens"]}}}],
+            upsert=True,
+            return_document=ReturnDocument.AFTER)
+
+        if bucket["taken"]:
+            return 0.0
+        return (1 - bucket["tokens"]) / rate if rate > 0 else math.inf
+
+def trusted_proxies() -> list:
+    """
+    Parse the trusted proxies of ``FORWARDED_ALLOW_IPS``.
+
+    Returns:
+        list: The trusted networks, and the entries that are not addresses, such as '*', as strings.
+    """
+
+    proxies = []
+    for entry in FORWARDED_ALLOW_IPS.split(","):
+        entry = entry.strip()
+        try:
+            proxies.append(ipaddress.ip_network(entry, strict=False))
+        except ValueError:
+            proxies.append(entry)
+
+    if "*" in proxies:
+        logger.warning("All proxies are trusted, clients can choose the address their logins are limited by.")
+    return proxies
+
+_proxies = trusted_proxies()
+
+def login_address(host: str | None) -> str | None:
+    """
+    Return the client address a login is limited by.
+
+    A request that still comes from a trusted proxy did not carry the address of its
+    client, so it is not limited by address, otherwise all clients would share one bucket.
+
+    Args:
+        host (str | None): The address of the client as seen by the server.
+
+    Returns:
+        str | None: The address to limit, or None if it is unknown or of a trusted proxy.
+    """
+
+    if host is None:
+        return None
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return None if host in _proxies else host
+
+    if any(isinstance(proxy, (ipaddress.IPv4Network, ipaddress.IPv6Network)) and address in proxy
+           for proxy in _proxies):
+        return None
+    return host
+
+_memory = MemoryBuckets()
+_shared: MongoBuckets | None = None
+
+_stats = {"allowed": 0, "rejected_username": 0, "rejected_ip": 0, "rejected_import": 0, "backend_errors": 0}
+
+async def take(key: str, burst: int, per_minute: float) -> float:
+    """
+    Take a token from a bucket of the configured store.
+
+    Args:
+        key (str): The bucket key.
+        burst (int): The size of the bucket.
+        per_minute (float): The refilled tokens per minute.
+
+    Returns:
+        float: Zero if a token was taken, or the seconds until one is available otherwise.
+    """
+
+    global _shared
+    if RATE_LIMIT_BACKEND == "mongo":
+        try:
+            if _shared is None:
+                _shared = MongoBuckets()
+            return await _shared.take(key, burst, per_minute / 60)
+        except Exception as e:
+            _stats["backend_errors"] += 1
+            logger.warning(f"Shared rate limit store failed, using memory: {e}")
+    return await _memory.take(key, burst, per_minute / 60)
+
+async def check_login_rate(username: str, address: str | None) -> Err | None:
+    """
+    Take a login attempt from the buckets of a username and of a client address.
+    The username bucket is only used if the address bucket allows the attempt.
+
+    Args:
+        username (str): The username logging in.
+        address (str | None): The address of the client, not limited if unknown.
+
+    Returns:
+        ErrorResponse | None: The error response if the attempt is rejected, None otherwise.
+    """
+
+    if address is not None:
+        wait = await take(f"ip:{address}", LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE)
+        if wait > 0:
+            _stats["rejected_ip"] += 1
+            return Err(message=f"Too many login attempts, try again in {math.ceil(wait)} seconds.", code=429)
+
+    wait = await take(f"user:{username}", LOGIN_USER_BURST, LOGIN_USER_PER_MINUTE)
+    if wait > 0:
+        _stats["rejected_username"] += 1
+        return Err(message=f"Too many login attempts, try again in {math.ceil(wait)} seconds.", code=429)
+
+    _stats["allowed"] += 1
+    return None
+
+async def check_import_rate(username: str) -> Err | None:
+    """
+    Take a credentials import from the bucket of the administrator sending it.
+
+    Args:
+        username (str): The username of the administrator.
+
+    Returns:
+        ErrorResponse | None: The error response if the import is rejected, None otherwise.
+    """
+
+    wait = await take(f"import:{username}", IMPORT_BURST, IMPORT_PER_MINUTE)
+    if wait > 0:
+        _stats["rejected_import"] += 1
+        return Err(message=f"Too many imports, try again in {math.ceil(wait)} seconds.", code=429)
+    return None
+
+def rate_limit_stats() -> dict:
+    """
+    Return the counters of login rate limiting.
+
+    Returns:
+        dict: Allowed and rejected logins, rejected imports, failures of the shared store
+            and the number of buckets kept in memory.
+    """
+
+    return {**_stats, "memory_buckets": len(_memory.buckets), "backend": RATE_LIMIT_BACKEND}
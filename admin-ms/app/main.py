@@ -5,21 +5,49 @@
 import asyncio
 import uvicorn
 from fastapi import FastAPI
+from contextlib import asynccontextmanager
 
 # Internal dependencies.
 from .api import (
     credentials_api,
     health_check_api)
+from .helpers.database_helpers import resolve_collection, ensure_indexes, close_client
+from .helpers.password_helpers import close_executor
+from .services.credentials_utils import resume_provisioning_loop
+from .googlerpc.grpc_channels import open_channels, close_channels
+from .googlerpc.grpc_client import STORAGE_MS_TARGET, SENSOR_MS_TARGET
+from .config import FORWARDED_ALLOW_IPS
 
 # Logging default library.
 from .logger_setup import get_logger
 logger = get_logger("admin-ms.main")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Resolves the shared database collection, ensures its indexes and opens the RPC channels at startup.
+    Resumes unfinished user provisioning in the background.
+    Closes the connection pool, the channels and the password hashing threads on shutdown.
+    """
+
+    if await resolve_collection() is None:
+        logger.warning("Database collection could not be resolved at startup.")
+    elif not await ensure_indexes():
+        logger.warning("Database indexes could not be ensured at startup.")
+    open_channels(STORAGE_MS_TARGET, SENSOR_MS_TARGET)
+    resume_task = asyncio.create_task(resume_provisioning_loop())
+    yield
+    resume_task.cancel()
+    await close_channels(grace=5)
+    close_client()
+    close_executor()
+
 app = FastAPI(
     title="Admin Managment Microservice",
     docs_url="/credentials/docs-api",         # Swagger UI
     redoc_url="/credentials/redoc",           # Redoc UI
-    openapi_url="/credentials/openapi.json"   # OpenAPI schema URL
+    openapi_url="/credentials/openapi.json",  # OpenAPI schema URL
+    lifespan=lifespan
 )
 
 # Include all routers and mounts.
@@ -27,7 +55,9 @@ app.include_router(credentials_api.router)
 app.include_router(health_check_api.router)
 
 async def start_api():
-    config = uvicorn.Config(app=app, host="0.0.0.0", port=8001)
+    # NOTE: Behind the ingress the client address is taken from 'X-Forwarded-For' of trusted proxies.
+    config = uvicorn.Config(app=app, host="0.0.0.0", port=8001,
+                            proxy_headers=True, forwarded_allow_ips=FORWARDED_ALLOW_IPS)
     server = uvicorn.Server(config)
     await server.serve()
 
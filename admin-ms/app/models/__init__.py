@@ -3,4 +3,7 @@ The `models` module serves as a dict holding information for database queries.
 """
 
 from .credentials import (
-    Credentials)
\ No newline at end of file
+    Credentials,
+    CredentialsCreate,
+    CredentialsImportError,
+    CredentialsImportResult)
\ No newline at end of file
@@ -1,23 +1,39 @@
 # Author: Jure
 # Date created: 4.12.2024
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field
 from typing import Optional, List
 
-# Hashing the password
-from bcrypt import hashpw, gensalt
-
 class Credentials(BaseModel):
     """
     Represents a user model in admin environment.
-    Password is already hashed at this stage.
+    Password is already hashed at this stage, see ``helpers.hash_password``.
+    """
+
+    username: str
+    password: str
+
+class CredentialsCreate(BaseModel):
+    """
+    Represents the credentials of a user to import, the password is not hashed yet.
     """
 
     username: str
     password: str
 
-    @field_validator('password', mode="before")
-    @classmethod
-    def hash_password(cls, ps):
-        return hashpw(ps.encode('utf8'), gensalt()).decode('utf8')
+class CredentialsImportError(BaseModel):
+    """
+    Describes why a user of a credentials import was not created.
+    """
+
+    username: str
+    message: str
+
+class CredentialsImportResult(BaseModel):
+    """
+    Represents the result of a credentials import, the usernames of the created
+    users in the order of the request and the errors of the users that failed.
+    """
 
+    created: List[str] = []
+    errors: List[CredentialsImportError] = []
@@ -5,6 +5,7 @@ It serves as communication between models and the database.
 
 from .credentials_utils import (
     create_credentials,
+    import_credentials,
     delete_credentials,
     validate_credentials,
     update_password)
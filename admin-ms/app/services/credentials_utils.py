@@ -1,34 +1,206 @@
 # Author: Jure
 # Date created: 4.12.2024
 
+import random
+import asyncio
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+from motor.motor_asyncio import AsyncIOMotorCollection
+
 # OAuth2 authentication dependencies.
 from fastapi.security import (
     OAuth2PasswordRequestForm)
 
 from skladischer_auth.token_utils import create_access_token
 
-from ..models.credentials import Credentials
+from ..models.credentials import Credentials, CredentialsCreate, CredentialsImportError, CredentialsImportResult
 from ..models.token import Token
 from ..helpers.database_helpers import get_collection
 from ..helpers.error import ErrorResponse as Err
+from ..helpers.password_helpers import hash_password, check_password
+from ..config import (
+    PROVISION_TIMEOUT,
+    PROVISION_RESUME_INTERVAL,
+    DEPROVISION_ATTEMPTS,
+    DEPROVISION_BACKOFF,
+    PASSWORD_WORKERS,
+    IMPORT_MAX_USERS,
+    IMPORT_BATCH_SIZE)
 
 from ..googlerpc.grpc_client import (
     create_sensor_user,
     create_storage_user,
     delete_sensor_user,
-    delete_storage_user)
-
-from bcrypt import checkpw
+    delete_storage_user,
+    create_sensor_users,
+    create_storage_users,
+    delete_sensor_users,
+    delete_storage_users)
 
 # Logging default library.
 from ..logger_setup import get_logger
 logger = get_logger("admin-ms.main")
 
+# NOTE: Users are provisioned in the storage and sensor microservices concurrently.
+#       The credentials are stored first with the provisioning state of every service,
+#       so a request that fails or a crash midway can be rolled back or finished later.
+#       Users are only active, and can log in, when all services have created them.
+PROVISIONING = "provisioning"
+DELETING = "deleting"
+PENDING = "pending"
+CREATED = "created"
+
+def downstream_services() -> dict:
+    """
+    Return the RPC calls creating and deleting users in the other microservices.
+
+    Returns:
+        dict: Pairs of create and delete calls by service name.
+    """
+
+    return {"storage": (create_storage_user, delete_storage_user),
+            "sensor": (create_sensor_user, delete_sensor_user)}
+
+def downstream_bulk_services() -> dict:
+    """
+    Return the streaming RPC calls creating and deleting many users in the other microservices.
+
+    Returns:
+        dict: Pairs of bulk create and delete calls by service name.
+    """
+
+    return {"storage": (create_storage_users, delete_storage_users),
+            "sensor": (create_sensor_users, delete_sensor_users)}
+
+async def deprovision(db_admin: AsyncIOMotorCollection, username: str, services: list[str],
+                      attempts: int = DEPROVISION_ATTEMPTS) -> Err | None:
+    """
+    Delete a user in the given services concurrently, retrying failed deletions.
+    Every service that deleted the user is removed from the stored provisioning state,
+    so a later attempt only retries the remaining ones.
+
+    Args:
+        db_admin (Collection): The credentials collection.
+        username (str): The username of the user.
+        services (list[str]): The services to delete the user in.
+        attempts (int): How many times a deletion is tried.
+
+    Returns:
+        ErrorResponse | None: The last error response if a deletion kept failing, None otherwise.
+    """
+
+    calls = downstream_services()
+    async def delete(service: str) -> Err | None:
+        for attempt in range(attempts):
+            result = await calls[service][1](username)
+            if not isinstance(result, Err):
+                await db_admin.update_one({"username": username}, {"$unset": {f"services.{service}": ""}})
+                return None
+            if attempt < attempts - 1:
+                await asyncio.sleep(random.uniform(0, DEPROVISION_BACKOFF * 2 ** attempt))
+        logger.warning(f"Deleting user '{username}' in {service} failed: {result.message}")
+        return result
+
+    errors = [result for result in await asyncio.gather(*(delete(service) for service in services))
+              if isinstance(result, Err)]
+    return errors[-1] if errors else None
+
+async def provision(db_admin: AsyncIOMotorCollection, username: str, document_id: ObjectId) -> Err | None:
+    """
+    Create a user in all services concurrently and roll back on partial failure.
+
+    Args:
+        db_admin (Collection): The credentials collection holding the provisioning state.
+        username (str): The username of the user.
+        document_id (ObjectId): The identifier of the stored credentials of this signup.
+
+    Returns:
+        ErrorResponse | None: The error response of the first failed service, None if all succeeded.
+    """
+
+    calls = downstream_services()
+    async def create(service: str) -> Err | str:
+        result = await calls[service][0](username)
+        if not isinstance(result, Err):
+            await db_admin.update_one({"_id": document_id}, {"$set": {f"services.{service}": CREATED}})
+        return result
+
+    results = dict(zip(calls, await asyncio.gather(*(create(service) for service in calls))))
+    errors = [result for result in results.values() if isinstance(result, Err)]
+    if not errors:
+        return None
+
+    created = [service for service, result in results.items() if not isinstance(result, Err)]
+    logger.debug(f"Creating user failed {username} - rolling back {', '.join(created) or 'nothing'}.")
+    if await deprovision(db_admin, username, created) is None:
+        await db_admin.delete_one({"_id": document_id, "state": PROVISIONING})
+    return errors[0]
+
+async def resume_provisioning() -> Err | int:
+    """
+    Finish provisioning left unfinished for longer than ``PROVISION_TIMEOUT``.
+    Unfinished signups are rolled back, including services whose state is unknown,
+    and unfinished deletions are retried.
+
+    Returns:
+        ErrorResponse | int: The error response if an error occurred, or the number of finished users.
+    """
+
+    try:
+        db_admin = await get_collection()
+        if db_admin is None:
+            return Err(message=f"Cannot get DB collection.")
+
+        stale = datetime.now(timezone.utc) - timedelta(seconds=PROVISION_TIMEOUT)
+        finished = 0
+        async for user in db_admin.find({"state": {"$in": [PROVISIONING, DELETING]}, "updated_at": {"$lt": stale}},
+                                        {"username": 1, "state": 1, "services": 1}):
+            username = user["username"]
+            result = await db_admin.update_one({"_id": user["_id"], "updated_at": {"$lt": stale}},
+                                               {"$set": {"state": DELETING, "updated_at": datetime.now(timezone.utc)}})
+            if result.modified_count == 0:
+                continue
+
+            services = user.get("services", {})
+            logger.info(f"Resuming unfinished {user['state']} of user '{username}' in {', '.join(services) or 'no services'}.")
+
+            # NOTE: Services still pending may never have created the user, so their deletion
+            #       is tried once and they are dropped from the state either way.
+            pending = [service for service, state in services.items() if state == PENDING]
+            if pending:
+                await deprovision(db_admin, username, pending, attempts=1)
+                await db_admin.update_one({"username": username},
+                                          {"$unset": {f"services.{service}": "" for service in pending}})
+
+            created = [service for service, state in services.items() if state != PENDING]
+            if await deprovision(db_admin, username, created) is None:
+                await db_admin.delete_one({"_id": user["_id"], "state": DELETING})
+                finished += 1
+        return finished
+
+    except Exception as e:
+        logger.warning(f"Resuming provisioning failure: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
+async def resume_provisioning_loop():
+    """
+    Resume unfinished provisioning every ``PROVISION_RESUME_INTERVAL`` seconds until cancelled.
+    """
+
+    while True:
+        result = await resume_provisioning()
+        if isinstance(result, Err):
+            logger.warning(f"Resuming provisioning failed: {result.message}")
+        await asyncio.sleep(PROVISION_RESUME_INTERVAL)
+
 async def create_credentials(credentials: OAuth2PasswordRequestForm) -> Err | str:
     """
     Create a new user in the database.
 
-    This function inserts a new user credentials into the database. If the operation fails for
+    This function inserts a new user credentials into the database and creates the user
+    in the storage and sensor microservices concurrently. If any of them fails, the user is
+    deleted from the others and the credentials are removed. If the operation fails for
     any reason, an error response is returned.
 
     Args:
@@ -47,24 +219,32 @@ async def create_credentials(credentials: OAuth2PasswordRequestForm) -> Err | st
         if result:
             return Err(message=f"User with username {credentials.username} already exists.")
 
-        # TODO: Improve this rollback.
-        result = await create_storage_user(credentials.username)
-        if isinstance(result, Err):
-            logger.debug(f"Creating user failed {credentials.username} - rollback needed.")
-            return result
+        password = await hash_password(credentials.password)
+        if isinstance(password, Err):
+            return password
+
+        # NOTE: The username is unique, so of concurrent signups of the same user only one is stored.
+        user_dict = Credentials(username=credentials.username, password=password).model_dump()
+        try:
+            result = await db_admin.insert_one({
+                **user_dict,
+                "state": PROVISIONING,
+                "services": {service: PENDING for service in downstream_services()},
+                "updated_at": datetime.now(timezone.utc)})
+        except DuplicateKeyError:
+            return Err(message=f"User with username {credentials.username} already exists.")
+        if not result.acknowledged:
+            return Err(message=f"Creating user failed.")
 
-        result = await create_sensor_user(credentials.username)
+        document_id = result.inserted_id
+        result = await provision(db_admin, credentials.username, document_id)
         if isinstance(result, Err):
-            logger.debug(f"Creating user failed {credentials.username} - rollback needed.")
             return result
 
-        user_dict = Credentials(username=credentials.username,
-                                password=credentials.password).model_dump()
-        result = await db_admin.insert_one(user_dict)
-        if not result.acknowledged:
-            return Err(message=f"Creating user failed.")
+        await db_admin.update_one({"_id": document_id},
+                                  {"$unset": {"state": "", "services": "", "updated_at": ""}})
 
-        logger.debug(f"New user created: {credentials.username} - {result.inserted_id}")
+        logger.debug(f"New user created: {credentials.username}.")
         return credentials.username
 
     # TODO: Should the end user know what error happened internally?
@@ -73,6 +253,177 @@ async def create_credentials(credentials: OAuth2PasswordRequestForm) -> Err | st
         return Err(message=f"Unknown exception: {e}", code=500)
 
 
+async def import_batch(db_admin: AsyncIOMotorCollection, users: list[CredentialsCreate],
+                       hashing: asyncio.Semaphore, result: CredentialsImportResult):
+    """
+    Create a batch of users and provision them in all services with one call per service.
+
+    Passwords are hashed in parallel and the credentials are stored together with their
+    provisioning state. Users that any service failed to create are deleted from the other
+    services and their credentials are removed. If a rollback fails, the credentials are
+    left for ``resume_provisioning`` to finish.
+
+    Args:
+        db_admin (Collection): The credentials collection.
+        users (list[CredentialsCreate]): The users of the batch.
+        hashing (Semaphore): Limits how many passwords of the import are hashed at the same time.
+        result (CredentialsImportResult): The import result the created users and errors are added to.
+    """
+
+    async def hashed(user: CredentialsCreate) -> Err | str:
+        async with hashing:
+            return await hash_password(user.password)
+
+    passwords = await asyncio.gather(*(hashed(user) for user in users))
+    errors = {}
+    documents = []
+    for user, password in zip(users, passwords):
+        if isinstance(password, Err):
+            errors[user.username] = password.message
+            continue
+        documents.append({
+            **Credentials(username=user.username, password=password).model_dump(),
+            "state": PROVISIONING,
+            "services": {service: PENDING for service in downstream_bulk_services()},
+            "updated_at": datetime.now(timezone.utc)})
+
+    # NOTE: Users stored by a concurrent signup in the meantime fail on the unique username.
+    #       Inserted documents are addressed by their identifier, so a rollback never removes another signup.
+    rejected = set()
+    if documents:
+        try:
+            await db_admin.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                username = documents[error["index"]]["username"]
+                rejected.add(username)
+                errors[username] = f"User with username {username} already exists." if error.get("code") == 11000 \
+                    else f"Creating user failed."
+    ids = {document["username"]: document["_id"] for document in documents if document["username"] not in rejected}
+
+    usernames = list(ids)
+    if usernames:
+        calls = downstream_bulk_services()
+        async def create(service: str) -> Err | dict[str, Err | str]:
+            created = await calls[service][0](usernames)
+            if not isinstance(created, Err):
+                await db_admin.update_many(
+                    {"_id": {"$in": [ids[username] for username, outcome in created.items()
+                                     if not isinstance(outcome, Err)]}},
+                    {"$set": {f"services.{service}": CREATED}})
+            return created
+
+        results = dict(zip(calls, await asyncio.gather(*(create(service) for service in calls))))
+        for service, created in results.items():
+            for username in usernames:
+                outcome = created if isinstance(created, Err) else created[username]
+                if isinstance(outcome, Err) and username not in errors:
+                    errors[username] = outcome.message
+
+        failed = [username for username in usernames if username in errors]
+        if failed:
+            logger.debug(f"Creating {len(failed)} users failed - rolling back.")
+            await rollback(db_admin, {username: ids[username] for username in failed}, results)
+
+        active = [ids[username] for username in usernames if username not in errors]
+        if active:
+            await db_admin.update_many({"_id": {"$in": active}, "state": PROVISIONING},
+                                       {"$unset": {"state": "", "services": "", "updated_at": ""}})
+
+    for user in users:
+        if user.username in errors:
+            result.errors.append(CredentialsImportError(username=user.username, message=errors[user.username]))
+        else:
+            result.created.append(user.username)
+
+async def rollback(db_admin: AsyncIOMotorCollection, ids: dict[str, ObjectId], results: dict):
+    """
+    Delete users whose provisioning failed from the services that created them.
+
+    Services whose call failed as a whole may have created some of the users, so the
+    deletion is tried for all of them. Credentials are removed for users deleted everywhere.
+
+    Args:
+        db_admin (Collection): The credentials collection.
+        ids (dict[str, ObjectId]): The identifiers of the stored credentials of the users that failed.
+        results (dict): The result of the bulk create call by service name.
+    """
+
+    usernames = list(ids)
+    calls = downstream_bulk_services()
+    async def delete(service: str) -> set[str]:
+        created = results[service]
+        targets = usernames if isinstance(created, Err) else \
+            [username for username in usernames if not isinstance(created[username], Err)]
+        if not targets:
+            return set(usernames)
+
+        deleted = await calls[service][1](targets)
+        if isinstance(deleted, Err):
+            logger.warning(f"Deleting {len(targets)} users in {service} failed: {deleted.message}")
+            deleted = {}
+        done = [username for username in targets if username in deleted and not isinstance(deleted[username], Err)]
+        if done:
+            await db_admin.update_many({"_id": {"$in": [ids[username] for username in done]}},
+                                       {"$unset": {f"services.{service}": ""}})
+        return set(usernames) - set(targets) | set(done)
+
+    removed = set.intersection(*await asyncio.gather(*(delete(service) for service in calls)))
+    if removed:
+        await db_admin.delete_many({"_id": {"$in": [ids[username] for username in removed]}, "state": PROVISIONING})
+
+async def import_credentials(users: list[CredentialsCreate]) -> Err | CredentialsImportResult:
+    """
+    Create many users in the database and in the storage and sensor microservices.
+
+    Users are created in batches of ``IMPORT_BATCH_SIZE``. The passwords of a batch are
+    hashed in parallel on at most ``PASSWORD_WORKERS`` threads, so the hashing queue keeps
+    room for logins, and each service creates the users of a batch with a single streaming
+    call. Users that fail are reported with their username while the others are created.
+
+    Args:
+        users (list[CredentialsCreate]): The users to create.
+
+    Returns:
+        ErrorResponse | CredentialsImportResult: The error response if an error occurred,
+            or the created usernames and the errors of the users that failed.
+    """
+
+    try:
+        if len(users) > IMPORT_MAX_USERS:
+            return Err(message=f"Cannot import more than {IMPORT_MAX_USERS} users at once.", code=413)
+
+        db_admin = await get_collection()
+        if db_admin is None:
+            return Err(message=f"Cannot get DB collection.")
+
+        result = CredentialsImportResult()
+        existing = {user["username"] async for user in
+                    db_admin.find({"username": {"$in": [user.username for user in users]}}, {"_id": 0, "username": 1})}
+        seen = set()
+        pending = []
+        for user in users:
+            if user.username in existing:
+                result.errors.append(CredentialsImportError(
+                    username=user.username, message=f"User with username {user.username} already exists."))
+            elif user.username in seen:
+                result.errors.append(CredentialsImportError(
+                    username=user.username, message=f"User with username {user.username} is repeated."))
+            else:
+                seen.add(user.username)
+                pending.append(user)
+
+        hashing = asyncio.Semaphore(PASSWORD_WORKERS)
+        for offset in range(0, len(pending), IMPORT_BATCH_SIZE):
+            await import_batch(db_admin, pending[offset:offset + IMPORT_BATCH_SIZE], hashing, result)
+
+        logger.debug(f"Imported {len(result.created)} of {len(users)} users.")
+        return result
+
+    except Exception as e:
+        logger.warning(f"Importing credentials failure: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
 async def validate_credentials(credentials: OAuth2PasswordRequestForm) -> Err | Token:
     """
     Validate a user by their password and username.
@@ -92,11 +443,13 @@ async def validate_credentials(credentials: OAuth2PasswordRequestForm) -> Err |
         if db_admin is None:
             return Err(message=f"Cannot get DB collection.")
 
-        result  = await db_admin.find_one({"username": credentials.username})
+        result  = await db_admin.find_one({"username": credentials.username, "state": {"$exists": False}})
         if not result or "password" not in result or "username" not in result:
             return Err(message=f"User validation '{credentials.username}' failed.", code=401)
 
-        check = checkpw(credentials.password.encode('utf8'), result["password"].encode('utf8'))
+        check = await check_password(credentials.password, result["password"])
+        if isinstance(check, Err):
+            return check
         if not check:
             return Err(message=f"Password for '{credentials.username}' is wrong.", code=401)
 
@@ -114,7 +467,9 @@ async def delete_credentials(username: str) -> Err | str:
     """
     Delete a user by their identifier.
 
-    This function removes a user from the database based on their `user_id``.
+    This function deletes the user in the storage and sensor microservices concurrently,
+    retrying failed deletions, and then removes the user from the database. A user whose
+    deletion keeps failing cannot log in and its deletion is finished in the background.
     If the operation fails, an error response is returned.
 
     Args:
@@ -129,18 +484,23 @@ async def delete_credentials(username: str) -> Err | str:
         if db_admin is None:
             return Err(message=f"Cannot get DB collection.")
 
-        # TODO: Improve this rollback.
-        result = await delete_storage_user(username)
-        if isinstance(result, Err):
-            logger.debug(f"Deleting user failed {username} - rollback needed.")
-            return result
+        # Active users are marked for deletion in all services, a deletion that was
+        # started before only continues with the services that have not deleted the user yet.
+        await db_admin.update_one(
+            {"username": username, "state": {"$exists": False}},
+            {"$set": {"state": DELETING, "services": {service: CREATED for service in downstream_services()}}})
+        user = await db_admin.find_one_and_update(
+            {"username": username, "state": DELETING},
+            {"$set": {"updated_at": datetime.now(timezone.utc)}},
+            projection={"services": 1})
+        if user is None:
+            return Err(message=f"Deleting user '{username}' failed.")
 
-        result = await delete_sensor_user(username)
+        result = await deprovision(db_admin, username, list(user.get("services", {})))
         if isinstance(result, Err):
-            logger.debug(f"Deleting user failed {username} - rollback needed.")
-            return result
+            return Err(message=f"Deleting user '{username}' is not finished, it will be retried: {result.message}", code=500)
 
-        result = await db_admin.delete_one({"username": username})
+        result = await db_admin.delete_one({"_id": user["_id"]})
         if not result.acknowledged or result.deleted_count == 0:
             return Err(message=f"Deleting user '{username}' failed.")
 
@@ -172,9 +532,13 @@ async def update_password(username: str, password: str) -> Err | str:
         if db_admin is None:
             return Err(message=f"Cannot get DB collection.")
 
-        credentials = Credentials(username=username, password=password)
+        hashed = await hash_password(password)
+        if isinstance(hashed, Err):
+            return hashed
+
+        credentials = Credentials(username=username, password=hashed)
         result = await db_admin.update_one(
-            {"username": credentials.username},
+            {"username": credentials.username, "state": {"$exists": False}},
             {"$set": {"password": credentials.password}})
 
         if not result.acknowledged or result.modified_count == 0:
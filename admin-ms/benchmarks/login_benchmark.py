@@ -0,0 +1,100 @@
+# Author: Nina Mislej
+# Date created: 14.01.2025
+
+"""
+Benchmark of concurrent logins.
+
+Runs ``--logins`` concurrent logins through ``validate_credentials`` with bcrypt checking the
+password on the event loop, as before, and on the hashing thread pool with an increasing
+number of workers. Reports the login throughput and the worst delay of a timer running on
+the event loop meanwhile. The database lookup is mocked, so only password checking is
+measured. Run from the `admin-ms` directory:
+
+    python -m benchmarks.login_benchmark --logins 64 --rounds 12
+"""
+
+import os
+import argparse
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+from bcrypt import hashpw, checkpw, gensalt
+
+from fastapi.security import OAuth2PasswordRequestForm
+
+from app.helpers import password_helpers
+from app.helpers.error import ErrorResponse as Err
+from app.services import credentials_utils
+
+USERNAME = "benchmark"
+PASSWORD = "benchmark-password"
+
+async def inline_check(password: str, hashed: str) -> bool:
+    """
+    Check the password on the event loop, as done before.
+    """
+
+    return checkpw(password.encode('utf8'), hashed.encode('utf8'))
+
+async def measure(logins: int) -> tuple[float, float]:
+    """
+    Run concurrent logins and return the throughput and the worst event loop delay in milliseconds.
+    """
+
+    lag = 0.0
+    done = asyncio.Event()
+
+    async def heartbeat():
+        nonlocal lag
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag = max(lag, time.perf_counter() - start - 0.01)
+
+    credentials = OAuth2PasswordRequestForm(username=USERNAME, password=PASSWORD)
+    timer = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(credentials_utils.validate_credentials(credentials) for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await timer
+
+    failed = sum(isinstance(result, Err) for result in results)
+    if failed:
+        raise SystemExit(f"{failed} logins failed.")
+    return logins / elapsed, lag * 1000
+
+def report(label: str, throughput: float, lag: float):
+    print(f"{label:>14}: {throughput:8.1f} logins/s  worst loop delay {lag:8.1f} ms")
+
+async def main(logins: int, rounds: int):
+    hashed = hashpw(PASSWORD.encode('utf8'), gensalt(rounds=rounds)).decode('utf8')
+    collection = AsyncMock()
+    collection.find_one.return_value = {"username": USERNAME, "password": hashed}
+
+    with (patch("app.services.credentials_utils.get_collection", AsyncMock(return_value=collection)),
+          patch("app.services.credentials_utils.create_access_token", AsyncMock(return_value="token"))):
+
+        with patch("app.services.credentials_utils.check_password", inline_check):
+            report("event loop", *await measure(logins))
+
+        workers = 1
+        while True:
+            with (patch.object(password_helpers, "PASSWORD_WORKERS", workers),
+                  patch.object(password_helpers, "PASSWORD_QUEUE_LIMIT", logins)):
+                password_helpers.close_executor()
+                report(f"{workers} workers", *await measure(logins))
+            if workers >= (os.cpu_count() or 1):
+                break
+            workers = min(workers * 2, os.cpu_count() or 1)
+
+    password_helpers.close_executor()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark concurrent logins.")
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.rounds))
@@ -9,4 +9,12 @@ from .test_credentials import (
     test_create_credentials,
     test_validate_credentials,
     test_delete_credentials,
-    test_update_password)
\ No newline at end of file
+    test_update_password,
+    test_password_hashing,
+    test_create_credentials_rollback,
+    test_create_credentials_concurrent,
+    test_resume_provisioning,
+    test_import_credentials,
+    test_login_rate_limit,
+    test_login_forwarded_address,
+    test_token_cache)
\ No newline at end of file
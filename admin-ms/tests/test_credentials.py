@@ -3,6 +3,11 @@
 
 # Enable async testing.
 import pytest
+import asyncio
+import threading
+import ipaddress
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from unittest.mock import AsyncMock, patch
 
 # OAuth2 dependencies.
@@ -10,10 +15,19 @@ from fastapi.security import (
     OAuth2PasswordBearer,
     OAuth2PasswordRequestForm)
 
+# Proxy headers dependencies.
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
 # Internal app dependencies.
+from app.api import credentials_api
 from app.services import credentials_utils as utils
+from app.models import CredentialsCreate
 from app.helpers import ErrorResponse as Err
 from app.helpers import get_collection as gc
+from app.helpers import database_helpers, password_helpers, rate_limit_helpers
+from skladischer_auth import token_utils
 from skladischer_auth.token_utils import create_access_token
 
 from .helpers import (
@@ -172,4 +186,308 @@ async def test_update_password(client, cleanup):
     response = await client.post(url=f"/credentials/{USERNAME}/update-password",
                                  params={"password": "New"},
                                  headers={"Authorization": f"Bearer {token.access_token}"})
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+
+@pytest.mark.anyio
+async def test_password_hashing(cleanup):
+    """
+    Test hashing and checking passwords on the hashing thread pool.
+
+    Asserts:
+        - A hashed password is checked successfully and a wrong password is not.
+        - Requests beyond the workers and the queue limit are rejected with a 503 status code.
+        - Cancelled requests count against the limit until their job finishes.
+    """
+
+    hashed = await password_helpers.hash_password(PASSWORD)
+    assert not isinstance(hashed, Err)
+    assert await password_helpers.check_password(PASSWORD, hashed) is True
+    assert await password_helpers.check_password("Wrong", hashed) is False
+
+    with (patch.object(password_helpers, "PASSWORD_WORKERS", 1),
+          patch.object(password_helpers, "PASSWORD_QUEUE_LIMIT", 1)):
+        results = await asyncio.gather(*(password_helpers.check_password(PASSWORD, hashed) for _ in range(3)))
+    assert results[:2] == [True, True]
+    assert isinstance(results[2], Err) and results[2].code == 503
+    assert password_helpers.password_stats()["rejected"] >= 1
+
+    # A cancelled request is counted until its job finishes.
+    release = threading.Event()
+    in_flight = password_helpers.password_stats()["in_flight"]
+    task = asyncio.create_task(password_helpers.run_hashing(release.wait))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    await asyncio.sleep(0.05)
+    assert password_helpers.password_stats()["in_flight"] == in_flight + 1
+    release.set()
+    for _ in range(100):
+        if password_helpers.password_stats()["in_flight"] == in_flight:
+            break
+        await asyncio.sleep(0.01)
+    assert password_helpers.password_stats()["in_flight"] == in_flight
+
+@pytest.mark.anyio
+@patch("app.services.credentials_utils.get_collection", get_collection)
+@patch("app.services.credentials_utils.create_storage_user", AsyncMock(return_value=USERNAME))
+@patch("app.services.credentials_utils.create_sensor_user", AsyncMock(return_value=Err(message="RPC Error.")))
+@patch("app.services.credentials_utils.delete_sensor_user", AsyncMock(return_value=USERNAME))
+async def test_create_credentials_rollback(client, cleanup):
+    """
+    Test rolling back a user that could not be created in every service.
+
+    Asserts:
+        - The credentials creation API responds with a 400 status code.
+        - The user is deleted in the service that created it and the credentials are removed.
+    """
+
+    with patch("app.services.credentials_utils.delete_storage_user", AsyncMock(return_value=USERNAME)) as delete:
+        response = await client.post(url=f"/credentials/create-credentials",
+                                     data={"username": USERNAME, "password": PASSWORD},
+                                     headers={"Content-Type": "application/x-www-form-urlencoded"})
+        assert response.status_code == 400
+        delete.assert_awaited_once_with(USERNAME)
+    cleanup.append(USERNAME)
+
+    db_admin = await get_collection()
+    assert await db_admin.find_one({"username": USERNAME}) is None
+
+@pytest.mark.anyio
+@patch("app.services.credentials_utils.get_collection", get_collection)
+@patch("app.helpers.database_helpers.get_collection", get_collection)
+@patch("app.services.credentials_utils.create_storage_user", AsyncMock(return_value=USERNAME))
+@patch("app.services.credentials_utils.create_sensor_user", AsyncMock(return_value=USERNAME))
+@patch("app.services.credentials_utils.create_storage_users", AsyncMock(side_effect=lambda names: {name: name for name in names}))
+@patch("app.services.credentials_utils.create_sensor_users", AsyncMock(side_effect=lambda names: {name: name for name in names}))
+async def test_create_credentials_concurrent(cleanup):
+    """
+    Test signups of a user that is stored by a concurrent signup after the existence check.
+
+    Asserts:
+        - The signup fails as already existing and the credentials of the other signup are kept.
+        - The import reports the user as already existing and creates the others.
+    """
+
+    usernames = [USERNAME, f"{USERNAME}-0"]
+    cleanup.extend(usernames)
+    assert await database_helpers.ensure_indexes()
+    db_admin = await get_collection()
+
+    # The other signup stores the user while the password is hashed.
+    async def racing(password: str) -> str:
+        await db_admin.update_one({"username": USERNAME}, {"$setOnInsert": {"password": "hash"}}, upsert=True)
+        return "hash"
+
+    with (patch("app.services.credentials_utils.hash_password", racing),
+          patch("app.services.credentials_utils.delete_storage_user", AsyncMock()) as delete):
+        result = await utils.create_credentials(OAuth2PasswordRequestForm(username=USERNAME, password=PASSWORD))
+        assert isinstance(result, Err) and "already exists" in result.message
+        delete.assert_not_awaited()
+    user = await db_admin.find_one({"username": USERNAME})
+    assert user is not None and "state" not in user
+
+    await db_admin.delete_one({"username": USERNAME})
+    with (patch("app.services.credentials_utils.hash_password", racing),
+          patch("app.services.credentials_utils.delete_storage_users", AsyncMock()) as delete):
+        result = await utils.import_credentials([CredentialsCreate(username=username, password=PASSWORD)
+                                                 for username in usernames])
+        delete.assert_not_awaited()
+    assert result.created == [usernames[1]]
+    assert [error.username for error in result.errors] == [USERNAME]
+    user = await db_admin.find_one({"username": USERNAME})
+    assert user is not None and "state" not in user
+
+@pytest.mark.anyio
+@patch("app.services.credentials_utils.get_collection", get_collection)
+@patch("app.services.credentials_utils.DEPROVISION_BACKOFF", 0)
+@patch("app.services.credentials_utils.delete_sensor_user", AsyncMock(return_value=USERNAME))
+async def test_resume_provisioning(cleanup):
+    """
+    Test finishing a deletion that failed and provisioning interrupted by a crash.
+
+    Asserts:
+        - A deletion keeps the credentials, which cannot log in, until all services deleted the user.
+        - Stale provisioning is rolled back and the credentials are removed.
+    """
+
+    cleanup.append(USERNAME)
+    db_admin = await get_collection()
+    await db_admin.insert_one({"username": USERNAME, "password": "hash"})
+
+    with patch("app.services.credentials_utils.delete_storage_user", AsyncMock(return_value=Err(message="RPC Error."))):
+        result = await utils.delete_credentials(USERNAME)
+    assert isinstance(result, Err)
+    user = await db_admin.find_one({"username": USERNAME})
+    assert user["state"] == utils.DELETING and list(user["services"]) == ["storage"]
+    result = await utils.validate_credentials(OAuth2PasswordRequestForm(username=USERNAME, password=PASSWORD))
+    assert isinstance(result, Err) and result.code == 401
+
+    with patch("app.services.credentials_utils.delete_storage_user", AsyncMock(return_value=USERNAME)):
+        result = await utils.delete_credentials(USERNAME)
+    assert result == USERNAME
+
+    # A signup interrupted after the storage microservice created the user.
+    await db_admin.insert_one({"username": USERNAME, "password": "hash", "state": utils.PROVISIONING,
+                               "services": {"storage": utils.CREATED, "sensor": utils.PENDING},
+                               "updated_at": datetime.now(timezone.utc) - timedelta(hours=1)})
+    with patch("app.services.credentials_utils.delete_storage_user", AsyncMock(return_value=USERNAME)) as delete:
+        assert await utils.resume_provisioning() == 1
+        delete.assert_awaited_once_with(USERNAME)
+    assert await db_admin.find_one({"username": USERNAME}) is None
+
+@pytest.mark.anyio
+@patch("app.services.credentials_utils.get_collection", get_collection)
+@patch("app.helpers.password_helpers.BCRYPT_ROUNDS", 4)
+@patch("app.helpers.rate_limit_helpers._memory", rate_limit_helpers.MemoryBuckets())
+@patch("app.api.credentials_api.ADMIN_USERNAMES", ["admin"])
+async def test_import_credentials(client, cleanup):
+    """
+    Test importing many users at once.
+
+    Asserts:
+        - The credentials import API responds with a 401 status code without a token.
+        - The credentials import API responds with a 403 status code for a user that is not an administrator.
+        - The credentials import API responds with a 200 status code.
+        - Users created in every service can log in, repeated and existing usernames are reported.
+        - A user one service failed to create is deleted in the other one and its credentials are removed.
+    """
+
+    usernames = [f"{USERNAME}-{index}" for index in range(3)]
+    cleanup.extend(usernames)
+    db_admin = await get_collection()
+    await db_admin.insert_one({"username": usernames[0], "password": "hash"})
+
+    created = AsyncMock(side_effect=lambda names: {name: name for name in names})
+    failed = AsyncMock(side_effect=lambda names: {name: Err(message="RPC Error.") if name == usernames[2] else name
+                                                  for name in names})
+    deleted = AsyncMock(side_effect=lambda names: {name: name for name in names})
+    users = [{"username": username, "password": PASSWORD} for username in usernames + [usernames[1]]]
+
+    # Test unsuccessful requests due to missing token and missing permission.
+    response = await client.post(url=f"/credentials/import-credentials", json=users)
+    assert response.status_code == 401
+    token = await create_access_token({"username": USERNAME})
+    response = await client.post(url=f"/credentials/import-credentials", json=users,
+                                 headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 403
+
+    token = await create_access_token({"username": "admin"})
+    with (patch("app.services.credentials_utils.create_storage_users", created),
+          patch("app.services.credentials_utils.create_sensor_users", failed),
+          patch("app.services.credentials_utils.delete_storage_users", deleted),
+          patch("app.services.credentials_utils.delete_sensor_users", AsyncMock())):
+        response = await client.post(url=f"/credentials/import-credentials", json=users,
+                                     headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json()["created"] == [usernames[1]]
+    assert [error["username"] for error in response.json()["errors"]] == [usernames[0], usernames[1], usernames[2]]
+    deleted.assert_awaited_once_with([usernames[2]])
+
+    result = await utils.validate_credentials(OAuth2PasswordRequestForm(username=usernames[1], password=PASSWORD))
+    assert not isinstance(result, Err)
+    assert await db_admin.find_one({"username": usernames[2]}) is None
+
+@pytest.mark.anyio
+@patch("app.services.credentials_utils.get_collection", get_collection)
+@patch("app.helpers.rate_limit_helpers._memory", rate_limit_helpers.MemoryBuckets())
+@patch("app.helpers.rate_limit_helpers.LOGIN_USER_BURST", 2)
+@patch("app.helpers.rate_limit_helpers.LOGIN_IP_BURST", 3)
+@patch("app.helpers.rate_limit_helpers._proxies", [])
+async def test_login_rate_limit(client, cleanup):
+    """
+    Test rejecting a flood of logins before the password is checked.
+
+    Asserts:
+        - Requests coming straight from a trusted proxy are not limited by address.
+        - Logins beyond the burst of a username are rejected with a 429 status code.
+        - Logins beyond the burst of a client address are rejected for every username.
+        - Rejected logins do not reach the database and are counted.
+    """
+
+    with patch("app.helpers.rate_limit_helpers._proxies", [ipaddress.ip_network("10.0.0.0/8")]):
+        assert rate_limit_helpers.login_address("10.1.2.3") is None
+        assert rate_limit_helpers.login_address("192.168.1.1") == "192.168.1.1"
+    stats = rate_limit_helpers.rate_limit_stats()
+    with patch("app.services.credentials_utils.get_collection", AsyncMock(return_value=None)) as collection:
+        statuses = [(await client.post(url=f"/credentials/login",
+                                       data={"username": USERNAME, "password": "Wrong"},
+                                       headers={"Content-Type": "application/x-www-form-urlencoded"})).status_code
+                    for _ in range(3)]
+        assert statuses[2] == 429 and 429 not in statuses[:2]
+        assert collection.await_count == 2
+
+        response = await client.post(url=f"/credentials/login",
+                                     data={"username": "Other", "password": "Wrong"},
+                                     headers={"Content-Type": "application/x-www-form-urlencoded"})
+        assert response.status_code == 429
+        assert collection.await_count == 2
+
+    result = rate_limit_helpers.rate_limit_stats()
+    assert result["rejected_username"] == stats["rejected_username"] + 1
+    assert result["rejected_ip"] == stats["rejected_ip"] + 1
+
+@pytest.mark.anyio
+@patch("app.helpers.rate_limit_helpers._memory", rate_limit_helpers.MemoryBuckets())
+@patch("app.helpers.rate_limit_helpers.LOGIN_IP_BURST", 2)
+@patch("app.helpers.rate_limit_helpers._proxies", [ipaddress.ip_network("35.191.0.0/16")])
+async def test_login_forwarded_address():
+    """
+    Test limiting logins by the forwarded client address behind trusted proxies.
+
+    Asserts:
+        - The rightmost untrusted 'X-Forwarded-For' entry is used as the client address.
+        - Spoofed leftmost entries do not create new buckets.
+        - Logins beyond the burst of the real client address are rejected with a 429 status code.
+    """
+
+    app = FastAPI()
+    app.include_router(credentials_api.router)
+    forwarded = ProxyHeadersMiddleware(app, trusted_hosts="35.191.0.0/16")
+    transport = ASGITransport(app=forwarded, client=("35.191.0.1", 443))
+    async with AsyncClient(transport=transport, base_url="http://test") as proxied:
+        with patch("app.services.credentials_utils.get_collection", AsyncMock(return_value=None)):
+            statuses = [(await proxied.post(url=f"/credentials/login",
+                                            data={"username": f"User{index}", "password": "Wrong"},
+                                            headers={"Content-Type": "application/x-www-form-urlencoded",
+                                                     "X-Forwarded-For": f"10.0.0.{index}, 203.0.113.7, 35.191.0.2"})
+                         ).status_code for index in range(3)]
+
+    assert statuses[2] == 429 and 429 not in statuses[:2]
+    assert [key for key in rate_limit_helpers._memory.buckets if key.startswith("ip:")] == ["ip:203.0.113.7"]
+
+@pytest.mark.anyio
+@patch("skladischer_auth.token_utils._verified", OrderedDict())
+async def test_token_cache():
+    """
+    Test caching verified tokens.
+
+    Asserts:
+        - A cached token is not decoded again and its claims cannot be changed by callers.
+        - Expired cache entries are evicted and the token is decoded again.
+        - Invalid tokens are not cached.
+        - The cache is disabled if its size is zero.
+    """
+
+    token = await create_access_token({"username": USERNAME})
+    with patch.object(token_utils.jwt, "decode", wraps=token_utils.jwt.decode) as decode:
+        claims = token_utils.decode_token(token)
+        claims["username"] = "Other"
+        assert token_utils.decode_token(token)["username"] == USERNAME
+        assert decode.call_count == 1
+
+        key, (_, cached) = next(iter(token_utils._verified.items()))
+        token_utils._verified[key] = (0, cached)
+        assert token_utils.decode_token(token)["username"] == USERNAME
+        assert decode.call_count == 2
+        assert token_utils._verified[key][0] > 0
+
+        assert token_utils.decode_token("invalid") is None
+        assert token_utils.decode_token("invalid") is None
+        assert decode.call_count == 4
+        assert len(token_utils._verified) == 1
+
+        token_utils._verified.clear()
+        with patch("skladischer_auth.token_utils.TOKEN_CACHE_SIZE", 0):
+            assert token_utils.decode_token(token)["username"] == USERNAME
+            assert token_utils.decode_token(token)["username"] == USERNAME
+        assert decode.call_count == 6
+        assert len(token_utils._verified) == 0
@@ -26,13 +26,13 @@ router = APIRouter(
 )
 
 @router.post("/create-code", status_code=200, response_class=PlainTextResponse)
-async def create_code(code_schema : schema.CodeCreate, token : str = Depends(token_bearer)):
+async def create_code(code_schema : schema.CodeCreate, claims : dict = Depends(token_bearer)):
     """
     This endpoint allows the creation of a new item code.
 
     Args:
         code_schema (ItemCreate): The code details to be created.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during item creation.
@@ -4,6 +4,8 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import PlainTextResponse
 from ..services.code_utils import check_reachable
+from ..services.cache_utils import cache_stats
+from ..config import CODE_RENDERER
 
 router = APIRouter()
 
@@ -11,9 +13,10 @@ router = APIRouter()
 async def health():
     """
     This endpoint allows liveness check for Kubernetes clusters.
+    The remote code generation API is only checked if codes are rendered remotely.
     """
 
-    if not await check_reachable():
+    if CODE_RENDERER == "remote" and not await check_reachable():
         raise HTTPException(status_code=400, detail="QR code api not reachable.")
     return "Status OK."
 
@@ -24,4 +27,21 @@ async def readiness():
     This endpoint allows rediness check for Kubernetes clusters.
     """
 
-    return "Status OK."
\ No newline at end of file
+    return "Status OK."
+
+@router.get("/metrics", status_code=200, response_class=PlainTextResponse)
+async def metrics():
+    """
+    This endpoint exposes in-process counters in Prometheus text format.
+    """
+
+    stats = cache_stats()
+    lines = [f"code_cache_size {stats['memory']['size']}",
+             f"code_cache_hits_total {stats['memory']['hits']}",
+             f"code_cache_misses_total {stats['memory']['misses']}"]
+    if stats["disk"] is not None:
+        lines += [f"code_disk_cache_size {stats['disk']['size']}",
+                  f"code_disk_cache_bytes {stats['disk']['bytes']}",
+                  f"code_disk_cache_hits_total {stats['disk']['hits']}",
+                  f"code_disk_cache_misses_total {stats['disk']['misses']}"]
+    return "\n".join(lines) + "\n"
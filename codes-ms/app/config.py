@@ -16,7 +16,35 @@ RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
 RAPIDAPI_URL = os.getenv("RAPIDAPI_URL")
 
 # QR Code parameters.
-SIZE = "300x300"
+SIZE = int(os.getenv("CODE_SIZE", 300))
+
+# Code rendering, either "local" or "remote".
+# If rendering locally fails the remote API is used when the fallback is enabled.
+CODE_RENDERER = os.getenv("CODE_RENDERER", "local")
+CODE_REMOTE_FALLBACK = os.getenv("CODE_REMOTE_FALLBACK", "false")
+CODE_RENDER_WORKERS = int(os.getenv("CODE_RENDER_WORKERS", os.cpu_count() or 1))
+
+# How many codes of a streamed batch are created at the same time.
+CODE_BATCH_CONCURRENCY = int(os.getenv("CODE_BATCH_CONCURRENCY", 16))
+
+# Cache of rendered codes. The disk tier is enabled by setting its directory.
+CODE_CACHE_SIZE = int(os.getenv("CODE_CACHE_SIZE", 1000))
+CODE_CACHE_TTL = float(os.getenv("CODE_CACHE_TTL", 3600.0))
+CODE_CACHE_DIR = os.getenv("CODE_CACHE_DIR")
+CODE_CACHE_DISK_MAX_BYTES = int(os.getenv("CODE_CACHE_DISK_MAX_BYTES", 256 * 1024 * 1024))
+CODE_CACHE_DISK_TTL = float(os.getenv("CODE_CACHE_DISK_TTL", 30 * 24 * 3600.0))
+
+# Shared HTTP client used for the remote code generation API.
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30.0))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 2.0))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 5.0))
+
+# Retries of failed HTTP requests with jittered exponential backoff.
+HTTP_MAX_ATTEMPTS = int(os.getenv("HTTP_MAX_ATTEMPTS", 3))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", 0.1))
+HTTP_MAX_BACKOFF = float(os.getenv("HTTP_MAX_BACKOFF", 2.0))
 
 # Other microservices.
 STORAGE_MS_HOST = os.getenv("STORAGE_MS_HOST")
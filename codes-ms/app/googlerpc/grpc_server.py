@@ -5,6 +5,7 @@
 from ..schemas import code_schemas as schema
 from ..helpers.error import ErrorResponse as Err
 from ..services import code_utils as utils
+from ..config import CODE_BATCH_CONCURRENCY
 
 # GRPC Logic.
 import asyncio
@@ -18,6 +19,26 @@ import grpc
 from ..logger_setup import get_logger
 logger = get_logger("codes-ms.googlerpc")
 
+# Render options that are only used if set in the request.
+CODE_OPTIONS = ("color", "background_color", "label", "label_size", "label_alignment", "size")
+
+def code_details(request) -> schema.CodeCreate:
+    """
+    Builds the code details from a GRPC request, unset options keep their defaults.
+
+    Args:
+        request (pb.CodeRequest): The GRPC request.
+
+    Returns:
+        CodeCreate: The code details.
+
+    Raises:
+        ValidationError: If an option is not valid.
+    """
+
+    options = {option: getattr(request, option) for option in CODE_OPTIONS if request.HasField(option)}
+    return schema.CodeCreate(code_id=request.item_code, **options)
+
 class CodeService(pb_grpc.CodeServiceServicer):
     """
     Handles the GRPC request for creating a code.
@@ -43,14 +64,75 @@ class CodeService(pb_grpc.CodeServiceServicer):
                              Returns an empty response with a 400 status if an error occurs.
         """
 
-        code_info = schema.CodeCreate(code_id=request.item_code)
-        result = await utils.create_code(code_info)
+        try:
+            code_info = code_details(request)
+        except ValueError as e:
+            result = Err(message=f"Invalid code details: {e}")
+        else:
+            result = await utils.create_code(code_info)
         if isinstance(result, Err):
             context.set_code(400)
             context.set_details(result.message)
             logger.warning(f"RPC Server failure: {result.message}")
             return pb.CodeResponse()
-        return pb.CodeResponse(image_base64=result)
+        return pb.CodeResponse(image_base64=result, item_code=request.item_code)
+
+    async def CreateCodes(self, request_iterator, context):
+        """
+        Handles the streaming gRPC request to create QR codes for many items.
+
+        At most ``CODE_BATCH_CONCURRENCY`` codes are created at the same time and
+        requests are only read from the stream when a slot is free. Responses are
+        sent as soon as a code is created, so they may not follow the request order.
+
+        Args:
+            request_iterator: The stream of requests, each containing an `item_code` and render options.
+            context: The gRPC context for managing request metadata and status.
+
+        Yields:
+            pb.CodeResponse: A response with the item code and the generated QR code as a Base64 string,
+                             or with an error message if the code could not be created.
+        """
+
+        semaphore = asyncio.Semaphore(CODE_BATCH_CONCURRENCY)
+        responses: asyncio.Queue = asyncio.Queue()
+        tasks: set[asyncio.Task] = set()
+
+        async def create(request):
+            try:
+                result = await utils.create_code(code_details(request))
+            except Exception as e:
+                result = Err(message=f"Invalid code details: {e}")
+            finally:
+                semaphore.release()
+
+            if isinstance(result, Err):
+                logger.warning(f"RPC Server failure for '{request.item_code}': {result.message}")
+                await responses.put(pb.CodeResponse(item_code=request.item_code, error=result.message))
+            else:
+                await responses.put(pb.CodeResponse(item_code=request.item_code, image_base64=result))
+
+        async def read():
+            try:
+                async for request in request_iterator:
+                    await semaphore.acquire()
+                    task = asyncio.create_task(create(request))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                await asyncio.gather(*tasks)
+            finally:
+                # NOTE: Marks the end of the stream, also if reading the requests failed.
+                await responses.put(None)
+
+        reader = asyncio.create_task(read())
+        try:
+            while (response := await responses.get()) is not None:
+                yield response
+            await reader
+        finally:
+            reader.cancel()
+            for task in list(tasks):
+                task.cancel()
 
 async def serve():
     """
@@ -3,4 +3,13 @@ The `helpers` module provides generic helper functions for managing the database
 """
 
 from .error import (
-    ErrorResponse)
\ No newline at end of file
+    ErrorResponse)
+
+from .cache_helpers import (
+    TTLCache,
+    DiskCache)
+
+from .http_helpers import (
+    get_client,
+    close_client,
+    request)
\ No newline at end of file
@@ -0,0 +1,175 @@
+# Author: Nina Mislej
+# Date created: 14.01.2025
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable
+import threading
+import time
+import os
+
+class TTLCache:
+    """
+    This class is a size-bounded in-process cache with least recently used eviction.
+    Entries expire ``ttl`` seconds after they were stored. Hits and misses are counted.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any | None:
+        """
+        Returns the cached value for ``key`` or None if it is missing or expired.
+        """
+
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        """
+        Stores ``value`` under ``key`` and evicts the least recently used entry if the cache is full.
+        """
+
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        """
+        Removes ``key`` from the cache if present.
+        """
+
+        self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]):
+        """
+        Removes every entry whose key matches ``predicate``.
+        """
+
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+
+    def clear(self):
+        """
+        Removes all entries. Counters are kept.
+        """
+
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns the size of the cache and its hit and miss counters.
+        """
+
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses}
+
+class DiskCache:
+    """
+    This class is a cache of byte values kept as files in a directory, so entries survive restarts.
+    Keys must be safe file names, such as hex digests. When the files exceed ``max_bytes`` in total
+    the least recently used ones are removed. Entries expire ``ttl`` seconds after they were stored.
+    Methods block on file access and are safe to call from several threads.
+    """
+
+    def __init__(self, directory: str | Path, max_bytes: int, ttl: float):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, int]] = OrderedDict()
+
+        # NOTE: Files left by a previous run are indexed from the oldest to the newest.
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = [(path.stat(), path.name) for path in self.directory.iterdir() if path.is_file() and not path.name.endswith(".tmp")]
+        for stat, key in sorted(files, key=lambda file: file[0].st_mtime):
+            self._entries[key] = (stat.st_mtime + self.ttl, stat.st_size)
+            self._bytes += stat.st_size
+        self._evict()
+
+    def get(self, key: str) -> bytes | None:
+        """
+        Returns the cached value for ``key`` or None if it is missing or expired.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+
+        try:
+            value = (self.directory / key).read_bytes()
+        except OSError:
+            with self._lock:
+                if key in self._entries:
+                    self._remove(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes):
+        """
+        Stores ``value`` under ``key`` and evicts the least recently used entries if the cache is full.
+        """
+
+        if len(value) > self.max_bytes:
+            return
+
+        # NOTE: The value is written to a temporary file first, so readers never see partial files.
+        path = self.directory / key
+        temporary = path.with_name(f"{key}.{threading.get_ident()}.tmp")
+        temporary.write_bytes(value)
+        os.replace(temporary, path)
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (time.time() + self.ttl, len(value))
+            self._bytes += len(value)
+            self._evict()
+
+    def _remove(self, key: str):
+        self._bytes -= self._entries.pop(key)[1]
+        (self.directory / key).unlink(missing_ok=True)
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        """
+        Returns the number of entries, their total size and the hit and miss counters.
+        """
+
+        return {
+            "size": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses}
@@ -0,0 +1,87 @@
+# Author: Nina Mislej
+# Date created: 14.01.2025
+
+import random
+import asyncio
+import httpx
+
+from ..config import (
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_TIMEOUT,
+    HTTP_MAX_ATTEMPTS,
+    HTTP_BACKOFF,
+    HTTP_MAX_BACKOFF)
+
+# logger default library.
+from ..logger_setup import get_logger
+logger = get_logger("codes-ms.helpers")
+
+# Responses that are retried since the server may answer differently a moment later.
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+# Long-lived client, its connection pool keeps connections and TLS sessions open between requests.
+_client: httpx.AsyncClient | None = None
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Returns the shared HTTP client, creating it if needed.
+
+    Returns:
+        httpx.AsyncClient: The shared client.
+    """
+
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY),
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT))
+    return _client
+
+async def close_client():
+    """
+    Closes the shared HTTP client and its connections.
+    """
+
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def request(method: str, url: str, attempts: int = HTTP_MAX_ATTEMPTS, **kwargs) -> httpx.Response:
+    """
+    Sends a request with the shared client and retries it on connection errors,
+    timeouts and temporary server errors. Retries wait for a random time up to an
+    exponentially growing backoff, so clients do not retry all at once.
+
+    Args:
+        method (str): The HTTP method.
+        url (str): The requested URL.
+        attempts (int): How many times the request is sent at most.
+        **kwargs: Passed to ``httpx.AsyncClient.request``.
+
+    Returns:
+        httpx.Response: The last response received.
+
+    Raises:
+        httpx.TransportError: If the last attempt failed without a response.
+    """
+
+    for attempt in range(attempts):
+        last = attempt == attempts - 1
+        try:
+            response = await get_client().request(method, url, **kwargs)
+            if response.status_code not in RETRY_STATUS_CODES or last:
+                return response
+            logger.debug(f"Retrying {method} request, status {response.status_code}.")
+        except httpx.TransportError as e:
+            if last:
+                raise
+            logger.debug(f"Retrying {method} request: {e!r}")
+
+        await asyncio.sleep(random.uniform(0, min(HTTP_MAX_BACKOFF, HTTP_BACKOFF * 2 ** attempt)))
@@ -5,10 +5,23 @@
 import asyncio
 import uvicorn
 from fastapi import FastAPI
+from contextlib import asynccontextmanager
 from .googlerpc.grpc_server import serve
 
 # Internal dependencies.
 from .api import code_api, health_check_api
+from .services.render_utils import start_renderer, stop_renderer
+from .helpers.http_helpers import get_client, close_client
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Opens the shared HTTP client at startup and closes its connections on shutdown.
+    """
+
+    get_client()
+    yield
+    await close_client()
 
 # TODO: dependencies should be managed on a microservice-to-microservice basis.
 #       Not every microservice has to import all dependencies from "pip freeze" output.
@@ -17,7 +30,8 @@ app = FastAPI(
     title="Code Generation Microservice",
     docs_url="/codes/docs-api",             # Swagger UI
     redoc_url="/codes/redoc",           # Redoc UI
-    openapi_url="/codes/openapi.json"   # OpenAPI schema URL
+    openapi_url="/codes/openapi.json",  # OpenAPI schema URL
+    lifespan=lifespan
 )
 
 # Logging default library.
@@ -37,8 +51,12 @@ async def start_grpc():
     await serve()
 
 async def main():
-    tasks = [start_api(), start_grpc()]
-    return await asyncio.gather(*tasks)
+    await start_renderer()
+    try:
+        tasks = [start_api(), start_grpc()]
+        return await asyncio.gather(*tasks)
+    finally:
+        stop_renderer()
 
 # Run the application with asyncio.
 if __name__ == "__main__":
@@ -3,6 +3,7 @@
 
 from typing import Optional
 from pydantic import BaseModel, Field
+from ..config import SIZE
 
 class CodeCreate(BaseModel):
     """
@@ -14,4 +15,5 @@ class CodeCreate(BaseModel):
     background_color: Optional[str] = Field(default="#FFFFFF")
     label: Optional[str] = None
     label_size: Optional[int] = 20
-    label_alignment: Optional[str] = "center"
\ No newline at end of file
+    label_alignment: Optional[str] = "center"
+    size: Optional[int] = Field(default=SIZE, ge=50, le=2000)
\ No newline at end of file
@@ -4,4 +4,14 @@ It serves as communication between models and the database.
 """
 
 from .code_utils import (
-    create_code)
+    create_code,
+    create_remote_code)
+
+from .render_utils import (
+    render_code,
+    start_renderer,
+    stop_renderer)
+
+from .cache_utils import (
+    cached_code,
+    cache_stats)
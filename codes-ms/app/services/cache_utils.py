@@ -0,0 +1,152 @@
+# Author: Nina Mislej
+# Date created: 14.01.2025
+
+import json
+import asyncio
+import hashlib
+from typing import Awaitable, Callable
+from PIL import ImageColor
+
+from ..schemas import code_schemas as schema
+from ..helpers.error import ErrorResponse as Err
+from ..helpers.cache_helpers import TTLCache, DiskCache
+from ..config import (
+    CODE_CACHE_SIZE,
+    CODE_CACHE_TTL,
+    CODE_CACHE_DIR,
+    CODE_CACHE_DISK_MAX_BYTES,
+    CODE_CACHE_DISK_TTL)
+
+# logger default library.
+from ..logger_setup import get_logger
+logger = get_logger("codes-ms.services")
+
+# NOTE: Increase when the rendered images change, so cached images on disk are not reused.
+RENDER_VERSION = 1
+
+code_cache = TTLCache(CODE_CACHE_SIZE, CODE_CACHE_TTL)
+disk_cache = DiskCache(CODE_CACHE_DIR, CODE_CACHE_DISK_MAX_BYTES, CODE_CACHE_DISK_TTL) if CODE_CACHE_DIR else None
+
+# Codes that are being created, so identical concurrent requests wait for the same result.
+_pending: dict[str, asyncio.Future] = {}
+
+def code_key(code: schema.CodeCreate) -> str:
+    """
+    Hash the code details into a cache key.
+    Details that do not change the image, such as label settings without a label
+    or different spellings of the same color, map to the same key.
+
+    Args:
+        code (CodeCreate): The code details.
+
+    Returns:
+        str: The hex digest of the normalized code details.
+    """
+
+    fields = code.model_dump()
+    for field in ("color", "background_color"):
+        try:
+            fields[field] = list(ImageColor.getrgb(fields[field]))
+        except (ValueError, AttributeError):
+            pass
+    if not fields["label"]:
+        fields["label"] = fields["label_size"] = fields["label_alignment"] = None
+    fields["version"] = RENDER_VERSION
+
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+async def get_cached_code(key: str) -> str | None:
+    """
+    Look up a code image in memory and then on disk.
+
+    Args:
+        key (str): The cache key of the code.
+
+    Returns:
+        str | None: The encoded image or None if it is not cached.
+    """
+
+    image = code_cache.get(key)
+    if image is not None or disk_cache is None:
+        return image
+
+    try:
+        image = await asyncio.to_thread(disk_cache.get, key)
+    except Exception as e:
+        logger.warning(f"Could not read cached code: {e}")
+        return None
+
+    if image is None:
+        return None
+    image = image.decode()
+    code_cache.set(key, image)
+    return image
+
+async def cache_code(key: str, image: str):
+    """
+    Store a code image in memory and on disk.
+
+    Args:
+        key (str): The cache key of the code.
+        image (str): The encoded image.
+    """
+
+    code_cache.set(key, image)
+    if disk_cache is None:
+        return
+
+    try:
+        await asyncio.to_thread(disk_cache.set, key, image.encode())
+    except Exception as e:
+        logger.warning(f"Could not write cached code: {e}")
+
+async def cached_code(code: schema.CodeCreate, create: Callable[[], Awaitable[Err | str]]) -> Err | str:
+    """
+    Return the cached image of a code or create it once.
+    Identical requests arriving while the image is created wait for the same result.
+    Errors are not cached.
+
+    Args:
+        code (CodeCreate): The code details.
+        create (Callable): Creates the encoded image if it is not cached.
+
+    Returns:
+        ErrorResponse | str: The error response if an error occurred or encoded image in string format otherwise.
+    """
+
+    key = code_key(code)
+    image = await get_cached_code(key)
+    if image is not None:
+        return image
+
+    pending = _pending.get(key)
+    if pending is not None:
+        await asyncio.wait({pending})
+        if not pending.cancelled():
+            return pending.result()
+
+    future = asyncio.get_running_loop().create_future()
+    _pending[key] = future
+    try:
+        result = await create()
+        if not isinstance(result, Err):
+            await cache_code(key, result)
+        future.set_result(result)
+        return result
+    finally:
+        if not future.done():
+            future.cancel()
+        if _pending.get(key) is future:
+            del _pending[key]
+
+def cache_stats() -> dict:
+    """
+    Return the statistics of the memory and disk caches.
+
+    Returns:
+        dict: The statistics of the memory cache and of the disk cache, which is None if disabled.
+    """
+
+    return {
+        "memory": code_cache.stats(),
+        "disk": disk_cache.stats() if disk_cache is not None else None}
@@ -1,21 +1,30 @@
 # Author: Jure
 # Date created: 4.12.2024
 
+from PIL import ImageColor
+
 from ..schemas import code_schemas as schema
 from ..helpers.error import ErrorResponse as Err
-from ..config import RAPIDAPI_HOST, RAPIDAPI_KEY, RAPIDAPI_URL, SIZE
+from ..config import RAPIDAPI_HOST, RAPIDAPI_KEY, RAPIDAPI_URL, CODE_RENDERER, CODE_REMOTE_FALLBACK
+from .render_utils import render_code, LABEL_ALIGNMENTS
+from .cache_utils import cached_code
 
 # Async HTTP client library.
 # FastAPI is used for creating endpoints however this is a library
 # used in a similar manner as curl commands that can process async functions.
-from httpx import AsyncClient
+# A single client is shared by all requests, see the HTTP helpers.
+from ..helpers.http_helpers import get_client, request
 
 # logger default library.
 from ..logger_setup import get_logger
 logger = get_logger("codes-ms.services")
 
 async def check_reachable():
-    response = await AsyncClient().get(RAPIDAPI_URL)
+    try:
+        response = await get_client().get(RAPIDAPI_URL)
+    except Exception as e:
+        logger.warning(f"Code generation API not reachable: {e}")
+        return False
     if response.status_code == 401:
         return True
     return False
@@ -32,19 +41,16 @@ async def generate_code(headers: dict, params: dict) -> Err | str:
            ErrorResponse | str: The error response if an error occurred or response text otherwise.
        """
 
-    response = await AsyncClient().get(RAPIDAPI_URL, headers=headers, params=params)
+    response = await request("GET", RAPIDAPI_URL, headers=headers, params=params)
     if response.status_code == 200:
         return response.text
 
     logger.debug(f"Item code generation failure: {response.text}")
     return Err(message=f"Could not generate code: {response.text}", code=response.status_code)
 
-# TODO: Should colors be represented in HEX?
-#        Good simple library for colors is 'webcolors'.
-async def create_code(code : schema.CodeCreate) -> Err | str:
+async def create_remote_code(code : schema.CodeCreate) -> Err | str:
     """
-    Create a QR code from ``code_id`` for later item identification.
-    Returnes a `Base64` encoded image of the QR code created.
+    Create a QR code using the remote code generation API.
 
     Args:
         code (CodeCreate): The code details to be created, adhering to the schema.
@@ -62,7 +68,7 @@ async def create_code(code : schema.CodeCreate) -> Err | str:
 
         params = {
             "data": code.code_id,
-            "size": SIZE,
+            "size": code.size,
             "foreground_color": code.color,
             "background_color": code.background_color
         }
@@ -77,4 +83,78 @@ async def create_code(code : schema.CodeCreate) -> Err | str:
 
     except Exception as e:
         logger.warning(f"Generating item code failure: {e}")
+        return Err(message=f"Unknown  exception: {e}", code=500)
+
+def validate_code(code : schema.CodeCreate) -> Err | schema.CodeCreate:
+    """
+    Check the code details before rendering and fill in defaults of unset options.
+    Both renderers get the same details, so a missing size keeps the configured ``SIZE``.
+
+    Args:
+        code (CodeCreate): The code details to be created, adhering to the schema.
+
+    Returns:
+        ErrorResponse | CodeCreate: The error response if the details are not valid, or the completed details.
+    """
+
+    defaults = schema.CodeCreate(code_id=code.code_id)
+    code = code.model_copy(update={field: getattr(defaults, field)
+                                   for field in ("color", "background_color", "size", "label_size", "label_alignment")
+                                   if getattr(code, field) is None})
+    if not 50 <= code.size <= 2000:
+        return Err(message=f"Invalid code details: size must be between 50 and 2000.")
+    for field in ("color", "background_color"):
+        try:
+            ImageColor.getrgb(getattr(code, field))
+        except ValueError:
+            return Err(message=f"Invalid code details: unknown {field.replace('_', ' ')} '{getattr(code, field)}'.")
+    if code.label and code.label_alignment not in LABEL_ALIGNMENTS:
+        return Err(message=f"Invalid code details: label alignment must be one of {', '.join(LABEL_ALIGNMENTS)}.")
+    return code
+
+async def create_code(code : schema.CodeCreate) -> Err | str:
+    """
+    Create a QR code from ``code_id`` for later item identification.
+    Returnes a `Base64` encoded PNG image of the QR code created.
+
+    Identical code details always produce the same image, so images are cached
+    and only created if they are not cached yet. Invalid details are rejected first.
+
+    Args:
+        code (CodeCreate): The code details to be created, adhering to the schema.
+
+    Returns:
+        ErrorResponse | str: The error response if an error occurred or encoded image in string format otherwise.
+    """
+
+    code = validate_code(code)
+    if isinstance(code, Err):
+        return code
+    return await cached_code(code, lambda: generate_image(code))
+
+async def generate_image(code : schema.CodeCreate) -> Err | str:
+    """
+    Generate the image of a QR code.
+    Codes are rendered locally in a process pool. The remote code generation API
+    is used instead if configured, or as a fallback when local rendering fails.
+
+    Args:
+        code (CodeCreate): The code details to be created, adhering to the schema.
+
+    Returns:
+        ErrorResponse | str: The error response if an error occurred or encoded image in string format otherwise.
+    """
+
+    if CODE_RENDERER == "remote":
+        return await create_remote_code(code)
+
+    try:
+        return await render_code(code)
+
+    except ValueError as e:
+        return Err(message=f"Invalid code details: {e}")
+    except Exception as e:
+        logger.warning(f"Rendering item code failure: {e}")
+        if CODE_REMOTE_FALLBACK == "true":
+            return await create_remote_code(code)
         return Err(message=f"Unknown  exception: {e}", code=500)
\ No newline at end of file
@@ -0,0 +1,144 @@
+# Author: Nina Mislej
+# Date created: 14.01.2025
+
+import io
+import base64
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# QR code and image libraries.
+import qrcode
+from qrcode.constants import ERROR_CORRECT_M
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+from ..schemas import code_schemas as schema
+from ..config import CODE_RENDER_WORKERS
+
+# logger default library.
+from ..logger_setup import get_logger
+logger = get_logger("codes-ms.services")
+
+LABEL_ALIGNMENTS = ("left", "center", "right")
+LABEL_MARGIN = 10
+
+# NOTE: Rendering is CPU bound, so it runs in worker processes and never blocks the event loop.
+#       Workers are spawned instead of forked because the GRPC runtime is not fork safe.
+_executor: ProcessPoolExecutor | None = None
+
+def get_executor() -> ProcessPoolExecutor:
+    """
+    Return the process pool used for rendering, creating it on first use.
+
+    Returns:
+        ProcessPoolExecutor: The rendering process pool.
+    """
+
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=CODE_RENDER_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+async def start_renderer():
+    """
+    Start the rendering workers ahead of the first request by rendering a single code.
+    """
+
+    await render_code(schema.CodeCreate(code_id="warm-up"))
+    logger.info(f"Code renderer started with {CODE_RENDER_WORKERS} workers.")
+
+def stop_renderer():
+    """
+    Shut down the rendering workers.
+    """
+
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+def render_png(code: dict) -> bytes:
+    """
+    Render a QR code with an optional label below it as a PNG image.
+    This function runs in a worker process, so it only takes and returns plain values.
+
+    Args:
+        code (dict): The code details, adhering to the ``CodeCreate`` schema.
+
+    Returns:
+        bytes: The PNG image.
+
+    Raises:
+        ValueError: If a color or the label alignment is not valid.
+    """
+
+    color = ImageColor.getrgb(code["color"])
+    background_color = ImageColor.getrgb(code["background_color"])
+    size = code["size"]
+
+    qr = qrcode.QRCode(error_correction=ERROR_CORRECT_M, box_size=10, border=4)
+    qr.add_data(code["code_id"])
+    qr.make(fit=True)
+    image = qr.make_image(fill_color=color, back_color=background_color).get_image()
+    image = image.convert("RGB").resize((size, size), Image.Resampling.NEAREST)
+
+    if code.get("label"):
+        alignment = code.get("label_alignment") or "center"
+        if alignment not in LABEL_ALIGNMENTS:
+            raise ValueError(f"Label alignment must be one of {', '.join(LABEL_ALIGNMENTS)}.")
+
+        font = ImageFont.load_default(size=code.get("label_size") or 20)
+        left, top, right, bottom = font.getbbox(code["label"])
+        text_width, text_height = right - left, bottom - top
+
+        canvas = Image.new("RGB", (size, size + text_height + 2 * LABEL_MARGIN), background_color)
+        canvas.paste(image, (0, 0))
+        if alignment == "left":
+            x = LABEL_MARGIN
+        elif alignment == "right":
+            x = size - LABEL_MARGIN - text_width
+        else:
+            x = (size - text_width) // 2
+        ImageDraw.Draw(canvas).text((x - left, size + LABEL_MARGIN - top), code["label"], font=font, fill=color)
+        image = canvas
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+def render_base64(code: dict) -> str:
+    """
+    Render a QR code as a Base64 encoded PNG image.
+
+    Args:
+        code (dict): The code details, adhering to the ``CodeCreate`` schema.
+
+    Returns:
+        str: The Base64 encoded image.
+    """
+
+    return base64.b64encode(render_png(code)).decode()
+
+async def render_code(code: schema.CodeCreate) -> str:
+    """
+    Render a QR code in the process pool.
+
+    Args:
+        code (CodeCreate): The code details to be rendered.
+
+    Returns:
+        str: The Base64 encoded image.
+
+    Raises:
+        ValueError: If the code details cannot be rendered.
+    """
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_executor(), render_base64, code.model_dump())
+    except BrokenProcessPool:
+        # NOTE: A worker died, the pool is replaced so the next request can be served.
+        stop_renderer()
+        raise
@@ -3,4 +3,6 @@ The `tests` module provides utility functions for testing endpoints and database
 """
 
 from .test_codes import (
-    test_create_code)
\ No newline at end of file
+    test_create_code,
+    test_render_code,
+    test_code_cache)
\ No newline at end of file
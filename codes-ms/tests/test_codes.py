@@ -1,11 +1,14 @@
 # Enable async testing.
 import pytest
+import base64
 from unittest.mock import AsyncMock, patch
 
 # Internal app dependencies.
-from app.services import code_utils
+from app.services import code_utils, cache_utils
 from app.schemas import code_schemas
 from app.helpers import ErrorResponse as Err
+from app.helpers import DiskCache
+from app.config import SIZE
 from bson import ObjectId as Id
 
 from skladischer_auth.token_utils import create_access_token
@@ -17,18 +20,95 @@ from skladischer_auth.token_utils import create_access_token
 async def test_create_code(client, encoded_image):
     """
     Test creating a QR code based on user.
-    The call to the code generation API is mimicked in order to avoid third party API calls in tests.
+    Rendering and the call to the code generation API are mimicked in order to avoid third party API calls in tests.
 
     Asserts:
         - The item creation API responds with a 200 status code.
+        - A code without a size is rendered with the configured size, also by the code generation API.
     """
 
     # Test successful request.
-    with patch("app.services.code_utils.generate_code", AsyncMock(return_value=encoded_image)):
+    render_code = AsyncMock(return_value=encoded_image.decode())
+    with patch("app.services.code_utils.render_code", render_code):
         code_id =  str(Id())
         token = await create_access_token({"username": "GenericUser"})
         code_data = code_schemas.CodeCreate(code_id=code_id, label="test code").model_dump()
+        code_data["size"] = None
         response = await client.post(url=f"/codes/create-code",
                                      headers={"Authorization": f"Bearer {token}"},
                                      json=code_data)
         assert response.status_code == 200
+        assert render_code.await_args.args[0].size == SIZE
+
+    # Test the code generation API.
+    with (patch("app.services.code_utils.CODE_RENDERER", "remote"),
+          patch("app.services.code_utils.generate_code", AsyncMock(return_value=encoded_image.decode())) as generate_code):
+        result = await code_utils.create_code(code_schemas.CodeCreate(code_id=str(Id()), size=None))
+        assert result == encoded_image.decode()
+        assert generate_code.await_args.args[1]["size"] == SIZE
+
+@pytest.mark.anyio
+async def test_render_code(client):
+    """
+    Test rendering a QR code locally without calling the code generation API.
+
+    Asserts:
+        - The code creation API responds with a 200 status code and a Base64 encoded PNG image.
+        - The code creation API responds with a 400 status code for an invalid color.
+    """
+
+    # Test successful request.
+    with patch("app.services.code_utils.generate_code", AsyncMock()) as generate_code:
+        token = await create_access_token({"username": "GenericUser"})
+        code_data = code_schemas.CodeCreate(code_id=str(Id()), label="test code", label_alignment="left",
+                                            color="#1E90FF", size=200).model_dump()
+        response = await client.post(url=f"/codes/create-code",
+                                     headers={"Authorization": f"Bearer {token}"},
+                                     json=code_data)
+        assert response.status_code == 200
+        assert base64.b64decode(response.text).startswith(b"\x89PNG")
+        generate_code.assert_not_called()
+
+        # Test invalid color.
+        code_data["color"] = "not a color"
+        response = await client.post(url=f"/codes/create-code",
+                                     headers={"Authorization": f"Bearer {token}"},
+                                     json=code_data)
+        assert response.status_code == 400
+
+        # Test invalid background color.
+        code_data["color"] = "#1E90FF"
+        code_data["background_color"] = "not a color"
+        response = await client.post(url=f"/codes/create-code",
+                                     headers={"Authorization": f"Bearer {token}"},
+                                     json=code_data)
+        assert response.status_code == 400
+
+@pytest.mark.anyio
+async def test_code_cache(tmp_path, encoded_image):
+    """
+    Test that identical codes are rendered once and kept in the memory and disk caches.
+
+    Asserts:
+        - Identical code details, including different spellings of a color, are rendered once.
+        - A code is read from the disk cache when the memory cache is empty.
+    """
+
+    disk_cache = DiskCache(tmp_path, max_bytes=1024 * 1024, ttl=60)
+    render_code = AsyncMock(return_value=encoded_image.decode())
+    with (patch("app.services.code_utils.render_code", render_code),
+          patch("app.services.cache_utils.disk_cache", disk_cache)):
+        code_id = str(Id())
+        first = await code_utils.create_code(code_schemas.CodeCreate(code_id=code_id, color="#000000"))
+        second = await code_utils.create_code(code_schemas.CodeCreate(code_id=code_id, color="black"))
+        assert first == second == encoded_image.decode()
+        assert render_code.await_count == 1
+
+        cache_utils.code_cache.clear()
+        third = await code_utils.create_code(code_schemas.CodeCreate(code_id=code_id))
+        assert third == first
+        assert render_code.await_count == 1
+        assert disk_cache.stats()["hits"] == 1
+
+        await code_utils.create_code(code_schemas.CodeCreate(code_id=code_id, label="test code"))
+        assert render_code.await_count == 2
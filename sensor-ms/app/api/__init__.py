@@ -8,7 +8,8 @@ from .sensor_api import (
     create_temperature_sensor,
     get_sensor,
     delete_sensor,
-    update_sensor_name)
+    update_sensor_name,
+    get_sensor_readings)
 
 from .users_api import (
     create_user,
@@ -18,4 +19,5 @@ from .users_api import (
 
 from .sensor_data_api import (
     receive_sensor_data,
+    receive_sensor_data_batch,
     get_sensor_data)
\ No newline at end of file
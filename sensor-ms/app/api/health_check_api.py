@@ -2,21 +2,25 @@
 # Date created: 5.12.2024
 
 # REST FastAPI dependencies.
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends
 from fastapi.responses import PlainTextResponse
 from fastapi.exceptions import HTTPException
+from motor.motor_asyncio import AsyncIOMotorCollection
+
 # Internal dependencies.
-from ..helpers.database_helpers import get_collection
+from ..helpers.database_helpers import collection_dependency, ping_collection
+from ..services.sensor_utils import sensor_cache
 
 router = APIRouter()
 
 @router.get("/liveness", status_code=200, response_class=PlainTextResponse)
-async def health():
+async def health(collection: AsyncIOMotorCollection | None = Depends(collection_dependency)):
     """
     This endpoint allows liveness check for Kubernetes clusters.
+    It pings the shared database collection and revalidates it if the ping fails.
     """
 
-    if await get_collection() is None:
+    if collection is None or not await ping_collection():
         raise HTTPException(status_code=400, detail="Database not found.")
     return "Status OK."
 
@@ -27,4 +31,15 @@ async def readiness():
     This endpoint allows readiness check for Kubernetes clusters.
     """
 
-    return "Status OK."
\ No newline at end of file
+    return "Status OK."
+
+@router.get("/metrics", status_code=200, response_class=PlainTextResponse)
+async def metrics():
+    """
+    This endpoint exposes in-process counters in Prometheus text format.
+    """
+
+    stats = sensor_cache.stats()
+    return (f"sensor_cache_size {stats['size']}\n"
+            f"sensor_cache_hits_total {stats['hits']}\n"
+            f"sensor_cache_misses_total {stats['misses']}\n")
@@ -4,6 +4,7 @@
 # REST FastAPI dependencies.
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import PlainTextResponse
+from datetime import datetime
 
 # OAuth2 authentication dependencies.
 from skladischer_auth.token_bearer import JWTBearer
@@ -11,6 +12,7 @@ from skladischer_auth.token_utils import validate_token_with_username
 
 # Internal dependencies.
 from ..services import sensor_utils as utils
+from ..services import reading_utils
 from ..schemas import sensor_schemas as schema
 from ..helpers.error import ErrorResponse as Err
 
@@ -26,14 +28,14 @@ router = APIRouter(
 )
 
 @router.post("/{username}/create-temperature-sensor", status_code=200, response_class=PlainTextResponse)
-async def create_temperature_sensor(username: str, sensor_schema: schema.TemperatureSensorCreate, token : str = Depends(token_bearer)):
+async def create_temperature_sensor(username: str, sensor_schema: schema.TemperatureSensorCreate, claims : dict = Depends(token_bearer)):
     """
     This endpoint allows creating new temperature sensor for the user.
 
     Args:
         username (str): The username of the user.
         sensor_schema (TemperatureSensorCreate): The details of the sensor.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during creation.
@@ -43,7 +45,7 @@ async def create_temperature_sensor(username: str, sensor_schema: schema.Tempera
     """
 
     logger.debug("Create temperature sensor endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.create_temperature_sensor(username, sensor_schema)
@@ -53,14 +55,14 @@ async def create_temperature_sensor(username: str, sensor_schema: schema.Tempera
     return result
 
 @router.post("/{username}/create-humidity-sensor", status_code=200, response_class=PlainTextResponse)
-async def create_humidity_sensor(username: str, sensor_schema: schema.HumiditySensorCreate, token : str = Depends(token_bearer)):
+async def create_humidity_sensor(username: str, sensor_schema: schema.HumiditySensorCreate, claims : dict = Depends(token_bearer)):
     """
     This endpoint allows creating new humidity sensor for the user.
 
     Args:
         username (str): The username of the user.
         sensor_schema (HumiditySensorCreate): The details of the sensor.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during creation.
@@ -70,7 +72,7 @@ async def create_humidity_sensor(username: str, sensor_schema: schema.HumiditySe
     """
 
     logger.debug("Create humidity sensor endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.create_humidity_sensor(username, sensor_schema)
@@ -80,14 +82,14 @@ async def create_humidity_sensor(username: str, sensor_schema: schema.HumiditySe
     return result
 
 @router.post("/{username}/create-door-sensor", status_code=200, response_class=PlainTextResponse)
-async def create_door_sensor(username: str, sensor_schema: schema.DoorSensorCreate, token : str = Depends(token_bearer)):
+async def create_door_sensor(username: str, sensor_schema: schema.DoorSensorCreate, claims : dict = Depends(token_bearer)):
     """
     This endpoint allows creating new door sensor for the user.
 
     Args:
         username (str): The username of the user.
         sensor_schema (DoorSensorCreate): The details of the sensor.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during creation.
@@ -97,7 +99,7 @@ async def create_door_sensor(username: str, sensor_schema: schema.DoorSensorCrea
     """
 
     logger.debug("Create door sensor endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.create_door_sensor(username, sensor_schema)
@@ -107,14 +109,14 @@ async def create_door_sensor(username: str, sensor_schema: schema.DoorSensorCrea
     return result
 
 @router.get("/{username}/{sensor_name}", status_code=200, response_model=schema.GetSensor)
-async def get_sensor(username: str, sensor_name: str, token : str = Depends(token_bearer)):
+async def get_sensor(username: str, sensor_name: str, claims : dict = Depends(token_bearer)):
     """
     This endpoint allows fetching of a sensor for the user.
 
     Args:
         username (str): The username of the user.
         sensor_name (str): The name of the sensor.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during fetching.
@@ -124,7 +126,7 @@ async def get_sensor(username: str, sensor_name: str, token : str = Depends(toke
     """
 
     logger.debug("Get sensor endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.get_sensor(username, sensor_name)
@@ -134,14 +136,14 @@ async def get_sensor(username: str, sensor_name: str, token : str = Depends(toke
     return result
 
 @router.delete("/{username}/{sensor_name}", status_code=200, response_class=PlainTextResponse)
-async def delete_sensor(username: str, sensor_name: str, token : str = Depends(token_bearer)):
+async def delete_sensor(username: str, sensor_name: str, claims : dict = Depends(token_bearer)):
     """
     This endpoint allows deleting a sensor of the user.
 
     Args:
         username (str): The username of the user.
         sensor_name (str): The name of the sensor.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during deletion.
@@ -151,7 +153,7 @@ async def delete_sensor(username: str, sensor_name: str, token : str = Depends(t
     """
 
     logger.debug("Delete sensor endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.delete_sensor(username, sensor_name)
@@ -161,7 +163,7 @@ async def delete_sensor(username: str, sensor_name: str, token : str = Depends(t
     return result
 
 @router.put("/{username}/{sensor_name}/update-name", status_code=200, response_class=PlainTextResponse)
-async def update_sensor_name(username: str, sensor_name: str, new_name: str, token : str = Depends(token_bearer)):
+async def update_sensor_name(username: str, sensor_name: str, new_name: str, claims : dict = Depends(token_bearer)):
     """
     This endpoint allows updating sensor's name.
 
@@ -169,7 +171,7 @@ async def update_sensor_name(username: str, sensor_name: str, new_name: str, tok
         username (str): The username of the user.
         sensor_name (str): The name of the sensor to be changed.
         new_name (str): The new name of the sensor.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during name update.
@@ -179,11 +181,46 @@ async def update_sensor_name(username: str, sensor_name: str, new_name: str, tok
     """
 
     logger.debug("Update sensor endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.update_sensor_name(username, sensor_name, new_name)
     if isinstance(result, Err):
         raise HTTPException(status_code=result.code, detail=result.message)
 
-    return result
\ No newline at end of file
+    return result
+
+@router.get("/{username}/{sensor_name}/readings", status_code=200, response_model=schema.SensorReadings)
+async def get_sensor_readings(username: str, sensor_name: str, start: datetime | None = None, end: datetime | None = None,
+                              granularity: str = "hour", claims : dict = Depends(token_bearer)):
+    """
+    This endpoint allows fetching the history of a sensor in a time range.
+
+    Args:
+        username (str): The username of the user.
+        sensor_name (str): The name of the sensor.
+        start (datetime | None): Beginning of the range, one day before the end by default.
+        end (datetime | None): End of the range, the current time by default.
+        granularity (str): One of 'raw', 'minute', 'hour' or 'day'.
+        claims (dict): Claims of the access token generated at login time.
+
+    Raises:
+        HTTPException: If an error occurs during fetching.
+
+    Returns:
+        SensorReadings: The minimum, maximum, mean and count of readings for every time bucket.
+    """
+
+    logger.debug("Get sensor readings endpoint request.")
+    if not await validate_token_with_username(username, claims):
+        raise HTTPException(status_code=401, detail="Token username missmatch.")
+
+    sensor = await utils.get_sensor(username, sensor_name)
+    if isinstance(sensor, Err):
+        raise HTTPException(status_code=sensor.code, detail=sensor.message)
+
+    result = await reading_utils.get_readings(username, sensor_name, start, end, granularity)
+    if isinstance(result, Err):
+        raise HTTPException(status_code=result.code, detail=result.message)
+
+    return result
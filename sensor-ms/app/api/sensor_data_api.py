@@ -2,7 +2,7 @@
 # Date created: 5.12.2024
 
 # REST FastAPI dependencies.
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import PlainTextResponse
 
 # OAuth2 authentication dependencies.
@@ -12,8 +12,11 @@ from skladischer_auth.token_utils import validate_token_with_username
 # Internal dependencies.
 from ..schemas import sensor_schemas, user_schemas
 from ..helpers.error import ErrorResponse as Err
+from ..helpers.request_helpers import parse_readings
+from ..config import SENSOR_BATCH_MAX_SIZE, SENSOR_READING_MAX_BYTES
 from ..rabitmq.sensor_data_exchange import (
     send_to_channel,
+    send_batch_to_channel,
     receive_from_channel)
 
 # Logging default library.
@@ -49,14 +52,44 @@ async def receive_sensor_data(data: dict ):
 
     return result
 
+@router.post("/sensor-data/batch", response_model=sensor_schemas.SensorDataBatch)
+async def receive_sensor_data_batch(request: Request):
+    """
+    API endpoint to receive many sensor readings at once and send them to RabbitMQ for processing.
+    Gateway devices buffering readings should be sending data to this endpoint.
+    The body is either a JSON array of readings or an NDJSON stream with one reading per line
+    (``Content-Type: application/x-ndjson``).
+
+    Args:
+        request (Request): The HTTP request carrying the readings.
+
+    Returns:
+        sensor_schemas.SensorDataBatch: The processing status of every reading.
+
+    Raises:
+        HTTPException: If the body cannot be parsed or the batch cannot be processed.
+    """
+
+    readings = await parse_readings(request, SENSOR_BATCH_MAX_SIZE, SENSOR_READING_MAX_BYTES)
+    if isinstance(readings, Err):
+        raise HTTPException(status_code=readings.code, detail=readings.message)
+
+    result = await send_batch_to_channel(readings)
+    if isinstance(result, Err):
+        raise HTTPException(status_code=result.code, detail=result.message)
+
+    return result
+
 @router.post("/{username}/sensor-data", response_model=user_schemas.GetSensorData)
-async def get_sensor_data(username: str, token : str = Depends(token_bearer) ):
+async def get_sensor_data(username: str, claims : dict = Depends(token_bearer) ):
     """
     API endpoint to retrieve processed sensor data for a user from RabbitMQ.
+    Only a bounded number of messages is read per request. If ``has_more`` is set
+    in the response, the remaining messages can be read with another request.
 
     Args:
         username (str): The username for which sensor data is retrieved.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Returns:
         user_schemas.GetSensorData: The aggregated and processed sensor data.
@@ -66,7 +99,7 @@ async def get_sensor_data(username: str, token : str = Depends(token_bearer) ):
     """
 
     logger.debug("Get sensor data for user endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await receive_from_channel(username)
@@ -27,13 +27,13 @@ router = APIRouter(
 )
 
 @router.post("/create-user", status_code=200, response_class=PlainTextResponse)
-async def create_user(user_schema : schema.UserCreate, token : str = Depends(token_bearer) ):
+async def create_user(user_schema : schema.UserCreate, claims : dict = Depends(token_bearer) ):
     """
     This endpoint allows creating a new user in the system.
 
     Args:
         user_schema (UserCreate): The details of the user to create.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during user creation.
@@ -50,13 +50,13 @@ async def create_user(user_schema : schema.UserCreate, token : str = Depends(tok
     return result
 
 @router.get("/{username}", response_model=User)
-async def get_user(username: str, token : str = Depends(token_bearer) ):
+async def get_user(username: str, claims : dict = Depends(token_bearer) ):
     """
     This endpoint fetches the details of a user from the system.
 
     Args:
         username (str): The username of the user to retrieve.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during user retrieval.
@@ -66,7 +66,7 @@ async def get_user(username: str, token : str = Depends(token_bearer) ):
     """
 
     logger.debug("Get user endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.get_user(username)
@@ -76,13 +76,13 @@ async def get_user(username: str, token : str = Depends(token_bearer) ):
     return result
 
 @router.delete("/{username}", status_code=200, response_class=PlainTextResponse)
-async def delete_user(username: str, token : str = Depends(token_bearer) ):
+async def delete_user(username: str, claims : dict = Depends(token_bearer) ):
     """
     This endpoint removes a user from the system by their username.
 
     Args:
         username (str): The username of the user to delete.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during user deletion.
@@ -92,7 +92,7 @@ async def delete_user(username: str, token : str = Depends(token_bearer) ):
     """
 
     logger.debug("Delete user endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.delete_user(username)
@@ -102,13 +102,13 @@ async def delete_user(username: str, token : str = Depends(token_bearer) ):
     return result
 
 @router.put("/{username}/delete-sensors", status_code=200, response_class=PlainTextResponse)
-async def delete_sensors(username: str, token : str = Depends(token_bearer) ):
+async def delete_sensors(username: str, claims : dict = Depends(token_bearer) ):
     """
     This endpoint clears all storages in a user's account.
 
     Args:
         username (str): The username of the user whose sensors will be deleted.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during storages clearing.
@@ -118,7 +118,7 @@ async def delete_sensors(username: str, token : str = Depends(token_bearer) ):
     """
 
     logger.debug("Delete user sensors endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.delete_sensors(username)
@@ -15,8 +15,40 @@ MONGO_URL = os.getenv("DATABASE_URL")
 DATABASE_NAME = os.getenv("DATABASE_NAME")
 COLLECTION = os.getenv("COLLECTION")
 
+# Database connection pool.
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 60000))
+
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST")
 RABBITMQ_USER = os.getenv("RABBITMQ_USER")
 RABBITMQ_PASSWORD = os.getenv("RABBITMQ_PASSWORD")
 
+# RabbitMQ publisher.
+RABBITMQ_CHANNEL_POOL_SIZE = int(os.getenv("RABBITMQ_CHANNEL_POOL_SIZE", 4))
+RABBITMQ_PUBLISH_BATCH_SIZE = int(os.getenv("RABBITMQ_PUBLISH_BATCH_SIZE", 100))
+RABBITMQ_PUBLISH_QUEUE_SIZE = int(os.getenv("RABBITMQ_PUBLISH_QUEUE_SIZE", 10000))
+RABBITMQ_PUBLISH_TIMEOUT = float(os.getenv("RABBITMQ_PUBLISH_TIMEOUT", 5.0))
+
+# RabbitMQ queue draining budget per request.
+RABBITMQ_DRAIN_MAX_MESSAGES = int(os.getenv("RABBITMQ_DRAIN_MAX_MESSAGES", 1000))
+RABBITMQ_DRAIN_MAX_TIME = float(os.getenv("RABBITMQ_DRAIN_MAX_TIME", 2.0))
+
+# Sensor data batch ingest.
+SENSOR_BATCH_MAX_SIZE = int(os.getenv("SENSOR_BATCH_MAX_SIZE", 1000))
+SENSOR_READING_MAX_BYTES = int(os.getenv("SENSOR_READING_MAX_BYTES", 4096))
+
+# Users created or deleted together over a streaming RPC are written in batches of this size.
+USER_BATCH_SIZE = int(os.getenv("USER_BATCH_SIZE", 500))
+
+# Sensor metadata cache.
+SENSOR_CACHE_SIZE = int(os.getenv("SENSOR_CACHE_SIZE", 10000))
+SENSOR_CACHE_TTL = float(os.getenv("SENSOR_CACHE_TTL", 60.0))
+
+# Sensor reading history.
+READINGS_COLLECTION = os.getenv("READINGS_COLLECTION", "sensor-readings")
+ROLLUPS_COLLECTION = os.getenv("ROLLUPS_COLLECTION", "sensor-rollups")
+SENSOR_READINGS_RETENTION = int(os.getenv("SENSOR_READINGS_RETENTION", 7 * 24 * 3600))
+SENSOR_READINGS_MAX_POINTS = int(os.getenv("SENSOR_READINGS_MAX_POINTS", 10000))
+
 GOOGLE_CLOUD_LOGGING = os.getenv("GOOGLE_CLOUD_LOGGING")
\ No newline at end of file
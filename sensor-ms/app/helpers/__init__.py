@@ -3,7 +3,19 @@ The `helpers` module provides generic helper functions for managing the database
 """
 
 from .database_helpers import (
-    get_collection)
+    get_collection,
+    resolve_collection,
+    invalidate_collection,
+    ping_collection,
+    collection_dependency,
+    ensure_indexes,
+    close_client)
+
+from .cache_helpers import (
+    TTLCache)
 
 from .error import (
-    ErrorResponse)
\ No newline at end of file
+    ErrorResponse)
+
+from .request_helpers import (
+    parse_readings)
\ No newline at end of file
@@ -0,0 +1,79 @@
+# Author: Nina Mislej
+# Date created: 5.12.2024
+
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+import time
+
+class TTLCache:
+    """
+    This class is a size-bounded in-process cache with least recently used eviction.
+    Entries expire ``ttl`` seconds after they were stored. Hits and misses are counted.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any | None:
+        """
+        Returns the cached value for ``key`` or None if it is missing or expired.
+        """
+
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        """
+        Stores ``value`` under ``key`` and evicts the least recently used entry if the cache is full.
+        """
+
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        """
+        Removes ``key`` from the cache if present.
+        """
+
+        self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]):
+        """
+        Removes every entry whose key matches ``predicate``.
+        """
+
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+
+    def clear(self):
+        """
+        Removes all entries. Counters are kept.
+        """
+
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns the size of the cache and its hit and miss counters.
+        """
+
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses}
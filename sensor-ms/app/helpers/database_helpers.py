@@ -2,33 +2,150 @@
 # Date created: 5.12.2024
 
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
-from pymongo import errors
-from ..config import MONGO_URL, DATABASE_NAME, COLLECTION
+from pymongo import errors, ASCENDING
+from ..config import (
+    MONGO_URL,
+    DATABASE_NAME,
+    COLLECTION,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MAX_IDLE_TIME_MS)
 
-client = AsyncIOMotorClient(MONGO_URL)
+# logger default library.
+from ..logger_setup import get_logger
+logger = get_logger("sensor-ms.helpers")
 
-async def get_collection() -> AsyncIOMotorCollection | None:
+# NOTE: The client owns the connection pool and is shared by the whole process.
+#       Connections are opened lazily, so creating the client does not block.
+client = AsyncIOMotorClient(MONGO_URL,
+                            minPoolSize=MONGO_MIN_POOL_SIZE,
+                            maxPoolSize=MONGO_MAX_POOL_SIZE,
+                            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS)
+
+# Indexes of the users collection as pairs of keys and index options.
+# NOTE: Array fields get multikey indexes, so single array elements can be located without a scan.
+INDEXES = [
+    ([("username", ASCENDING)], {"unique": True}),
+    ([("username", ASCENDING), ("sensors.name", ASCENDING)], {})]
+
+# Collection handle resolved once and reused by every service call.
+_collection: AsyncIOMotorCollection | None = None
+
+async def resolve_collection() -> AsyncIOMotorCollection | None:
     """
-    Retrieve the users collection from the database.
+    Resolve the users collection and cache the handle.
 
-    This function connects to the database, verifies the database and collection names,
-    and returns the users collection. If the database or collection is invalid or inaccessible,
-    it returns None. Values of ``MONGO_URL``, ``DATABASE_NAME`` and ``COLLECTION`` should be aquired from config.
+    This function verifies that the database exists and stores the collection handle
+    so that subsequent calls to :func:`get_collection` do not query the server.
+    Values of ``MONGO_URL``, ``DATABASE_NAME`` and ``COLLECTION`` should be aquired from config.
 
     Returns:
         Collection | None: The users collection if successful, or None if an error occurred.
     """
 
-    names = await client.list_database_names()
-    if DATABASE_NAME not in names:
-        return None
+    global _collection
+    _collection = None
 
-    db = client[DATABASE_NAME]
     try:
-        return db.get_collection(COLLECTION)
+        names = await client.list_database_names()
+        if DATABASE_NAME not in names:
+            logger.warning(f"Database not found: {DATABASE_NAME}")
+            return None
+
+        _collection = client[DATABASE_NAME].get_collection(COLLECTION)
+        return _collection
+
     except errors.InvalidName:
-        print(f"Invalid name for collection: {COLLECTION}")
+        logger.warning(f"Invalid name for collection: {COLLECTION}")
         return None
     except Exception as e:
-        print(f"Unknown exception: {e}")
-        return None
\ No newline at end of file
+        logger.warning(f"Unknown exception: {e}")
+        return None
+
+async def get_collection() -> AsyncIOMotorCollection | None:
+    """
+    Retrieve the users collection from the database.
+
+    The handle is resolved on first use (or at startup) and cached afterwards.
+    It is only resolved again after :func:`invalidate_collection` was called
+    or when the previous resolution failed.
+
+    Returns:
+        Collection | None: The users collection if successful, or None if an error occurred.
+    """
+
+    if _collection is None:
+        return await resolve_collection()
+    return _collection
+
+def invalidate_collection():
+    """
+    Drop the cached collection handle so it is validated again on the next call.
+    """
+
+    global _collection
+    _collection = None
+
+async def ping_collection() -> bool:
+    """
+    Check that the cached collection is still reachable.
+
+    On failure the cached handle is invalidated and resolved again once.
+
+    Returns:
+        bool: True if the database responded, False otherwise.
+    """
+
+    collection = await get_collection()
+    if collection is None:
+        return False
+
+    try:
+        await collection.database.command("ping")
+        return True
+    except errors.PyMongoError as e:
+        logger.warning(f"Database ping failed, revalidating collection: {e}")
+        invalidate_collection()
+        return await resolve_collection() is not None
+
+async def collection_dependency() -> AsyncIOMotorCollection | None:
+    """
+    FastAPI dependency providing the shared users collection.
+
+    Returns:
+        Collection | None: The users collection if successful, or None if an error occurred.
+    """
+
+    return await get_collection()
+
+async def ensure_indexes() -> bool:
+    """
+    Create the indexes of the users collection if they do not exist yet.
+
+    Every index is created separately, so one failing index (for example a unique index
+    over existing duplicates) does not prevent the others from being created.
+
+    Returns:
+        bool: True if all indexes exist, False otherwise.
+    """
+
+    collection = await get_collection()
+    if collection is None:
+        return False
+
+    created = True
+    for keys, options in INDEXES:
+        try:
+            await collection.create_index(keys, **options)
+        except errors.PyMongoError as e:
+            logger.warning(f"Could not create index {keys}: {e}")
+            created = False
+    return created
+
+def close_client():
+    """
+    Close the client and release all pooled connections.
+    """
+
+    invalidate_collection()
+    client.close()
@@ -0,0 +1,68 @@
+# Author: Nina Mislej
+# Date created: 5.12.2024
+
+from fastapi import Request
+from .error import ErrorResponse as Err
+import json
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+async def parse_readings(request: Request, max_readings: int, max_reading_bytes: int) -> Err | list:
+    """
+    Parses a batch of sensor readings from the request body.
+
+    A body with an NDJSON content type is read as a stream, one JSON reading per line,
+    so the whole body never has to be buffered. Any other body has to be a JSON array.
+    Lines that are not valid JSON are kept as ``None`` so they get their own status.
+    Lines longer than ``max_reading_bytes`` and array bodies longer than
+    ``max_readings * max_reading_bytes`` are rejected while they are read.
+
+    Args:
+        request (Request): The incoming HTTP request.
+        max_readings (int): The maximum number of readings accepted in one batch.
+        max_reading_bytes (int): The maximum size of one reading in bytes.
+
+    Returns:
+        ErrorResponse | list: The parsed readings or an error if the body cannot be parsed.
+    """
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    readings = []
+
+    if content_type in NDJSON_MEDIA_TYPES:
+        def parse_line(line: bytes):
+            if not line.strip():
+                return
+            try:
+                readings.append(json.loads(line))
+            except json.JSONDecodeError:
+                readings.append(None)
+
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            if len(buffer) > max_reading_bytes or any(len(line) > max_reading_bytes for line in lines):
+                return Err(message=f"Reading exceeds {max_reading_bytes} bytes.", code=413)
+            for line in lines:
+                parse_line(line)
+            if len(readings) > max_readings:
+                return Err(message=f"Batch exceeds {max_readings} readings.", code=413)
+        parse_line(buffer)
+
+    else:
+        body = b""
+        async for chunk in request.stream():
+            body += chunk
+            if len(body) > max_readings * max_reading_bytes:
+                return Err(message=f"Batch exceeds {max_readings * max_reading_bytes} bytes.", code=413)
+        try:
+            readings = json.loads(body)
+        except json.JSONDecodeError as e:
+            return Err(message=f"Invalid JSON body: {e}", code=400)
+        if not isinstance(readings, list):
+            return Err(message=f"Batch body has to be a JSON array of readings.", code=400)
+
+    if len(readings) > max_readings:
+        return Err(message=f"Batch exceeds {max_readings} readings.", code=413)
+    return readings
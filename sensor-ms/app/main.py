@@ -5,6 +5,7 @@
 import asyncio
 import uvicorn
 from fastapi import FastAPI
+from contextlib import asynccontextmanager
 from .googlerpc.grpc_server import serve
 
 # Internal dependencies.
@@ -13,12 +14,39 @@ from .api import (
     users_api,
     sensor_data_api,
     health_check_api)
+from .helpers.database_helpers import resolve_collection, ensure_indexes, close_client
+from .rabitmq.sensor_data_publisher import publisher
+from .services.reading_utils import ensure_reading_collections
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Resolves the shared database collection, ensures its indexes, prepares the reading history collections
+    and starts the RabbitMQ publisher at startup.
+    Stops the publisher and closes the connection pool on shutdown.
+    """
+
+    if await resolve_collection() is None:
+        logger.warning("Database collection could not be resolved at startup.")
+    else:
+        if not await ensure_indexes():
+            logger.warning("Database indexes could not be ensured at startup.")
+        if not await ensure_reading_collections():
+            logger.warning("Reading history collections could not be prepared at startup.")
+    try:
+        await publisher.start()
+    except Exception as e:
+        logger.warning(f"RabbitMQ publisher could not be started, retrying on first publish: {e}")
+    yield
+    await publisher.stop()
+    close_client()
 
 app = FastAPI(
     title="Sensor Managment Microservice",
     docs_url="/sensors/docs-api",             # Swagger UI
     redoc_url="/sensors/redoc",           # Redoc UI
-    openapi_url="/sensors/openapi.json"   # OpenAPI schema URL
+    openapi_url="/sensors/openapi.json",  # OpenAPI schema URL
+    lifespan=lifespan
 )
 
 # Logging default library.
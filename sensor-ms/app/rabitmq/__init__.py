@@ -5,4 +5,10 @@ It pre-processes the data before sending it to the channel and post-processes it
 
 from .sensor_data_exchange import (
     send_to_channel,
-    receive_from_channel)
\ No newline at end of file
+    send_batch_to_channel,
+    receive_from_channel)
+
+from .sensor_data_publisher import (
+    SensorDataPublisher,
+    PublishTimeout,
+    publisher)
\ No newline at end of file
@@ -2,14 +2,16 @@
 # Date created: 5.12.2024
 
 # RabbitMQ dependencies.
-import pika
+import asyncio
 import json
 
 # Internal dependencies.
-from ..config import RABBITMQ_HOST, RABBITMQ_PASSWORD, RABBITMQ_USER
+from ..config import RABBITMQ_DRAIN_MAX_MESSAGES, RABBITMQ_DRAIN_MAX_TIME
 from ..helpers.error import ErrorResponse as Err
-from ..services import sensor_data_utils, user_utils
+from ..services import sensor_data_utils, user_utils, reading_utils
 from ..schemas.user_schemas import GetSensorData
+from ..schemas.sensor_schemas import SensorDataBatch
+from .sensor_data_publisher import publisher, PublishTimeout, EXCHANGE_NAME
 
 # logger default library.
 from ..logger_setup import get_logger
@@ -19,13 +21,12 @@ logger = get_logger("sensor-ms.rabbitmq")
 #       output on the same queue so if one sensor is publishing information per second and the
 #       other per hour the second sensor would get lost.
 
-EXCHANGE_NAME = "sensor-data-exchange"
-EXCHANGE_TYPE = "topic"
 QUEUE_LENGTH = 100
 
 async def send_to_channel(data: dict) -> str | Err:
     """
     Sends sensor data to the RabbitMQ exchange for processing. The username is parsed from the raw data dictionary.
+    The data is published through the shared publisher, so no connection is opened per request.
 
     Args:
         data (dict): The raw sensor data to send.
@@ -45,71 +46,149 @@ async def send_to_channel(data: dict) -> str | Err:
         if not processed_data:
             return Err(message="Sensor processed.")
 
-        credentials = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASSWORD)
-        connection = pika.BlockingConnection(pika.ConnectionParameters(host=RABBITMQ_HOST,
-                                                                       credentials=credentials))
-        channel = connection.channel()
-        channel.exchange_declare(exchange=EXCHANGE_NAME, exchange_type=EXCHANGE_TYPE)
-
-        channel.basic_publish(
-            exchange=EXCHANGE_NAME,
-            routing_key=username,
-            body=json.dumps(data)
-        )
-        connection.close()
+        data, reading = processed_data
+        try:
+            await publisher.publish(username, json.dumps(data).encode())
+        except PublishTimeout as e:
+            # NOTE: A reading that was handed to the broker is not rejected, a retry would publish it twice.
+            if not e.published[0]:
+                raise
+            logger.warning(f"RabbitMQ confirm is late, sensor data accepted.")
+
+        # NOTE: The reading is stored only once it is published, so a rejected reading is not counted on retry.
+        await store_published([reading] if reading else [])
         return "Sensor processed."
 
+    except PublishTimeout:
+        logger.warning(f"RabbitMQ publisher is saturated, sensor data rejected.")
+        return Err(message=f"Sensor data exchange is busy, try again later.", code=503)
+    except TimeoutError:
+        logger.warning(f"RabbitMQ publisher is saturated, sensor data rejected.")
+        return Err(message=f"Sensor data exchange is busy, try again later.", code=503)
     except Exception as e:
         logger.warning(f"Could not send sensor data to RabbitMQ: {e}")
         return Err(message=f"Error while sending data to channel: {e}")
 
-async def receive_from_channel(username: str) -> GetSensorData | Err:
+async def send_batch_to_channel(readings: list) -> SensorDataBatch | Err:
+    """
+    Sends a batch of sensor readings to the RabbitMQ exchange for processing.
+    The readings are validated together and all publishable readings are sent in one batched
+    operation. Every reading gets its own status in the response.
+
+    Args:
+        readings (list): The raw sensor readings to send.
+
+    Returns:
+        SensorDataBatch | ErrorResponse: The status of every reading, or an error if failure occurs while sending data.
+    """
+
+    try:
+        statuses, to_publish = await sensor_data_utils.pre_process_batch(readings)
+
+        if to_publish:
+            messages = [(reading["username"], json.dumps(reading).encode()) for _, reading, _ in to_publish]
+            try:
+                await publisher.publish_many(messages)
+                published = [True] * len(to_publish)
+            except Exception as e:
+                busy = isinstance(e, TimeoutError)
+                logger.warning(f"Could not send sensor data batch to RabbitMQ: {e}")
+                # Readings handed to the broker before the timeout keep their status, so they are not retried.
+                published = e.published if isinstance(e, PublishTimeout) else [False] * len(to_publish)
+                for (index, _, _), sent in zip(to_publish, published):
+                    if sent:
+                        continue
+                    statuses[index].code = 503 if busy else 500
+                    statuses[index].message = "Sensor data exchange is busy, try again later." if busy \
+                        else f"Error while sending data to channel: {e}"
+
+            await store_published([reading for (_, _, reading), sent in zip(to_publish, published) if sent])
+
+        failed = sum(1 for status in statuses if status.code != 200)
+        return SensorDataBatch(processed=len(statuses) - failed, failed=failed, readings=statuses)
+
+    except Exception as e:
+        logger.warning(f"Could not send sensor data batch to RabbitMQ: {e}")
+        return Err(message=f"Error while sending data to channel: {e}")
+
+async def store_published(readings: list) -> None:
+    """
+    Stores published readings in the sensor history. The readings are already handed to the broker,
+    so a failure is only logged and the readings are not rejected, a retry would publish them twice.
+
+    Args:
+        readings (list): The username, sensor name, sensor type and measured value of every published reading.
+    """
+
+    stored = await reading_utils.store_readings(readings)
+    if isinstance(stored, Err):
+        logger.warning(f"Published sensor readings not stored in history: {stored.message}")
+
+async def receive_from_channel(username: str,
+                               max_messages: int = RABBITMQ_DRAIN_MAX_MESSAGES,
+                               max_time: float = RABBITMQ_DRAIN_MAX_TIME) -> GetSensorData | Err:
     """
     Retrieves sensor data for a specific user from RabbitMQ and processes it.
 
+    Messages are fetched one by one until the queue is empty or the budget of ``max_messages``
+    messages or ``max_time`` seconds is used up, so a busy queue never blocks the service.
+    Messages are acknowledged only after the aggregation succeeded, otherwise they are
+    returned to the queue. If the budget ran out and messages are still waiting in the queue,
+    ``has_more`` is set in the response and the client should request the data again.
+
     Args:
         username (str): The username for which sensor data is retrieved.
+        max_messages (int): The maximum number of messages read in one call.
+        max_time (float): The maximum number of seconds spent reading messages.
 
     Returns:
         schema.GetSensorData: The processed sensor data for the user or an error response if an error occurs while receiving or processing data.
     """
 
+    channel = None
     try:
-        credentials = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASSWORD)
-        connection = pika.BlockingConnection(pika.ConnectionParameters(host=RABBITMQ_HOST,
-                                                                       credentials=credentials))
-        channel = connection.channel()
-        channel.exchange_declare(exchange=EXCHANGE_NAME, exchange_type=EXCHANGE_TYPE)
-
-        queue_info = channel.queue_declare(queue=username, arguments={"x-max-length": QUEUE_LENGTH})
-        channel.queue_bind(exchange="sensor-data-exchange", queue=username)
-
-        message_count = 0
-        messages_queued = queue_info.method.message_count
-        queue = []
-        def limited_callback(ch, method, properties, body):
-            nonlocal message_count
-            nonlocal queue
-            data = json.loads(body)
-            queue.append(data)
-            message_count += 1
-
-            # Stop consuming after reaching max_messages.
-            if message_count >= messages_queued:
-                channel.stop_consuming()
-
-        if queue_info.method.message_count == 0:
+        channel = await publisher.open_channel()
+        exchange = await channel.get_exchange(EXCHANGE_NAME, ensure=False)
+        queue = await channel.declare_queue(username, arguments={"x-max-length": QUEUE_LENGTH})
+        await queue.bind(exchange, routing_key=username)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_time
+        messages = []
+        entries = []
+        has_more = False
+        while True:
+            if len(messages) >= max_messages or loop.time() >= deadline:
+                # NOTE: Declaring the queue again reports the messages still ready in it.
+                declared = await queue.declare()
+                has_more = declared.message_count > 0
+                break
+
+            message = await queue.get(no_ack=False, fail=False)
+            if message is None:
+                break
+
+            try:
+                entries.append(json.loads(message.body))
+                messages.append(message)
+            except ValueError:
+                logger.debug(f"Discarding malformed sensor data message.")
+                await message.reject(requeue=False)
+
+        if not messages:
             return Err(message="No sensor data recieved in the channel.")
 
-        channel.basic_consume(queue=username, on_message_callback=limited_callback, auto_ack=True)
-        channel.start_consuming()
-        connection.close()
-
-        logger.info(f"Read {message_count} from messaging queue.")
-        processed_queue = await sensor_data_utils.process_queue(username, queue)
+        logger.info(f"Read {len(messages)} from messaging queue.")
+        processed_queue = await sensor_data_utils.process_queue(username, entries)
         if isinstance(processed_queue, Err):
+            await messages[-1].nack(multiple=True, requeue=True)
             return processed_queue
 
+        # NOTE: A single acknowledgement covers every message delivered before it on the channel.
+        await messages[-1].ack(multiple=True)
+        processed_queue.processed = len(messages)
+        processed_queue.has_more = has_more
+
         door_sensors = await user_utils.get_all_door_sensors(username)
         if isinstance(door_sensors, Err):
             return door_sensors
@@ -121,4 +200,7 @@ async def receive_from_channel(username: str) -> GetSensorData | Err:
 
     except Exception as e:
         logger.warning(f"Could not recieve sensor data to RabbitMQ: {e}")
-        return Err(message=f"Error while recieving data from channel: {e}")
\ No newline at end of file
+        return Err(message=f"Error while recieving data from channel: {e}")
+    finally:
+        if channel is not None and not channel.is_closed:
+            await channel.close()
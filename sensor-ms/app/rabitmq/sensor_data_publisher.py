@@ -0,0 +1,245 @@
+# Author: Nina Mislej
+# Date created: 5.12.2024
+
+# RabbitMQ dependencies.
+import asyncio
+import aio_pika
+
+# Internal dependencies.
+from ..config import (
+    RABBITMQ_HOST,
+    RABBITMQ_PASSWORD,
+    RABBITMQ_USER,
+    RABBITMQ_CHANNEL_POOL_SIZE,
+    RABBITMQ_PUBLISH_BATCH_SIZE,
+    RABBITMQ_PUBLISH_QUEUE_SIZE,
+    RABBITMQ_PUBLISH_TIMEOUT)
+
+# logger default library.
+from ..logger_setup import get_logger
+logger = get_logger("sensor-ms.rabbitmq")
+
+EXCHANGE_NAME = "sensor-data-exchange"
+EXCHANGE_TYPE = aio_pika.ExchangeType.TOPIC
+
+# Seconds a worker waits before opening a new channel when its channel failed.
+WORKER_RETRY_DELAY = 1.0
+
+class PendingMessage:
+    """
+    A message waiting in the publish queue. It is marked as sent once a worker handed
+    it to the broker, after that it can no longer be withdrawn.
+    """
+
+    __slots__ = ("routing_key", "body", "future", "sent")
+
+    def __init__(self, routing_key: str, body: bytes, future: asyncio.Future):
+        self.routing_key = routing_key
+        self.body = body
+        self.future = future
+        self.sent = False
+
+class PublishTimeout(TimeoutError):
+    """
+    Raised when messages were not published in time. Messages that were not sent yet
+    are withdrawn, so only the messages not marked in ``published`` should be retried.
+
+    Attributes:
+        published (list[bool]): For every message, whether it was handed to the broker.
+    """
+
+    def __init__(self, published: list[bool]):
+        super().__init__(f"Published {sum(published)} of {len(published)} messages before the timeout.")
+        self.published = published
+
+class SensorDataPublisher:
+    """
+    Publishes sensor data over a single long-lived RabbitMQ connection.
+
+    Messages are put on a bounded in-memory queue and published by a pool of workers,
+    each owning its own channel with publisher confirms enabled. A worker publishes up to
+    ``batch_size`` messages at once and awaits their confirms together. When the broker
+    is slow the queue fills up and callers are rejected after ``timeout`` seconds, their
+    messages that are still queued are withdrawn and never published.
+    """
+
+    def __init__(self,
+                 pool_size: int = RABBITMQ_CHANNEL_POOL_SIZE,
+                 batch_size: int = RABBITMQ_PUBLISH_BATCH_SIZE,
+                 queue_size: int = RABBITMQ_PUBLISH_QUEUE_SIZE,
+                 timeout: float = RABBITMQ_PUBLISH_TIMEOUT):
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.connection: aio_pika.abc.AbstractRobustConnection | None = None
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._workers: list[asyncio.Task] = []
+        self._lock = asyncio.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self.connection is not None and not self.connection.is_closed
+
+    async def start(self):
+        """
+        Connects to the broker, declares the exchange once and starts the channel workers.
+        Calling it on an already started publisher does nothing.
+        """
+
+        async with self._lock:
+            if self.started:
+                return
+
+            self.connection = await aio_pika.connect_robust(host=RABBITMQ_HOST,
+                                                            login=RABBITMQ_USER,
+                                                            password=RABBITMQ_PASSWORD)
+            channel = await self.connection.channel()
+            await channel.declare_exchange(EXCHANGE_NAME, EXCHANGE_TYPE)
+            await channel.close()
+
+            for _ in range(self.pool_size):
+                channel = await self.connection.channel(publisher_confirms=True)
+                self._workers.append(asyncio.create_task(self._worker(channel)))
+            logger.info(f"RabbitMQ publisher started with {self.pool_size} channels.")
+
+    async def stop(self):
+        """
+        Stops the workers and closes the connection.
+        Messages that were not published yet are rejected.
+        """
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+        while not self._queue.empty():
+            message = self._queue.get_nowait()
+            if not message.future.done():
+                message.future.set_exception(ConnectionError("Publisher stopped."))
+
+        if self.connection is not None:
+            await self.connection.close()
+            self.connection = None
+
+    async def open_channel(self) -> aio_pika.abc.AbstractChannel:
+        """
+        Opens a new channel on the shared connection, starting the publisher if needed.
+        The caller is responsible for closing the channel.
+
+        Returns:
+            AbstractChannel: The opened channel.
+        """
+
+        if not self.started:
+            await self.start()
+        return await self.connection.channel()
+
+    async def publish(self, routing_key: str, body: bytes):
+        """
+        Publishes a message to the sensor data exchange and waits for the broker confirm.
+
+        Args:
+            routing_key (str): The routing key of the message, which is the username.
+            body (bytes): The encoded message.
+
+        Raises:
+            PublishTimeout: If the publish queue is full or the confirm did not arrive in time.
+            Exception: If the broker rejected the message.
+        """
+
+        await self.publish_many([(routing_key, body)])
+
+    async def publish_many(self, messages: list[tuple[str, bytes]]):
+        """
+        Publishes many messages and waits until the broker confirms all of them.
+
+        If the timeout passes, messages still waiting in the queue are withdrawn. Messages
+        already handed to the broker cannot be withdrawn, so their confirms are awaited
+        for another ``timeout`` seconds and they are reported as published.
+
+        Args:
+            messages (list[tuple[str, bytes]]): Pairs of routing key and encoded message.
+
+        Raises:
+            PublishTimeout: If the publish queue is full or the confirms did not arrive in time.
+            Exception: If the broker rejected any of the messages.
+        """
+
+        if not self.started:
+            await self.start()
+
+        if not messages:
+            return
+
+        loop = asyncio.get_running_loop()
+        pending = []
+        try:
+            async with asyncio.timeout(self.timeout):
+                for routing_key, body in messages:
+                    message = PendingMessage(routing_key, body, loop.create_future())
+                    await self._queue.put(message)
+                    pending.append(message)
+                # NOTE: Unlike gather, wait does not cancel the futures when the timeout passes.
+                await asyncio.wait([message.future for message in pending])
+        except TimeoutError:
+            for message in pending:
+                if not message.sent:
+                    message.future.cancel()
+            sent = [message.future for message in pending if message.sent]
+            if sent:
+                await asyncio.wait(sent, timeout=self.timeout)
+            published = [message.sent and not (message.future.done() and message.future.exception() is not None)
+                         for message in pending]
+            raise PublishTimeout(published + [False] * (len(messages) - len(pending))) from None
+
+        for message in pending:
+            message.future.result()
+
+    async def _exchange(self, channel: aio_pika.abc.AbstractChannel) -> aio_pika.abc.AbstractExchange:
+        """
+        Returns the exchange on the given channel. If that fails, it is retried on
+        new channels every ``WORKER_RETRY_DELAY`` seconds until it succeeds.
+        """
+
+        while True:
+            try:
+                return await channel.get_exchange(EXCHANGE_NAME, ensure=False)
+            except Exception as e:
+                logger.warning(f"RabbitMQ publisher channel failed, opening a new one: {e}")
+            await asyncio.sleep(WORKER_RETRY_DELAY)
+            try:
+                channel = await self.connection.channel(publisher_confirms=True)
+            except Exception as e:
+                logger.warning(f"Could not open a RabbitMQ publisher channel: {e}")
+
+    async def _worker(self, channel: aio_pika.abc.AbstractChannel):
+        """
+        Publishes queued messages in batches on the given channel.
+        Messages withdrawn by a timed out caller are skipped.
+        """
+
+        exchange = await self._exchange(channel)
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            batch = [message for message in batch if not message.future.done()]
+            if not batch:
+                continue
+
+            for message in batch:
+                message.sent = True
+            confirms = [exchange.publish(aio_pika.Message(body=message.body), routing_key=message.routing_key)
+                        for message in batch]
+            results = await asyncio.gather(*confirms, return_exceptions=True)
+
+            for message, result in zip(batch, results):
+                if message.future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    message.future.set_exception(result)
+                else:
+                    message.future.set_result(None)
+
+publisher = SensorDataPublisher()
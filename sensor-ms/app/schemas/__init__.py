@@ -10,4 +10,9 @@ from .sensor_schemas import (
     HumiditySensorCreate,
     TemperatureSensorCreate,
     DoorSensorCreate,
-    GetSensor)
\ No newline at end of file
+    GetSensor,
+    SensorStatistics,
+    SensorReadingStatus,
+    SensorDataBatch,
+    SensorRollup,
+    SensorReadings)
\ No newline at end of file
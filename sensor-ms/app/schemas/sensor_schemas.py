@@ -3,6 +3,7 @@
 
 from pydantic import BaseModel
 from typing import Optional, Union, List
+from datetime import datetime
 from ..models import HumiditySensor, TemperatureSensor, DoorSensor
 
 class HumiditySensorCreate(BaseModel):
@@ -31,6 +32,22 @@ class DoorSensorCreate(BaseModel):
     name: str
     description: Optional[str] = None
 
+class SensorStatistics(BaseModel):
+    """
+    Statistics of the readings of a sensor aggregated from the messaging queue.
+    """
+
+    count: int
+    mean: float
+    min: float
+    max: float
+    std: float
+    p50: float
+    p95: float
+    p99: float
+    over_limit: int = 0
+    under_limit: int = 0
+
 class GetSensor(BaseModel):
     """
     Retrieving the sensor data from the sensor services.
@@ -39,4 +56,44 @@ class GetSensor(BaseModel):
     name: str
     data: Union[HumiditySensor, TemperatureSensor, DoorSensor]
     details: Optional[List[str]] = None
-    count: int = 0
\ No newline at end of file
+    count: int = 0
+    statistics: Optional[SensorStatistics] = None
+
+class SensorReadingStatus(BaseModel):
+    """
+    Processing status of a single reading sent in a batch.
+    """
+
+    index: int
+    name: Optional[str] = None
+    code: int = 200
+    message: str = "Sensor processed."
+
+class SensorDataBatch(BaseModel):
+    """
+    Summary of a processed batch of sensor readings with a status for every reading.
+    """
+
+    processed: int = 0
+    failed: int = 0
+    readings: List[SensorReadingStatus] = []
+
+class SensorRollup(BaseModel):
+    """
+    Aggregated readings of a sensor in a single time bucket.
+    """
+
+    start: datetime
+    count: int
+    min: float
+    max: float
+    mean: float
+
+class SensorReadings(BaseModel):
+    """
+    The history of a sensor in the requested granularity.
+    """
+
+    name: str
+    granularity: str
+    readings: List[SensorRollup] = []
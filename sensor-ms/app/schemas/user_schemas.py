@@ -20,5 +20,7 @@ class GetSensorData(BaseModel):
 
     username: str
     sensors: Dict[str, GetSensor]
+    processed: int = 0
+    has_more: bool = False
 
 
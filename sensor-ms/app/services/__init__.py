@@ -9,19 +9,35 @@ from .sensor_utils import (
     create_temperature_sensor,
     create_door_sensor,
     delete_sensor,
-    get_sensor)
+    get_sensor,
+    get_sensors,
+    invalidate_sensor,
+    invalidate_user_sensors,
+    sensor_cache)
 
 from .user_utils import (
     create_user,
     get_user,
     delete_user,
+    create_users,
+    delete_users,
     delete_sensors)
 
 from .sensor_data_utils import (
     pre_process_data,
+    pre_process_batch,
+    process_doors,
     post_process_data,
     process_door,
     process_temperature,
     process_queue,
+    aggregate_sensor,
     process_humidity, 
     get_valid_sensor)
+
+from .reading_utils import (
+    ensure_reading_collections,
+    store_readings,
+    get_readings,
+    delete_readings,
+    rename_readings)
@@ -0,0 +1,273 @@
+# Author: Nina Mislej
+# Date created: 13.01.2025
+
+from typing import List, Tuple
+from datetime import datetime, timedelta, timezone
+from pymongo import UpdateOne, ASCENDING
+from pymongo.errors import CollectionInvalid, OperationFailure
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from ..schemas import sensor_schemas as schema
+from ..helpers.database_helpers import get_collection
+from ..helpers.error import ErrorResponse as Err
+from ..config import (
+    READINGS_COLLECTION,
+    ROLLUPS_COLLECTION,
+    SENSOR_READINGS_RETENTION,
+    SENSOR_READINGS_MAX_POINTS)
+
+# logger default library.
+from ..logger_setup import get_logger
+logger = get_logger("sensor-ms.services")
+
+# Raw readings are kept in a time-series collection, aggregates in one document per bucket.
+RAW = "raw"
+GRANULARITIES = {
+    "minute": lambda ts: ts.replace(second=0, microsecond=0),
+    "hour": lambda ts: ts.replace(minute=0, second=0, microsecond=0),
+    "day": lambda ts: ts.replace(hour=0, minute=0, second=0, microsecond=0)}
+
+async def get_reading_collections() -> Tuple[AsyncIOMotorCollection, AsyncIOMotorCollection] | None:
+    """
+    Retrieve the raw readings and rollups collections from the users database.
+
+    Returns:
+        Tuple[Collection, Collection] | None: The readings and rollups collections, or None if an error occurred.
+    """
+
+    db_users = await get_collection()
+    if db_users is None:
+        return None
+    return db_users.database[READINGS_COLLECTION], db_users.database[ROLLUPS_COLLECTION]
+
+async def ensure_reading_collections() -> bool:
+    """
+    Create the time-series collection for raw readings and the rollup index if they are missing.
+    Raw readings expire after ``SENSOR_READINGS_RETENTION`` seconds, rollups are kept.
+
+    Returns:
+        bool: True if the collections are ready, False otherwise.
+    """
+
+    try:
+        db_users = await get_collection()
+        if db_users is None:
+            return False
+
+        database = db_users.database
+        if READINGS_COLLECTION not in await database.list_collection_names():
+            try:
+                await database.create_collection(READINGS_COLLECTION,
+                                                 timeseries={"timeField": "timestamp",
+                                                             "metaField": "meta",
+                                                             "granularity": "seconds"},
+                                                 expireAfterSeconds=SENSOR_READINGS_RETENTION)
+            except CollectionInvalid:
+                # NOTE: Another replica created it in the meantime.
+                pass
+
+        await database[ROLLUPS_COLLECTION].create_index(
+            [("username", ASCENDING), ("sensor", ASCENDING), ("granularity", ASCENDING), ("start", ASCENDING)],
+            unique=True)
+        return True
+
+    except OperationFailure as e:
+        logger.warning(f"Failed preparing reading collections: {e}")
+        return False
+    except Exception as e:
+        logger.warning(f"Unknown exception: {e}")
+        return False
+
+async def store_readings(readings: List[Tuple[str, str, str, float]]) -> Err | int:
+    """
+    Persist sensor readings and update their minute, hour and day rollups.
+
+    Readings falling into the same bucket are combined first, so every bucket is
+    updated with a single upsert that increments its count and sum and adjusts
+    its minimum and maximum.
+
+    Args:
+        readings (List[Tuple[str, str, str, float]]): The username, sensor name, sensor type and measured value of every reading.
+
+    Returns:
+        ErrorResponse | int: The error response if an error occurred, or the number of stored readings.
+    """
+
+    try:
+        if not readings:
+            return 0
+
+        collections = await get_reading_collections()
+        if collections is None:
+            return Err(message=f"Cannot get DB collection.")
+        db_readings, db_rollups = collections
+
+        timestamp = datetime.now(tz=timezone.utc)
+        documents = []
+        buckets = {}
+        for username, name, sensor_type, value in readings:
+            value = float(value)
+            documents.append({"timestamp": timestamp,
+                              "meta": {"username": username, "sensor": name, "type": sensor_type},
+                              "value": value})
+
+            for granularity, truncate in GRANULARITIES.items():
+                key = (username, name, granularity, truncate(timestamp))
+                bucket = buckets.get(key)
+                if bucket is None:
+                    buckets[key] = [1, value, value, value]
+                else:
+                    bucket[0] += 1
+                    bucket[1] += value
+                    bucket[2] = min(bucket[2], value)
+                    bucket[3] = max(bucket[3], value)
+
+        await db_readings.insert_many(documents, ordered=False)
+
+        updates = [UpdateOne({"username": username, "sensor": name, "granularity": granularity, "start": start},
+                             {"$inc": {"count": count, "sum": total},
+                              "$min": {"min": low},
+                              "$max": {"max": high}},
+                             upsert=True)
+                   for (username, name, granularity, start), (count, total, low, high) in buckets.items()]
+        await db_rollups.bulk_write(updates, ordered=False)
+        return len(documents)
+
+    except Exception as e:
+        logger.warning(f"Failed storing sensor readings: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
+async def get_readings(username: str, name: str, start: datetime | None = None, end: datetime | None = None,
+                       granularity: str = "hour") -> Err | schema.SensorReadings:
+    """
+    Retrieve the history of a sensor between ``start`` and ``end``.
+
+    For the 'minute', 'hour' and 'day' granularity the precomputed rollups are returned.
+    For the 'raw' granularity every stored reading is returned as its own point.
+    At most ``SENSOR_READINGS_MAX_POINTS`` points are returned, the oldest first.
+
+    Args:
+        username (str): The username of the user who owns the sensor.
+        name (str): The name of the sensor.
+        start (datetime | None): Beginning of the range, one day before ``end`` by default, UTC if naive.
+        end (datetime | None): End of the range, the current time by default, UTC if naive.
+        granularity (str): One of 'raw', 'minute', 'hour' or 'day'.
+
+    Returns:
+        ErrorResponse | SensorReadings: The error response if an error occurred, or the readings of the sensor.
+    """
+
+    try:
+        if granularity != RAW and granularity not in GRANULARITIES:
+            return Err(message=f"Unknown granularity '{granularity}'.", code=400)
+
+        # NOTE: Times without a timezone are taken as UTC, as the readings are stored in UTC.
+        if start is not None and start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        if end is not None and end.tzinfo is None:
+            end = end.replace(tzinfo=timezone.utc)
+        end = end or datetime.now(tz=timezone.utc)
+        start = start or end - timedelta(days=1)
+        if start > end:
+            return Err(message=f"Start of the range is after its end.", code=400)
+
+        collections = await get_reading_collections()
+        if collections is None:
+            return Err(message=f"Cannot get DB collection.")
+        db_readings, db_rollups = collections
+
+        if granularity == RAW:
+            cursor = db_readings.find({"meta.username": username,
+                                       "meta.sensor": name,
+                                       "timestamp": {"$gte": start, "$lt": end}},
+                                      {"_id": 0, "timestamp": 1, "value": 1})
+            cursor = cursor.sort("timestamp", ASCENDING).limit(SENSOR_READINGS_MAX_POINTS)
+            points = [schema.SensorRollup(start=document["timestamp"],
+                                          count=1,
+                                          min=document["value"],
+                                          max=document["value"],
+                                          mean=document["value"])
+                      async for document in cursor]
+        else:
+            # NOTE: The bucket containing 'start' is included even if it begins before it.
+            cursor = db_rollups.find({"username": username,
+                                      "sensor": name,
+                                      "granularity": granularity,
+                                      "start": {"$gte": GRANULARITIES[granularity](start), "$lt": end}},
+                                     {"_id": 0, "start": 1, "count": 1, "sum": 1, "min": 1, "max": 1})
+            cursor = cursor.sort("start", ASCENDING).limit(SENSOR_READINGS_MAX_POINTS)
+            points = [schema.SensorRollup(start=document["start"],
+                                          count=document["count"],
+                                          min=document["min"],
+                                          max=document["max"],
+                                          mean=round(document["sum"] / document["count"], 2))
+                      async for document in cursor]
+
+        return schema.SensorReadings(name=name, granularity=granularity, readings=points)
+
+    except Exception as e:
+        logger.warning(f"Failed aquiring sensor readings: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
+async def delete_readings(username: str | list[str], name: str | None = None) -> Err | str | list[str]:
+    """
+    Delete the stored history of a sensor, or of all sensors of a user if ``name`` is None.
+    If a list of usernames is given, the history of all sensors of those users is deleted.
+
+    Args:
+        username (str | list[str]): The username of the user who owns the sensors, or many usernames.
+        name (str | None): The name of the sensor.
+
+    Returns:
+        ErrorResponse | str | list[str]: The error response if an error occurred, or the username otherwise.
+    """
+
+    try:
+        collections = await get_reading_collections()
+        if collections is None:
+            return Err(message=f"Cannot get DB collection.")
+        db_readings, db_rollups = collections
+
+        owner = {"$in": username} if isinstance(username, list) else username
+        readings_filter = {"meta.username": owner}
+        rollups_filter = {"username": owner}
+        if name is not None:
+            readings_filter["meta.sensor"] = name
+            rollups_filter["sensor"] = name
+
+        await db_readings.delete_many(readings_filter)
+        await db_rollups.delete_many(rollups_filter)
+        return username
+
+    except Exception as e:
+        logger.warning(f"Failed deleting sensor readings: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
+async def rename_readings(username: str, name: str, new_name: str) -> Err | str:
+    """
+    Move the stored history of a sensor to its new name.
+
+    Args:
+        username (str): The username of the user who owns the sensor.
+        name (str): The current name of the sensor.
+        new_name (str): The new name of the sensor.
+
+    Returns:
+        ErrorResponse | str: The error response if an error occurred, or the new name otherwise.
+    """
+
+    try:
+        collections = await get_reading_collections()
+        if collections is None:
+            return Err(message=f"Cannot get DB collection.")
+        db_readings, db_rollups = collections
+
+        await db_readings.update_many({"meta.username": username, "meta.sensor": name},
+                                      {"$set": {"meta.sensor": new_name}})
+        await db_rollups.update_many({"username": username, "sensor": name},
+                                     {"$set": {"sensor": new_name}})
+        return new_name
+
+    except Exception as e:
+        logger.warning(f"Failed renaming sensor readings: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
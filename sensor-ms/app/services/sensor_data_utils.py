@@ -5,7 +5,8 @@ from ..schemas import sensor_schemas, user_schemas
 from ..helpers.database_helpers import get_collection
 from ..helpers.error import ErrorResponse as Err
 from ..services import sensor_utils as utils
-from typing import Tuple
+from typing import Tuple, List
+import numpy as np
 
 from ..models.sensors import (
     HumiditySensor,
@@ -24,6 +25,10 @@ async def process_queue(username: str, queue: list) -> Err | user_schemas.GetSen
     """
     Processes a queue of sensor data recieved from some messaging system for a given user.
 
+    The sensors of the user are fetched once. Readings are then grouped by sensor into
+    columns and every column is aggregated in a single vectorized pass.
+    Entries for unknown sensors or without a numeric value are skipped.
+
     Args:
         username (str): The username of the user whose sensor data is being processed.
         queue (list): A list of raw sensor data entries.
@@ -33,33 +38,92 @@ async def process_queue(username: str, queue: list) -> Err | user_schemas.GetSen
     """
 
     try:
-        response = user_schemas.GetSensorData(username=username, sensors={})
+        sensors = await utils.get_sensors(username)
+        if isinstance(sensors, Err):
+            return sensors
+
+        columns: dict[str, list] = {}
+        fields = {name: READING_FIELDS.get(sensor["data"].get("type")) for name, sensor in sensors.items()}
         for entry in queue:
-            await post_process_data(entry, response)
+            if not isinstance(entry, dict):
+                continue
+            field = fields.get(entry.get("name"))
+            if field is None:
+                continue
+            value = entry.get(field)
+            if is_number(value):
+                columns.setdefault(entry["name"], []).append(value)
 
-        for sensor in response.sensors.values():
-            if sensor.data.type == TEMPERATURE:
-                sensor.data.temperature = round(sensor.data.temperature / sensor.count, 2)
-            if sensor.data.type == HUMIDITY:
-                sensor.data.humidity_level = round(sensor.data.humidity_level / sensor.count, 2)
+        response = user_schemas.GetSensorData(username=username, sensors={})
+        for name, values in columns.items():
+            sensor = Sensor(**sensors[name])
+            response.sensors[name] = aggregate_sensor(sensor, np.asarray(values, dtype=np.float64))
         return response
 
     except Exception as e:
         logger.warning(f"Processing message queue failure: {e}")
         return Err(message=f"Unknown exception: {e}", code=500)
 
+# Limits checked for each sensor type as pairs of lower and upper limit attributes.
+LIMIT_FIELDS = {
+    TEMPERATURE: ("min_temperature", "max_temperature"),
+    HUMIDITY: ("min_humidity", "max_humidity")}
+
+def aggregate_sensor(sensor: Sensor, values: np.ndarray) -> sensor_schemas.GetSensor:
+    """
+    Aggregates all readings of a 'TEMPERATURE' or 'HUMIDITY' sensor.
+    The mean is written to the measured value of the sensor, limit violations are
+    counted and summarized in the details.
+
+    Args:
+        sensor (Sensor): The sensor the readings belong to.
+        values (np.ndarray): The measured values, at least one.
+
+    Returns:
+        sensor_schemas.GetSensor: The sensor with the aggregated data and statistics.
+    """
+
+    low, high = (getattr(sensor.data, limit) for limit in LIMIT_FIELDS[sensor.data.type])
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    statistics = sensor_schemas.SensorStatistics(
+        count=values.size,
+        mean=round(float(values.mean()), 2),
+        min=float(values.min()),
+        max=float(values.max()),
+        std=round(float(values.std()), 2),
+        p50=round(float(p50), 2),
+        p95=round(float(p95), 2),
+        p99=round(float(p99), 2),
+        over_limit=int(np.count_nonzero(values > high)) if high is not None else 0,
+        under_limit=int(np.count_nonzero(values < low)) if low is not None else 0)
+
+    label = "Temperature" if sensor.data.type == TEMPERATURE else "Humidity"
+    details = []
+    if statistics.over_limit:
+        details.append(f"{label} over limit: {statistics.max} ({statistics.over_limit} readings)")
+    if statistics.under_limit:
+        details.append(f"{label} under limit: {statistics.min} ({statistics.under_limit} readings)")
+
+    setattr(sensor.data, READING_FIELDS[sensor.data.type], statistics.mean)
+    return sensor_schemas.GetSensor(name=sensor.name,
+                                    data=sensor.data,
+                                    details=details,
+                                    count=statistics.count,
+                                    statistics=statistics)
+
 async def pre_process_data(data: dict) -> Err | dict | None:
     """
     Prepares sensor data for further processing by identifying and validating the sensor type.
     If the sensor type is unknown, returns None. If the sensor type is 'DOOR' it writes last
     time the door opened in the database. If the sensor type is 'TEMPERATURE' or 'HUMIDITY' it
-    returns the processed sensor data.
+    also returns the reading that should be stored in the sensor history once it is published.
 
     Args:
         data (dict): The raw sensor data.
 
     Returns:
-        dict | None | ErrorResponse: Preprocessed data for valid sensors or None if no further processing is needed. If the processing fails it returns an error.
+        Tuple[dict, Tuple | None] | None | ErrorResponse: Preprocessed data for valid sensors with the reading to store,
+            or None if no further processing is needed. If the processing fails it returns an error.
     """
 
     try:
@@ -68,17 +132,146 @@ async def pre_process_data(data: dict) -> Err | dict | None:
             return result
 
         sensor_type, sensor = result
-        if sensor_type == TEMPERATURE:
-            return data
-        elif sensor_type == HUMIDITY:
-            return data
+        if sensor_type in READING_FIELDS:
+            field = READING_FIELDS[sensor_type]
+            if field not in data:
+                return Err(message=f"Missing {field} in data: {sensor.name}.", code=400)
+            if not is_number(data[field]):
+                return Err(message=f"Invalid {field} in data: {sensor.name}.", code=400)
+
+            return data, (data.get("username"), sensor.name, sensor_type, data[field])
         elif sensor_type == DOOR:
-            return await process_door(data.get("username"), sensor)
+            result = await process_door(data.get("username"), sensor)
+            if isinstance(result, Err):
+                return result
+            return data, None
 
     except Exception as e:
         logger.warning(f"Preprocessing message from sensor failure: {e}")
         return Err(message=f"Unknown exception: {e}", code=500)
 
+# Field holding the measured value for each sensor type that is sent to the messaging queue.
+READING_FIELDS = {
+    TEMPERATURE: "temperature",
+    HUMIDITY: "humidity_level"}
+
+def is_number(value) -> bool:
+    """
+    Checks if a measured value is a number. Booleans are not accepted.
+    """
+
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+async def pre_process_batch(readings: list) -> Tuple[List[sensor_schemas.SensorReadingStatus], List[Tuple[int, dict, Tuple]]]:
+    """
+    Prepares a batch of sensor readings for further processing.
+    Readings are grouped by username and validated against a single sensor lookup per user.
+    All 'DOOR' readings of a user are written to the database with one update, while valid
+    'TEMPERATURE' and 'HUMIDITY' readings are returned for publishing.
+
+    Args:
+        readings (list): The raw sensor readings.
+
+    Returns:
+        Tuple[List[SensorReadingStatus], List[Tuple[int, dict, Tuple]]]: The status of every reading and
+            the readings that should be published, each paired with its index in the batch and the
+            reading to store in the sensor history once it is published.
+    """
+
+    statuses = [sensor_schemas.SensorReadingStatus(index=index) for index in range(len(readings))]
+    to_publish = []
+
+    def fail(index: int, message: str, code: int = 400):
+        statuses[index].code = code
+        statuses[index].message = message
+
+    by_user: dict[str, List[int]] = {}
+    for index, reading in enumerate(readings):
+        if not isinstance(reading, dict):
+            fail(index, f"Reading is not a JSON object.")
+        elif "name" not in reading:
+            fail(index, f"Missing name of the sensor in data.")
+        elif "username" not in reading:
+            fail(index, f"Missing username in data.")
+        else:
+            statuses[index].name = reading["name"]
+            by_user.setdefault(reading["username"], []).append(index)
+
+    for username, indices in by_user.items():
+        sensors = await utils.get_sensors(username)
+        if isinstance(sensors, Err):
+            for index in indices:
+                fail(index, sensors.message, sensors.code)
+            continue
+
+        doors = {}
+        measured = []
+        for index in indices:
+            reading = readings[index]
+            sensor = sensors.get(reading["name"])
+            if sensor is None:
+                fail(index, f"Getting sensor '{reading['name']}' failed.", 404)
+                continue
+
+            sensor_type = sensor["data"].get("type")
+            if sensor_type == DOOR:
+                doors.setdefault(reading["name"], []).append(index)
+            elif sensor_type in READING_FIELDS:
+                if READING_FIELDS[sensor_type] not in reading:
+                    fail(index, f"Missing {READING_FIELDS[sensor_type]} in data: {reading['name']}.")
+                    continue
+                if not is_number(reading[READING_FIELDS[sensor_type]]):
+                    fail(index, f"Invalid {READING_FIELDS[sensor_type]} in data: {reading['name']}.")
+                    continue
+                measured.append((index, sensor_type, READING_FIELDS[sensor_type]))
+            else:
+                fail(index, f"Missing type in sensor: {reading['name']}.")
+
+        to_publish.extend((index, readings[index], (username, readings[index]["name"], sensor_type, readings[index][field]))
+                          for index, sensor_type, field in measured)
+
+        if doors:
+            result = await process_doors(username, list(doors))
+            if isinstance(result, Err):
+                for index in [index for indices in doors.values() for index in indices]:
+                    fail(index, result.message, result.code)
+
+    return statuses, to_publish
+
+async def process_doors(username: str, names: List[str]) -> Err | List[str]:
+    """
+    Updates the last opened timestamp for many door sensors of a user in a single write.
+
+    Args:
+        username (str): The username associated with the sensors.
+        names (List[str]): The names of the door sensors.
+
+    Returns:
+        List[str] | ErrorResponse: The names of the updated sensors or an error depending on if the update was successful.
+    """
+
+    try:
+        db_users = await get_collection()
+        if db_users is None:
+            return Err(message=f"Cannot get DB collection.")
+
+        # NOTE: Array filters update every matching sensor of the document in one operation.
+        result = await db_users.update_one(
+            {"username": username},
+            {"$set": {"sensors.$[door].data.last_opened": datetime.now(tz=timezone.utc)}},
+            array_filters=[{"door.name": {"$in": names}, "door.data.type": DOOR}])
+
+        # NOTE: The last opened timestamp is part of the cached sensor definition.
+        for name in names:
+            utils.invalidate_sensor(username, name)
+        if not result.acknowledged or result.modified_count == 0:
+            return Err(message=f"Door Sensors {names} not updated.", code=404)
+        return names
+
+    except Exception as e:
+        logger.debug(f"Failed processing door sensors: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
 async def post_process_data(data: dict, response: user_schemas.GetSensorData) -> None | Err:
     """
     Updates the aggregated response with processed sensor data. This is done for sensors of
@@ -169,6 +362,7 @@ async def process_door(username: str, sensor: Sensor) -> Err | str :
              "sensors.name": sensor.name},
             {"$set": {f"sensors.$.data.last_opened": datetime.now(tz=timezone.utc)}})
 
+        utils.invalidate_sensor(username, sensor.name)
         if not result.acknowledged or result.modified_count == 0:
             return Err(message=f"Door Sensor {sensor.name} not updated.", code=404)
         return sensor.name
@@ -238,15 +432,15 @@ async def process_humidity(data: dict, sensor: Sensor, response: user_schemas.Ge
                 response.sensors[sensor.name] = sensor_schemas.GetSensor(name=sensor.name,
                                                                          data=sensor.data,
                                                                          details=[])
-                sensor.data.humidity_level = 0
+                response.sensors[sensor.name].data.humidity_level = 0
 
             response_sensor = response.sensors[sensor.name]
             response_sensor.count += 1
             response_sensor.data.humidity_level += humidity
             if sensor.data.max_humidity and humidity > sensor.data.max_humidity:
-                response[sensor.name].details.append(f"Humidity over limit: {humidity}")
+                response_sensor.details.append(f"Humidity over limit: {humidity}")
             if sensor.data.min_humidity and humidity < sensor.data.min_humidity:
-                response[sensor.name].details.append(f"Humidity under limit: {humidity}")
+                response_sensor.details.append(f"Humidity under limit: {humidity}")
             return None
 
     except Exception as e:
@@ -7,11 +7,39 @@ from ..schemas import sensor_schemas as schema
 from ..models.sensors import HumiditySensor, DoorSensor, TemperatureSensor, Sensor
 from ..helpers.database_helpers import get_collection
 from ..helpers.error import ErrorResponse as Err
+from ..helpers.cache_helpers import TTLCache
+from . import reading_utils
+from ..config import SENSOR_CACHE_SIZE, SENSOR_CACHE_TTL
 
 # logger default library.
 from ..logger_setup import get_logger
 logger = get_logger("sensor-ms.services")
 
+# Sensor definitions keyed by '(username, sensor name)'.
+# Every function changing a sensor has to invalidate its entry.
+sensor_cache = TTLCache(max_size=SENSOR_CACHE_SIZE, ttl=SENSOR_CACHE_TTL)
+
+def invalidate_sensor(username: str, name: str):
+    """
+    Removes a single sensor definition from the cache.
+
+    Args:
+        username (str): The username of the user who owns the sensor.
+        name (str): The name of the sensor.
+    """
+
+    sensor_cache.invalidate((username, name))
+
+def invalidate_user_sensors(username: str):
+    """
+    Removes all cached sensor definitions of a user.
+
+    Args:
+        username (str): The username of the user who owns the sensors.
+    """
+
+    sensor_cache.invalidate_where(lambda key: key[0] == username)
+
 async def create_humidity_sensor(username: str, sensor : schema.HumiditySensorCreate) -> Err | str:
     """
     Create a new humidity sensor in the database.
@@ -35,7 +63,7 @@ async def create_humidity_sensor(username: str, sensor : schema.HumiditySensorCr
         data = HumiditySensor(max_humidity=sensor.max_humidity,
                                       min_humidity=sensor.min_humidity)
 
-        if not isinstance(await get_sensor(username, sensor.name), Err):
+        if not isinstance(await get_sensor(username, sensor.name, cached=False), Err):
             return Err(message=f"Sensor name '{sensor.name}' already exists and cannot be created.", code=409)
 
         sensor_dict = Sensor(name=sensor.name, data=data).model_dump()
@@ -47,6 +75,8 @@ async def create_humidity_sensor(username: str, sensor : schema.HumiditySensorCr
 
         if result.modified_count == 0:
             return Err(message=f"Creating sensor '{sensor.name}' modified zero entries.")
+
+        invalidate_sensor(username, sensor.name)
         return sensor.name
 
     except Exception as e:
@@ -78,7 +108,7 @@ async def create_temperature_sensor(username: str, sensor : schema.TemperatureSe
 
         sensor_dict = Sensor(name=sensor.name, data=data).model_dump()
 
-        if not isinstance(await get_sensor(username, sensor.name), Err):
+        if not isinstance(await get_sensor(username, sensor.name, cached=False), Err):
             return Err(message=f"Sensor name '{sensor.name}' already exists and cannot be created.", code=409)
 
         result = await db_users.update_one({"username": username},
@@ -88,6 +118,8 @@ async def create_temperature_sensor(username: str, sensor : schema.TemperatureSe
 
         if result.modified_count == 0:
             return Err(message=f"Creating sensor '{sensor.name}' modified zero entries.")
+
+        invalidate_sensor(username, sensor.name)
         return sensor.name
 
     except Exception as e:
@@ -116,7 +148,7 @@ async def create_door_sensor(username: str, sensor : schema.DoorSensorCreate) ->
 
         data = DoorSensor(description=sensor.description)
 
-        if not isinstance(await get_sensor(username, sensor.name), Err):
+        if not isinstance(await get_sensor(username, sensor.name, cached=False), Err):
             return Err(message=f"Sensor name '{sensor.name}' already exists and cannot be created.", code=409)
 
         sensor_dict = Sensor(name=sensor.name, data=data).model_dump()
@@ -128,6 +160,8 @@ async def create_door_sensor(username: str, sensor : schema.DoorSensorCreate) ->
 
         if result.modified_count == 0:
             return Err(message=f"Creating sensor '{sensor.name}' modified zero entries.")
+
+        invalidate_sensor(username, sensor.name)
         return sensor.name
 
     except Exception as e:
@@ -135,35 +169,45 @@ async def create_door_sensor(username: str, sensor : schema.DoorSensorCreate) ->
         return Err(message=f"Unknown exception: {e}", code=500)
 
 
-async def get_sensor(username: str, name : str) -> Err | dict:
+async def get_sensor(username: str, name : str, cached: bool = True) -> Err | dict:
     """
        Retrieve a sensor by its name for a specific user.
 
        This function fetches a sensor object for a user based on the `name`.
        If the sensor does not exist or the operation fails, an error response is returned.
+       Found sensors are served from the in-process cache until they expire or are changed.
+       The returned dictionary is shared with the cache and should not be modified.
 
        Args:
            username (str): The username of the user who owns the sensor.
            name (str): The name of the sensor to retrieve.
+           cached (bool): Whether the cache may be used. Existence checks before writes should bypass it.
 
        Returns:
            ErrorResponse | dict: The error response if an error occurred, or the sensor details as a dictionary.
     """
 
     try:
+        if cached:
+            sensor = sensor_cache.get((username, name))
+            if sensor is not None:
+                return sensor
+
         db_users = await get_collection()
         if db_users is None:
             return Err(message=f"Cannot get DB collection.")
 
-        # A cleaner way of finding all matchings and a sanity check that there are unique.
+        # Finds all matchings without unwinding the sensors array and keeps a sanity check that they are unique.
         pipeline = [
-            {"$match": {"username": username}}, # Finds the user.
-            {"$unwind": "$sensors"},  # Deconstruct the sensors array.
-            {"$match": {"sensors.name": name}}, # Match the specific sensor.
-            {"$replaceRoot": {"newRoot": "$sensors"}}  # Replace the root document with the sensor object.
+            {"$match": {"username": username, "sensors.name": name}}, # Finds the user through the index.
+            {"$project": {"_id": 0, "matches": {"$filter": { # Keeps only the matching sensors.
+                "input": "$sensors",
+                "as": "sensor",
+                "cond": {"$eq": ["$$sensor.name", name]}}}}}
         ]
 
         result = await db_users.aggregate(pipeline).to_list()
+        result = result[0]["matches"] if result else []
         if not result:
             return Err(message=f"Getting sensor '{name}' failed.")
 
@@ -174,13 +218,51 @@ async def get_sensor(username: str, name : str) -> Err | dict:
         if "name" not in result_dict or "data" not in result_dict:
             return Err(message=f"Aquired sensor has no name or data.")
 
-        return schema.GetSensor(name=result_dict["name"], data=result_dict["data"]).model_dump()
+        sensor = schema.GetSensor(name=result_dict["name"], data=result_dict["data"]).model_dump()
+        sensor_cache.set((username, name), sensor)
+        return sensor
 
     except Exception as e:
         logger.warning(f"Failed aquiring sensor: {e}")
         return Err(message=f"Unknown exception: {e}", code=500)
 
 
+async def get_sensors(username: str) -> Err | dict:
+    """
+       Retrieve all sensors of a user in a single query.
+
+       This function fetches only the ``sensors`` array of the user document and indexes
+       it by sensor name, so many readings can be validated with one database lookup.
+       The fetched sensors also refresh the sensor cache.
+       If the user does not exist or the operation fails, an error response is returned.
+
+       Args:
+           username (str): The username of the user who owns the sensors.
+
+       Returns:
+           ErrorResponse | dict: The error response if an error occurred, or a dictionary of sensors keyed by their name.
+    """
+
+    try:
+        db_users = await get_collection()
+        if db_users is None:
+            return Err(message=f"Cannot get DB collection.")
+
+        result = await db_users.find_one({"username": username}, {"_id": 0, "sensors": 1})
+        if not result:
+            return Err(message=f"Getting user '{username}' failed.", code=404)
+
+        sensors = {sensor["name"]: sensor
+                   for sensor in result.get("sensors", [])
+                   if "name" in sensor and "data" in sensor}
+        for name, sensor in sensors.items():
+            sensor_cache.set((username, name), schema.GetSensor(name=name, data=sensor["data"]).model_dump())
+        return sensors
+
+    except Exception as e:
+        logger.warning(f"Failed aquiring sensors: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
 async def delete_sensor(username : str, name : str) -> Err | str:
     """
     Delete a sensor by its name for a specific user.
@@ -205,8 +287,12 @@ async def delete_sensor(username : str, name : str) -> Err | str:
             {"username": username},
             {"$pull": {"sensors": {"name": name}}})
 
+        invalidate_sensor(username, name)
         if not result.acknowledged or result.modified_count == 0:
             return Err(message=f"Deleting sensor '{name}' failed.")
+
+        # NOTE: The sensor is removed even if its history could not be.
+        await reading_utils.delete_readings(username, name)
         return name
 
     except Exception as e:
@@ -234,15 +320,19 @@ async def update_sensor_name(username : str, name : str, new_name : str) -> Err
         if db_users is None:
             return Err(message=f"Cannot get DB collection.")
 
-        if not isinstance(await get_sensor(username, new_name), Err):
+        if not isinstance(await get_sensor(username, new_name, cached=False), Err):
             return Err(message=f"Sensor name '{new_name}' already exists.", code=409)
 
         result = await db_users.update_one(
             {"username": username, "sensors.name": name},
             {"$set": {"sensors.$.name": new_name}})
 
+        invalidate_sensor(username, name)
+        invalidate_sensor(username, new_name)
         if not result.acknowledged or result.modified_count == 0:
             return Err(message=f"Updating sensor name '{name}' with '{new_name}' failed.")
+
+        await reading_utils.rename_readings(username, name, new_name)
         return new_name
 
     except Exception as e:
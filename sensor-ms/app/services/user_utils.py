@@ -2,11 +2,14 @@
 # Date created: 13.01.2025
 
 from typing import Any
+from pymongo.errors import BulkWriteError
 from ..schemas import user_schemas as schema
 from ..models.user import User
 from ..helpers.database_helpers import get_collection
 from ..helpers.error import ErrorResponse as Err
 from ..models.sensors import DOOR
+from .sensor_utils import invalidate_user_sensors
+from .reading_utils import delete_readings
 
 # logger default library.
 from ..logger_setup import get_logger
@@ -41,6 +44,8 @@ async def create_user(user : schema.UserCreate) -> Err | str:
         if not result.acknowledged:
             return Err(message=f"Creating user failed.")
 
+        invalidate_user_sensors(user.username)
+
         logger.info(f"Created user: {user.username}")
         return str(user.username)
 
@@ -98,9 +103,11 @@ async def delete_user(username : str) -> Err | str:
             return Err(message=f"Cannot get DB collection.")
 
         result = await db_users.delete_one({"username": username})
+        invalidate_user_sensors(username)
         if not result.acknowledged:
             return Err(message=f"Deleting user '{username}' failed.")
 
+        await delete_readings(username)
         logger.info(f"Deleted user: {username}")
         return username
 
@@ -108,6 +115,95 @@ async def delete_user(username : str) -> Err | str:
         logger.warning(f"Failed deleting user: {e}")
         return Err(message=f"Unknown exception: {e}", code=500)
 
+async def create_users(usernames : list[str]) -> Err | dict[str, Err | str]:
+    """
+    Create many users in the database.
+
+    Existing users are looked up with a single query and the remaining users are
+    inserted together. Users that fail are reported while the others are created.
+
+    Args:
+        usernames (list[str]): The usernames of the users to create.
+
+    Returns:
+        ErrorResponse | dict[str, ErrorResponse | str]: The error response if the database could not be
+            reached, or the username or an error response for every requested user otherwise.
+    """
+
+    try:
+        db_users = await get_collection()
+        if db_users is None:
+            return Err(message=f"Cannot get DB collection.")
+
+        usernames = list(dict.fromkeys(usernames))
+        existing = {user["username"] async for user in
+                    db_users.find({"username": {"$in": usernames}}, {"_id": 0, "username": 1})}
+
+        results = {}
+        pending = []
+        for username in usernames:
+            if username in existing:
+                results[username] = Err(message=f"User with username {username} already exists.", code=402)
+            else:
+                pending.append(username)
+
+        if not pending:
+            return results
+
+        documents = [User(username=username, sensors=[]).model_dump(by_alias=True) for username in pending]
+        failed = {}
+        try:
+            await db_users.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error["errmsg"] for error in e.details.get("writeErrors", [])}
+
+        for index, username in enumerate(pending):
+            if index in failed:
+                results[username] = Err(message=f"Creating user failed: {failed[index]}")
+            else:
+                invalidate_user_sensors(username)
+                results[username] = username
+
+        logger.info(f"Created {len(pending) - len(failed)} of {len(usernames)} users.")
+        return results
+
+    except Exception as e:
+        logger.warning(f"Failed creating users: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
+async def delete_users(usernames : list[str]) -> Err | list[str]:
+    """
+    Delete many users together with the history of their sensors.
+
+    Like deleting a single user, users that do not exist are deleted successfully.
+
+    Args:
+        usernames (list[str]): The usernames of the users to delete.
+
+    Returns:
+        ErrorResponse | list[str]: The error response if an error occurred, or the deleted usernames.
+    """
+
+    try:
+        db_users = await get_collection()
+        if db_users is None:
+            return Err(message=f"Cannot get DB collection.")
+
+        usernames = list(dict.fromkeys(usernames))
+        result = await db_users.delete_many({"username": {"$in": usernames}})
+        for username in usernames:
+            invalidate_user_sensors(username)
+        if not result.acknowledged:
+            return Err(message=f"Deleting users failed.")
+
+        await delete_readings(usernames)
+        logger.info(f"Deleted {len(usernames)} users.")
+        return usernames
+
+    except Exception as e:
+        logger.warning(f"Failed deleting users: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
 async def delete_sensors(username : str) -> Err | str:
     """
     Remove all sensors for a specific user.
@@ -131,11 +227,14 @@ async def delete_sensors(username : str) -> Err | str:
             {"username": username},
             {"$set": {"sensors": []}})
 
+        invalidate_user_sensors(username)
         if not result.acknowledged:
             return Err(message=f"Emptying '{username}' contents failed.")
 
         if result.matched_count == 0:
             return Err(message=f"Couldnt match to any record in datbabase.")
+
+        await delete_readings(username)
         return username
 
     except Exception as e:
@@ -0,0 +1,81 @@
+# Author: Nina Mislej
+# Date created: 13.01.2025
+
+"""
+Benchmark of the sensor queue aggregation.
+
+Aggregates a generated queue of readings with the vectorized ``process_queue`` and with the
+previous per-entry ``post_process_data`` loop. The sensor lookups are mocked, so only the
+aggregation itself is measured. Run from the `sensor-ms` directory:
+
+    python -m benchmarks.process_queue_benchmark --readings 100000 --sensors 10
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from unittest.mock import AsyncMock, patch
+
+from app.models.sensors import Sensor, TEMPERATURE, HUMIDITY
+from app.schemas import user_schemas
+from app.services import sensor_data_utils
+
+USERNAME = "benchmark"
+
+def generate(readings: int, sensors: int) -> tuple[dict, list]:
+    """
+    Generates sensor definitions and a queue of readings spread evenly over them.
+    """
+
+    definitions = {}
+    for index in range(sensors):
+        if index % 2:
+            definitions[f"humidity-{index}"] = {"name": f"humidity-{index}",
+                                                "data": {"type": HUMIDITY, "max_humidity": 70, "min_humidity": 30}}
+        else:
+            definitions[f"temperature-{index}"] = {"name": f"temperature-{index}",
+                                                   "data": {"type": TEMPERATURE, "max_temperature": 25, "min_temperature": 15}}
+
+    names = list(definitions)
+    queue = []
+    for index in range(readings):
+        name = names[index % len(names)]
+        field = "humidity_level" if name.startswith("humidity") else "temperature"
+        queue.append({"username": USERNAME, "name": name, field: round(random.uniform(0, 100), 2)})
+    return definitions, queue
+
+async def run_vectorized(definitions: dict, queue: list) -> float:
+    with patch("app.services.sensor_utils.get_sensors", AsyncMock(return_value=definitions)):
+        start = time.perf_counter()
+        result = await sensor_data_utils.process_queue(USERNAME, queue)
+        elapsed = time.perf_counter() - start
+    assert not isinstance(result, sensor_data_utils.Err)
+    return elapsed
+
+async def run_per_entry(definitions: dict, queue: list) -> float:
+    async def get_valid_sensor(data: dict):
+        sensor = Sensor(**definitions[data["name"]])
+        return sensor.data.type, sensor
+
+    with patch("app.services.sensor_data_utils.get_valid_sensor", get_valid_sensor):
+        start = time.perf_counter()
+        response = user_schemas.GetSensorData(username=USERNAME, sensors={})
+        for entry in queue:
+            await sensor_data_utils.post_process_data(entry, response)
+        elapsed = time.perf_counter() - start
+    return elapsed
+
+async def main(readings: int, sensors: int, repeat: int):
+    definitions, queue = generate(readings, sensors)
+    for label, run in (("vectorized", run_vectorized), ("per-entry", run_per_entry)):
+        best = min([await run(definitions, queue) for _ in range(repeat)])
+        print(f"{label:>10}: {best * 1000:9.1f} ms  {readings / best:12,.0f} readings/s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark sensor queue aggregation.")
+    parser.add_argument("--readings", type=int, default=100000)
+    parser.add_argument("--sensors", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.readings, args.sensors, args.repeat))
@@ -9,10 +9,21 @@ from .test_users import (
     test_create_user,
     test_get_user,
     test_delete_user,
-    test_delete_user_sensors)
+    test_delete_user_sensors,
+    test_create_delete_users)
 
 from .test_sensors import (
     test_get_sensor,
     test_create_sensor,
     test_delete_sensor,
-    test_update_sensor_name)
\ No newline at end of file
+    test_update_sensor_name,
+    test_sensor_cache)
+
+from .test_sensor_data import (
+    test_receive_sensor_data_batch,
+    test_sensor_data_batch_limits,
+    test_get_sensor_readings,
+    test_sensor_data_retry,
+    test_process_queue,
+    test_publisher_timeout,
+    test_receive_budget)
\ No newline at end of file
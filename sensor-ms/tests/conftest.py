@@ -9,11 +9,13 @@ from httpx import AsyncClient, ASGITransport
 # Internal app dependencies.
 from app.api import users_api
 from app.api import sensor_api
+from app.api import sensor_data_api
 from .helpers import get_collection
 
 app = FastAPI(title="Sensor Managment Microservice - Test")
 app.include_router(users_api.router)
 app.include_router(sensor_api.router)
+app.include_router(sensor_data_api.router)
 
 # NOTE: Whatever is done before the yields is executed before the test function
 # everything after yields is excecuted after test function.
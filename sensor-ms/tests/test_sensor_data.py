@@ -0,0 +1,318 @@
+# Author: Nina Mislej
+# Date created: 09.01.2025
+
+# Enable async testing.
+import pytest
+import json
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Internal app dependencies.
+from app.services import sensor_utils, user_utils, reading_utils, sensor_data_utils
+from app.schemas import sensor_schemas, user_schemas
+from app.helpers import ErrorResponse as Err
+from app.rabitmq.sensor_data_publisher import SensorDataPublisher, PublishTimeout
+from app.rabitmq.sensor_data_exchange import receive_from_channel
+from .helpers import get_collection, USERNAME
+
+from skladischer_auth.token_utils import create_access_token
+
+# NOTE: The messaging system is not available in tests so publishing is mocked.
+
+@pytest.mark.anyio
+@patch("app.services.user_utils.get_collection", get_collection)
+@patch("app.services.sensor_utils.get_collection", get_collection)
+@patch("app.services.sensor_data_utils.get_collection", get_collection)
+@patch("app.services.reading_utils.get_collection", get_collection)
+@patch("app.rabitmq.sensor_data_exchange.publisher.publish_many", AsyncMock(return_value=None))
+async def test_receive_sensor_data_batch(client, cleanup):
+    """
+    Test sending a batch of sensor readings.
+
+    Asserts:
+        - The batch API responds with a 200 status code for a JSON array.
+        - Valid readings are processed and unknown sensors fail with a 404 status.
+        - The batch API responds with a 200 status code for an NDJSON body.
+        - The batch API responds with a 400 status code if the body is not an array.
+    """
+
+    username = await user_utils.create_user(user_schemas.UserCreate(username=USERNAME))
+    assert not isinstance(username, Err)
+    cleanup.append(username)
+
+    sensor = sensor_schemas.TemperatureSensorCreate(name="Termometer")
+    assert not isinstance(await sensor_utils.create_temperature_sensor(username, sensor), Err)
+    sensor = sensor_schemas.DoorSensorCreate(name="VhodnaVrata")
+    assert not isinstance(await sensor_utils.create_door_sensor(username, sensor), Err)
+
+    readings = [
+        {"username": username, "name": "Termometer", "temperature": 21.5},
+        {"username": username, "name": "VhodnaVrata"},
+        {"username": username, "name": "Neobstojec", "temperature": 20.0}]
+
+    # Test successful request with a JSON array.
+    response = await client.post(url=f"/sensors/sensor-data/batch", json=readings)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["processed"] == 2
+    assert result["failed"] == 1
+    assert result["readings"][2]["code"] == 404
+
+    # Test successful request with an NDJSON body.
+    body = "\n".join(json.dumps(reading) for reading in readings[:2])
+    response = await client.post(url=f"/sensors/sensor-data/batch",
+                                 headers={"Content-Type": "application/x-ndjson"},
+                                 content=body)
+    assert response.status_code == 200
+    assert response.json()["processed"] == 2
+
+    # Test unsuccessful request with a body that is not an array.
+    response = await client.post(url=f"/sensors/sensor-data/batch", json=readings[0])
+    assert response.status_code == 400
+
+@pytest.mark.anyio
+@patch("app.api.sensor_data_api.SENSOR_BATCH_MAX_SIZE", 2)
+@patch("app.api.sensor_data_api.SENSOR_READING_MAX_BYTES", 64)
+async def test_sensor_data_batch_limits(client):
+    """
+    Test rejecting batches of sensor readings that are too large.
+
+    Asserts:
+        - The batch API responds with a 413 status code for an NDJSON line longer than the limit.
+        - The batch API responds with a 413 status code for an NDJSON body without newlines.
+        - The batch API responds with a 413 status code for a JSON array body longer than the limit.
+    """
+
+    reading = {"username": USERNAME, "name": "Termometer", "description": "x" * 64}
+    response = await client.post(url=f"/sensors/sensor-data/batch",
+                                 headers={"Content-Type": "application/x-ndjson"},
+                                 content=json.dumps(reading) + "\n")
+    assert response.status_code == 413
+
+    response = await client.post(url=f"/sensors/sensor-data/batch",
+                                 headers={"Content-Type": "application/x-ndjson"},
+                                 content="x" * 1000)
+    assert response.status_code == 413
+
+    response = await client.post(url=f"/sensors/sensor-data/batch", json=[reading, reading])
+    assert response.status_code == 413
+
+@pytest.mark.anyio
+@patch("app.services.user_utils.get_collection", get_collection)
+@patch("app.services.sensor_utils.get_collection", get_collection)
+@patch("app.services.sensor_data_utils.get_collection", get_collection)
+@patch("app.services.reading_utils.get_collection", get_collection)
+@patch("app.rabitmq.sensor_data_exchange.publisher.publish_many", AsyncMock(return_value=None))
+async def test_get_sensor_readings(client, cleanup):
+    """
+    Test that ingested readings are stored and aggregated into rollups.
+
+    Asserts:
+        - The readings API responds with a 200 status code.
+        - The day rollup contains the count, minimum, maximum and mean of the readings.
+        - The readings API responds with a 200 status code for a range without a timezone.
+        - Raw readings are returned one per point.
+        - The readings API responds with a 400 status code for an unknown granularity.
+        - The readings API responds with a 400 status code for an unknown sensor.
+    """
+
+    username = await user_utils.create_user(user_schemas.UserCreate(username=USERNAME))
+    assert not isinstance(username, Err)
+    cleanup.append(username)
+
+    sensor = sensor_schemas.TemperatureSensorCreate(name="Termometer")
+    assert not isinstance(await sensor_utils.create_temperature_sensor(username, sensor), Err)
+
+    readings = [{"username": username, "name": "Termometer", "temperature": temperature}
+                for temperature in (20.0, 21.0, 25.0)]
+    response = await client.post(url=f"/sensors/sensor-data/batch", json=readings)
+    assert response.status_code == 200
+    assert response.json()["processed"] == 3
+
+    # Test the precomputed day rollup.
+    token = await create_access_token({"username": username})
+    response = await client.get(url=f"/sensors/{username}/Termometer/readings",
+                                headers={"Authorization": f"Bearer {token}"},
+                                params={"granularity": "day"})
+    assert response.status_code == 200
+    rollups = response.json()["readings"]
+    assert sum(rollup["count"] for rollup in rollups) == 3
+    assert min(rollup["min"] for rollup in rollups) == 20.0
+    assert max(rollup["max"] for rollup in rollups) == 25.0
+    # A batch is stored with a single timestamp, so it falls into one day.
+    assert len(rollups) == 1
+    assert rollups[0]["mean"] == 22.0
+
+    # Naive times are taken as UTC.
+    response = await client.get(url=f"/sensors/{username}/Termometer/readings",
+                                headers={"Authorization": f"Bearer {token}"},
+                                params={"granularity": "day", "start": "2000-01-01T00:00:00"})
+    assert response.status_code == 200
+
+    # Test raw readings.
+    response = await client.get(url=f"/sensors/{username}/Termometer/readings",
+                                headers={"Authorization": f"Bearer {token}"},
+                                params={"granularity": "raw"})
+    assert response.status_code == 200
+    assert len(response.json()["readings"]) == 3
+
+    # Test unsuccessful requests.
+    response = await client.get(url=f"/sensors/{username}/Termometer/readings",
+                                headers={"Authorization": f"Bearer {token}"},
+                                params={"granularity": "week"})
+    assert response.status_code == 400
+
+    response = await client.get(url=f"/sensors/{username}/Neobstojec/readings",
+                                headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400
+
+    assert not isinstance(await reading_utils.delete_readings(username), Err)
+
+@pytest.mark.anyio
+@patch("app.services.user_utils.get_collection", get_collection)
+@patch("app.services.sensor_utils.get_collection", get_collection)
+@patch("app.services.sensor_data_utils.get_collection", get_collection)
+@patch("app.services.reading_utils.get_collection", get_collection)
+async def test_sensor_data_retry(client, cleanup):
+    """
+    Test that readings rejected by the messaging system are not stored before a retry.
+
+    Asserts:
+        - Readings handed to the broker before the timeout are processed, the rest fail with a 503 status.
+        - Retrying the rejected reading stores every reading only once.
+    """
+
+    username = await user_utils.create_user(user_schemas.UserCreate(username=USERNAME))
+    assert not isinstance(username, Err)
+    cleanup.append(username)
+    assert not isinstance(await reading_utils.delete_readings(username), Err)
+
+    sensor = sensor_schemas.TemperatureSensorCreate(name="Termometer")
+    assert not isinstance(await sensor_utils.create_temperature_sensor(username, sensor), Err)
+
+    readings = [{"username": username, "name": "Termometer", "temperature": temperature}
+                for temperature in (20.0, 21.0)]
+    with patch("app.rabitmq.sensor_data_exchange.publisher.publish_many",
+               AsyncMock(side_effect=PublishTimeout([True, False]))):
+        response = await client.post(url=f"/sensors/sensor-data/batch", json=readings)
+    assert response.status_code == 200
+    assert [reading["code"] for reading in response.json()["readings"]] == [200, 503]
+
+    with patch("app.rabitmq.sensor_data_exchange.publisher.publish_many", AsyncMock(return_value=None)):
+        response = await client.post(url=f"/sensors/sensor-data/batch", json=readings[1:])
+    assert response.status_code == 200
+    assert response.json()["processed"] == 1
+
+    token = await create_access_token({"username": username})
+    response = await client.get(url=f"/sensors/{username}/Termometer/readings",
+                                headers={"Authorization": f"Bearer {token}"},
+                                params={"granularity": "raw"})
+    assert response.status_code == 200
+    assert len(response.json()["readings"]) == 2
+
+    assert not isinstance(await reading_utils.delete_readings(username), Err)
+
+@pytest.mark.anyio
+@patch("app.services.user_utils.get_collection", get_collection)
+@patch("app.services.sensor_utils.get_collection", get_collection)
+async def test_process_queue(cleanup):
+    """
+    Test aggregating a queue of sensor readings.
+
+    Asserts:
+        - The mean, minimum, maximum and count of the readings are computed per sensor.
+        - Readings outside the limits are counted and summarized in the details.
+        - Readings of unknown sensors and without a numeric value are skipped.
+    """
+
+    username = await user_utils.create_user(user_schemas.UserCreate(username=USERNAME))
+    assert not isinstance(username, Err)
+    cleanup.append(username)
+
+    sensor = sensor_schemas.HumiditySensorCreate(name="MerilecVlage", max_humidity=60, min_humidity=40)
+    assert not isinstance(await sensor_utils.create_humidity_sensor(username, sensor), Err)
+
+    queue = [{"username": username, "name": "MerilecVlage", "humidity_level": humidity}
+             for humidity in (30.0, 50.0, 70.0, 50.0)]
+    queue.append({"username": username, "name": "MerilecVlage", "humidity_level": "visoka"})
+    queue.append({"username": username, "name": "Neobstojec", "humidity_level": 50.0})
+
+    result = await sensor_data_utils.process_queue(username, queue)
+    assert not isinstance(result, Err)
+    assert list(result.sensors) == ["MerilecVlage"]
+
+    humidity = result.sensors["MerilecVlage"]
+    assert humidity.count == 4
+    assert humidity.data.humidity_level == 50.0
+    assert humidity.statistics.min == 30.0
+    assert humidity.statistics.max == 70.0
+    assert humidity.statistics.over_limit == 1
+    assert humidity.statistics.under_limit == 1
+    assert len(humidity.details) == 2
+
+@pytest.mark.anyio
+@patch("app.rabitmq.sensor_data_publisher.WORKER_RETRY_DELAY", 0)
+async def test_publisher_timeout():
+    """
+    Test publishing messages when the broker does not confirm them in time.
+
+    Asserts:
+        - A worker whose channel failed opens a new channel instead of stopping.
+        - Messages handed to the broker are reported as published, queued ones are withdrawn.
+        - Withdrawn messages are never published.
+    """
+
+    confirm = asyncio.Event()
+    published = []
+    async def publish(message, routing_key):
+        published.append(message.body)
+        await confirm.wait()
+
+    exchange = MagicMock()
+    exchange.publish = publish
+    broken = MagicMock()
+    broken.get_exchange = AsyncMock(side_effect=ConnectionError("Channel closed."))
+    channel = MagicMock()
+    channel.get_exchange = AsyncMock(return_value=exchange)
+
+    publisher = SensorDataPublisher(pool_size=1, batch_size=1, timeout=0.1)
+    publisher.connection = MagicMock(is_closed=False)
+    publisher.connection.channel = AsyncMock(return_value=channel)
+    worker = asyncio.create_task(publisher._worker(broken))
+    try:
+        with pytest.raises(PublishTimeout) as error:
+            await publisher.publish_many([(USERNAME, b"first"), (USERNAME, b"second"), (USERNAME, b"third")])
+        assert error.value.published == [True, False, False]
+
+        confirm.set()
+        await asyncio.sleep(0.05)
+        assert published == [b"first"]
+    finally:
+        worker.cancel()
+
+@pytest.mark.anyio
+@patch("app.services.user_utils.get_all_door_sensors", AsyncMock(return_value=[]))
+@patch("app.services.sensor_data_utils.process_queue",
+       AsyncMock(side_effect=lambda username, entries: user_schemas.GetSensorData(username=username, sensors={})))
+async def test_receive_budget():
+    """
+    Test reading sensor data from the queue with a message budget.
+
+    Asserts:
+        - ``has_more`` is not set if the budget is used up by the last message in the queue.
+        - ``has_more`` is set if messages are still waiting in the queue.
+    """
+
+    for queued, remaining in ((2, 0), (3, 1)):
+        messages = [MagicMock(body=json.dumps({"name": "Termometer"}).encode(), ack=AsyncMock(), nack=AsyncMock())
+                    for _ in range(queued)]
+        queue = MagicMock(bind=AsyncMock(), get=AsyncMock(side_effect=messages + [None]),
+                          declare=AsyncMock(return_value=MagicMock(message_count=remaining)))
+        channel = MagicMock(is_closed=False, get_exchange=AsyncMock(), close=AsyncMock(),
+                            declare_queue=AsyncMock(return_value=queue))
+        with patch("app.rabitmq.sensor_data_exchange.publisher.open_channel", AsyncMock(return_value=channel)):
+            result = await receive_from_channel(USERNAME, max_messages=2)
+
+        assert not isinstance(result, Err)
+        assert result.processed == 2
+        assert result.has_more == (remaining > 0)
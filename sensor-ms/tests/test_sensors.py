@@ -164,4 +164,39 @@ async def test_update_sensor_name(client, cleanup):
     response = await client.put(url=f"/sensors/{username}/{new_name}/update-name",
                                 headers={"Authorization": f"Bearer {token}"},
                                 params={"new_name": duplicated_name})
-    assert response.status_code == 409
\ No newline at end of file
+    assert response.status_code == 409
+
+@pytest.mark.anyio
+@patch("app.services.user_utils.get_collection", get_collection)
+@patch("app.services.sensor_utils.get_collection", get_collection)
+async def test_sensor_cache(cleanup):
+    """
+    Test that sensor definitions are cached and invalidated on changes.
+
+    Asserts:
+        - Repeated lookups of a sensor are served from the cache.
+        - Renaming a sensor invalidates the cached definition of the old name.
+        - Deleting a sensor invalidates its cached definition.
+    """
+
+    username = await user_utils.create_user(user_schemas.UserCreate(username=USERNAME))
+    assert not isinstance(username, Err)
+    cleanup.append(username)
+
+    sensor_create = sensor_schemas.TemperatureSensorCreate(name="Termometer")
+    assert not isinstance(await sensor_utils.create_temperature_sensor(username, sensor_create), Err)
+
+    # Test repeated lookups hit the cache.
+    assert not isinstance(await sensor_utils.get_sensor(username, "Termometer"), Err)
+    hits = sensor_utils.sensor_cache.hits
+    assert not isinstance(await sensor_utils.get_sensor(username, "Termometer"), Err)
+    assert sensor_utils.sensor_cache.hits == hits + 1
+
+    # Test renaming invalidates the old name.
+    assert not isinstance(await sensor_utils.update_sensor_name(username, "Termometer", "Toplomer"), Err)
+    assert isinstance(await sensor_utils.get_sensor(username, "Termometer"), Err)
+    assert not isinstance(await sensor_utils.get_sensor(username, "Toplomer"), Err)
+
+    # Test deleting invalidates the sensor.
+    assert not isinstance(await sensor_utils.delete_sensor(username, "Toplomer"), Err)
+    assert isinstance(await sensor_utils.get_sensor(username, "Toplomer"), Err)
@@ -98,4 +98,34 @@ async def test_delete_user_sensors(client, cleanup):
     cleanup.append(username)
     response = await client.put(url=f"/sensors/{username}/delete-sensors",
                                 headers={"Authorization": f"Bearer {token}"})
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+
+@pytest.mark.anyio
+@patch("app.services.user_utils.get_collection", get_collection)
+async def test_create_delete_users(cleanup):
+    """
+    Test creating and deleting many users at once.
+
+    Asserts:
+        - Every new user is created once, repeated usernames are ignored.
+        - Existing users are reported with a 402 status code.
+        - Deleted users cannot be retrieved anymore.
+    """
+
+    usernames = [USERNAME, f"{USERNAME}-bulk"]
+    cleanup.extend(usernames)
+
+    # Test successful request.
+    result = await utils.create_users(usernames + [USERNAME])
+    assert not isinstance(result, Err)
+    assert result == {username: username for username in usernames}
+
+    # Test unsuccessful request due to taken usernames.
+    result = await utils.create_users(usernames)
+    assert not isinstance(result, Err)
+    assert all(isinstance(outcome, Err) and outcome.code == 402 for outcome in result.values())
+
+    result = await utils.delete_users(usernames)
+    assert result == usernames
+    for username in usernames:
+        assert isinstance(await utils.get_user(username), Err)
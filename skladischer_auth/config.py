@@ -12,4 +12,7 @@ import os
 
 # Authorization.
 SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM")
\ No newline at end of file
+ALGORITHM = os.getenv("ALGORITHM")
+
+# Verified tokens kept in memory, zero disables the cache.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 1024))
@@ -3,7 +3,7 @@
 
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi import HTTPException, status, Request
-from .token_utils import validate_token
+from .token_utils import decode_token
 from typing import Optional
 
 class JWTBearer(HTTPBearer):
@@ -11,14 +11,19 @@ class JWTBearer(HTTPBearer):
     def __init__(self, auto_error: bool = True):
         super(JWTBearer, self).__init__(auto_error=auto_error)
 
-    async def __call__(self, request: Request) -> Optional[str]:
+    async def __call__(self, request: Request) -> Optional[dict]:
+        """
+        Verifies the bearer token of the request once and returns its claims,
+        which are passed on to ``validate_token_with_username``.
+        """
+
         credentials: HTTPAuthorizationCredentials = await super(JWTBearer, self).__call__(request)
         if credentials:
             if not credentials.scheme == "Bearer":
                 raise HTTPException(status_code=403, detail="Invalid authentication scheme.")
-            token = credentials.credentials
-            if not await validate_token(token):
+            claims = decode_token(credentials.credentials)
+            if claims is None:
                 raise HTTPException(status_code=403, detail="Invalid token or expired token.")
-            return token
+            return claims
         else:
-            raise HTTPException(status_code=403, detail="Invalid authorization code.")
\ No newline at end of file
+            raise HTTPException(status_code=403, detail="Invalid authorization code.")
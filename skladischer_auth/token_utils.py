@@ -2,9 +2,18 @@
 # Date created: 15.01.2025
 
 from datetime import datetime, timedelta, timezone
+from collections import OrderedDict
+import hashlib
+import time
 import jwt
+from jwt import InvalidTokenError
 
-from .config import SECRET_KEY, ALGORITHM
+from .config import SECRET_KEY, ALGORITHM, TOKEN_CACHE_SIZE
+
+# NOTE: Verified tokens are cached by their digest until they expire, so repeated
+#       requests of the same session skip decoding and checking the signature.
+#       Invalid tokens are never cached. Callers get a copy, so they cannot change the cached claims.
+_verified: OrderedDict[str, tuple[float, dict]] = OrderedDict()
 
 async def create_access_token(data: dict, expires: timedelta = timedelta(minutes=60)):
     content = data.copy()
@@ -13,23 +22,44 @@ async def create_access_token(data: dict, expires: timedelta = timedelta(minutes
     token = jwt.encode(content, SECRET_KEY, algorithm=ALGORITHM)
     return token
 
-async def validate_token(token: str) -> bool:
+def decode_token(token: str) -> dict | None:
+    """
+    Verify a token and return its claims, using the cache of verified tokens.
+
+    Args:
+        token (str): The encoded token.
+
+    Returns:
+        dict | None: The claims of the token, or None if it is invalid, expired or has no username.
+    """
+
+    key = hashlib.sha256(token.encode()).hexdigest()
+    cached = _verified.get(key)
+    if cached is not None:
+        expires, claims = cached
+        if expires > time.time():
+            _verified.move_to_end(key)
+            return dict(claims)
+        del _verified[key]
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        if "username" not in payload:
-            return False
-        return True
-    except InvalidTokenError as e:
-        print(e)
-        return False
-    except Exception:
-        return False
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except InvalidTokenError:
+        return None
+    if "username" not in claims:
+        return None
 
-async def validate_token_with_username(username, token) -> bool:
-    if not await validate_token(token):
-        return False
+    if TOKEN_CACHE_SIZE > 0:
+        _verified[key] = (claims.get("exp", time.time()), dict(claims))
+        while len(_verified) > TOKEN_CACHE_SIZE:
+            _verified.popitem(last=False)
+    return claims
+
+async def validate_token(token: str) -> bool:
+    return decode_token(token) is not None
 
-    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    if payload.get("username") != username:
+async def validate_token_with_username(username, token: str | dict) -> bool:
+    claims = token if isinstance(token, dict) else decode_token(token)
+    if claims is None:
         return False
-    return True
\ No newline at end of file
+    return claims.get("username") == username
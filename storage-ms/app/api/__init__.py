@@ -4,15 +4,21 @@ The `api` module provides implementation of enpoints for the HTTP requests.
 
 from .item_api import (
     create_item,
+    create_items,
+    import_items,
+    export_items,
+    list_items,
     delete_item,
     update_item,
-    get_item)
+    get_item,
+    get_item_image)
 
 from .users_api import (
     create_user,
     update_display_name,
     delete_user, get_user,
-    empty_storages)
+    empty_storages,
+    search_items)
 
 from .storage_api import (
     create_storage,
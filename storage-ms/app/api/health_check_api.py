@@ -2,30 +2,38 @@
 # Date created: 5.12.2024
 
 # REST FastAPI dependencies.
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from fastapi.responses import PlainTextResponse
 from fastapi.exceptions import HTTPException
 
+from motor.motor_asyncio import AsyncIOMotorCollection
+
 # Internal dependencies.
-from ..helpers.database_helpers import get_collection
+from ..helpers.database_helpers import collection_dependency, ping_collection
+from ..googlerpc.grpc_channels import check_channels
+from ..googlerpc.grpc_client import CODES_MS_TARGET
 
 router = APIRouter()
 
 @router.get("/liveness", status_code=200, response_class=PlainTextResponse)
-async def health():
+async def health(collection: AsyncIOMotorCollection | None = Depends(collection_dependency)):
     """
     This endpoint allows liveness check for Kubernetes clusters.
+    It pings the shared database collection and revalidates it if the ping fails.
     """
 
-    if await get_collection() is None:
+    if collection is None or not await ping_collection():
         raise HTTPException(status_code=400, detail="Database not found.")
     return "Status OK."
 
-# NOTE: Currently no special init conditions.
 @router.get("/readiness", status_code=200, response_class=PlainTextResponse)
 async def readiness():
     """
     This endpoint allows readiness check for Kubernetes clusters.
+    It fails if an RPC channel is not open or cannot connect to its server.
     """
 
+    states = check_channels(CODES_MS_TARGET)
+    if any(state in (None, "TRANSIENT_FAILURE") for state in states.values()):
+        raise HTTPException(status_code=400, detail="RPC channels are not connected.")
     return "Status OK."
\ No newline at end of file
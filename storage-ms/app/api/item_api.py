@@ -2,8 +2,9 @@
 # Date created: 5.12.2024
 
 # REST FastAPI dependencies.
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import PlainTextResponse
+from fastapi import APIRouter, HTTPException, Depends, Header, Request, Query
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from typing import Optional
 
 # OAuth2 authentication dependencies.
 from skladischer_auth.token_bearer import JWTBearer
@@ -13,7 +14,9 @@ from skladischer_auth.token_utils import validate_token_with_username
 from ..schemas import item_schemas as schema
 from ..models.item import Item
 from ..services import item_utils as utils
+from ..services import transfer_utils
 from ..helpers.error import ErrorResponse as Err
+from ..config import IMAGE_CACHE_MAX_AGE, PAGE_SIZE, PAGE_MAX_SIZE
 
 # Logging default library.
 from ..logger_setup import get_logger
@@ -27,7 +30,7 @@ router = APIRouter(
 )
 
 @router.post("/{username}/{storage_name}/create-item", status_code=200, response_class=PlainTextResponse)
-async def create_item(username: str, storage_name: str, item_schema: schema.ItemCreate, token : str = Depends(token_bearer)):
+async def create_item(username: str, storage_name: str, item_schema: schema.ItemCreate, claims : dict = Depends(token_bearer)):
     """
     This endpoint allows the creation of a new item within a specific storage for a user.
 
@@ -35,7 +38,7 @@ async def create_item(username: str, storage_name: str, item_schema: schema.Item
         username (str): The username of the user.
         storage_name (str): The name of the storage where the item will be created.
         item_schema (ItemCreate): The item details to be created.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
 
     Raises:
@@ -46,7 +49,7 @@ async def create_item(username: str, storage_name: str, item_schema: schema.Item
     """
 
     logger.debug("Create item endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.create_item(username, storage_name, item_schema)
@@ -55,8 +58,150 @@ async def create_item(username: str, storage_name: str, item_schema: schema.Item
 
     return result
 
+@router.post("/{username}/{storage_name}/create-items", status_code=200, response_model=list[str])
+async def create_items(username: str, storage_name: str, item_schemas: list[schema.ItemCreate], claims : dict = Depends(token_bearer)):
+    """
+    This endpoint allows the creation of many items within a specific storage for a user at once.
+
+    Args:
+        username (str): The username of the user.
+        storage_name (str): The name of the storage where the items will be created.
+        item_schemas (list[ItemCreate]): The details of the items to be created.
+        claims (dict): Claims of the access token generated at login time.
+
+    Raises:
+        HTTPException: If an error occurs during item creation.
+
+    Returns:
+        list[str]: The item codes if the items are created successfully.
+    """
+
+    logger.debug("Create items endpoint request.")
+    if not await validate_token_with_username(username, claims):
+        raise HTTPException(status_code=401, detail="Token username missmatch.")
+
+    result = await utils.create_items(username, storage_name, item_schemas)
+    if isinstance(result, Err):
+        raise HTTPException(status_code=result.code, detail=result.message)
+
+    return result
+
+@router.post("/{username}/{storage_name}/import-items", status_code=200, response_model=schema.ItemImportResult)
+async def import_items(username: str, storage_name: str, request: Request, claims : dict = Depends(token_bearer)):
+    """
+    This endpoint imports many items into a specific storage for a user.
+
+    The items are sent in the request body as a JSON array, as NDJSON or as CSV
+    with 'name', 'amount' and 'description' columns. The format is chosen by the
+    'Content-Type' header. Rows that cannot be created are reported with their
+    row number while the other rows are created.
+
+    Args:
+        username (str): The username of the user.
+        storage_name (str): The name of the storage where the items will be created.
+        request (Request): The request with the imported items as its body.
+        claims (dict): Claims of the access token generated at login time.
+
+    Raises:
+        HTTPException: If the import failed as a whole.
+
+    Returns:
+        ItemImportResult: The created item codes and the errors of failed rows.
+    """
+
+    logger.debug("Import items endpoint request.")
+    if not await validate_token_with_username(username, claims):
+        raise HTTPException(status_code=401, detail="Token username missmatch.")
+
+    body = await transfer_utils.read_body(request.stream())
+    if isinstance(body, Err):
+        raise HTTPException(status_code=body.code, detail=body.message)
+
+    media_type = request.headers.get("content-type", transfer_utils.JSON).split(";")[0].strip()
+    result = await transfer_utils.import_items(username, storage_name, body, media_type)
+    if isinstance(result, Err):
+        raise HTTPException(status_code=result.code, detail=result.message)
+
+    return result
+
+@router.get("/{username}/{storage_name}/export-items", response_class=StreamingResponse)
+async def export_items(username: str, storage_name: str,
+                       format: str = Query(default="ndjson", pattern="^(json|ndjson|csv)$"),
+                       claims : dict = Depends(token_bearer)):
+    """
+    This endpoint streams all items of a specific storage for a user.
+
+    Args:
+        username (str): The username of the user.
+        storage_name (str): The name of the storage.
+        format (str): The format of the export, 'json', 'ndjson' or 'csv'.
+        claims (dict): Claims of the access token generated at login time.
+
+    Raises:
+        HTTPException: If an error occurs before the export starts.
+
+    Returns:
+        StreamingResponse: The exported items.
+    """
+
+    logger.debug("Export items endpoint request.")
+    if not await validate_token_with_username(username, claims):
+        raise HTTPException(status_code=401, detail="Token username missmatch.")
+
+    media_type = transfer_utils.MEDIA_TYPES[format]
+    result = await transfer_utils.export_items(username, storage_name, media_type)
+    if isinstance(result, Err):
+        raise HTTPException(status_code=result.code, detail=result.message)
+
+    headers = {"Content-Disposition": f'attachment; filename="{storage_name}.{format}"'}
+    return StreamingResponse(result, media_type=media_type, headers=headers)
+
+@router.get("/{username}/{storage_name}/list-items", response_model=schema.ItemPage)
+async def list_items(username: str, storage_name: str,
+                     sort: str = Query(default="date_added", pattern="^(name|amount|date_added)$"),
+                     order: str = Query(default="asc", pattern="^(asc|desc)$"),
+                     limit: int = Query(default=PAGE_SIZE, ge=1, le=PAGE_MAX_SIZE),
+                     cursor: Optional[str] = None,
+                     name: Optional[str] = None,
+                     amount: Optional[int] = None,
+                     claims : dict = Depends(token_bearer)):
+    """
+    This endpoint fetches a page of items from a user's specified storage.
+
+    The ``next_cursor`` of a page is passed as ``cursor`` to fetch the following page
+    with the same sort order. The last page has no cursor.
+
+    Args:
+        username (str): The username of the user.
+        storage_name (str): The name of the storage containing the items.
+        sort (str): The field the items are sorted by, 'name', 'amount' or 'date_added'.
+        order (str): The sort order, 'asc' or 'desc'.
+        limit (int): The maximum number of items on the page.
+        cursor (str): The cursor returned with the previous page.
+        name (str): Only items with this name are listed.
+        amount (int): Only items with this amount are listed.
+        claims (dict): Claims of the access token generated at login time.
+
+    Raises:
+        HTTPException: If an error occurs during item retrieval.
+
+    Returns:
+        ItemPage: The items on the page, the cursor of the next page and the total count.
+    """
+
+    logger.debug("List items endpoint request.")
+    if not await validate_token_with_username(username, claims):
+        raise HTTPException(status_code=401, detail="Token username missmatch.")
+
+    flt = schema.ItemFilter(**{field: value for field, value in (("name", name), ("amount", amount)) if value is not None})
+    result = await utils.list_items(username, storage_name, flt, sort, order, limit, cursor)
+    if isinstance(result, Err):
+        raise HTTPException(status_code=result.code, detail=result.message)
+
+    return result
+
 @router.get("/{username}/{storage_name}/{item_code}", response_model=Item)
-async def get_item(username: str, storage_name: str, item_code: str, token : str = Depends(token_bearer)):
+async def get_item(username: str, storage_name: str, item_code: str, claims : dict = Depends(token_bearer)):
     """
     This endpoint fetches an item by its unique code from a user's specified storage.
 
@@ -64,7 +209,7 @@ async def get_item(username: str, storage_name: str, item_code: str, token : str
         username (str): The username of the user.
         storage_name (str): The name of the storage containing the item.
         item_code (str): The unique code of the item.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during item retrieval.
@@ -74,7 +219,7 @@ async def get_item(username: str, storage_name: str, item_code: str, token : str
     """
 
     logger.debug("Get item endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.get_item(username, storage_name, item_code)
@@ -83,8 +228,49 @@ async def get_item(username: str, storage_name: str, item_code: str, token : str
 
     return result
 
+@router.get("/{username}/{storage_name}/{item_code}/image", response_class=Response)
+async def get_item_image(username: str, storage_name: str, item_code: str,
+                         if_none_match: Optional[str] = Header(default=None),
+                         claims : dict = Depends(token_bearer)):
+    """
+    This endpoint returns the code image of an item as raw bytes.
+
+    Images never change once stored, so the response can be cached by the client.
+    The image identifier is sent as the ETag and a matching 'If-None-Match' header
+    is answered with 304 Not Modified.
+
+    Args:
+        username (str): The username of the user.
+        storage_name (str): The name of the storage containing the item.
+        item_code (str): The unique code of the item.
+        if_none_match (str): The ETag of the image the client already has.
+        claims (dict): Claims of the access token generated at login time.
+
+    Raises:
+        HTTPException: If an error occurs during image retrieval.
+
+    Returns:
+        Response: The image with its media type.
+    """
+
+    logger.debug("Get item image endpoint request.")
+    if not await validate_token_with_username(username, claims):
+        raise HTTPException(status_code=401, detail="Token username missmatch.")
+
+    result = await utils.get_item_image(username, storage_name, item_code)
+    if isinstance(result, Err):
+        raise HTTPException(status_code=result.code, detail=result.message)
+
+    image, media_type, image_id = result
+    headers = {
+        "ETag": f'"{image_id}"',
+        "Cache-Control": f"private, max-age={IMAGE_CACHE_MAX_AGE}, immutable"}
+    if if_none_match and image_id in {tag.strip().removeprefix("W/").strip('"') for tag in if_none_match.split(",")}:
+        return Response(status_code=304, headers=headers)
+    return Response(content=image, media_type=media_type, headers=headers)
+
 @router.delete("/{username}/{storage_name}/{item_code}", status_code=200, response_class=PlainTextResponse)
-async def delete_item(username: str, storage_name: str, item_code: str, token : str = Depends(token_bearer)):
+async def delete_item(username: str, storage_name: str, item_code: str, claims : dict = Depends(token_bearer)):
     """
     Delete an item from a user's storage.
 
@@ -94,7 +280,7 @@ async def delete_item(username: str, storage_name: str, item_code: str, token :
         username (str): The identifier of the user.
         storage_name (str): The name of the storage containing the item.
         item_code (str): The unique code of the item to delete.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during item deletion.
@@ -104,7 +290,7 @@ async def delete_item(username: str, storage_name: str, item_code: str, token :
     """
 
     logger.debug("Delete item endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.delete_item(username, storage_name, item_code)
@@ -114,7 +300,7 @@ async def delete_item(username: str, storage_name: str, item_code: str, token :
     return result
 
 @router.put("/{username}/{storage_name}/{item_code}", status_code=200, response_class=PlainTextResponse)
-async def update_item(username: str, storage_name: str,  item_code: str, item : schema.ItemUpdate, token : str = Depends(token_bearer)):
+async def update_item(username: str, storage_name: str,  item_code: str, item : schema.ItemUpdate, claims : dict = Depends(token_bearer)):
     """
     This endpoint allows updating the details of an existing item in a specified storage.
 
@@ -123,7 +309,7 @@ async def update_item(username: str, storage_name: str,  item_code: str, item :
         storage_name (str): The name of the storage containing the item.
         item_code (str): The unique code of the item to update.
         item (ItemUpdate): The updated item details.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during item update.
@@ -133,7 +319,7 @@ async def update_item(username: str, storage_name: str,  item_code: str, item :
     """
 
     logger.debug("Update item endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.update_item(username, storage_name, item_code, item)
@@ -2,8 +2,9 @@
 # Date created: 5.12.2024
 
 # REST FastAPI dependencies.
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import PlainTextResponse
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import Optional
 
 # OAuth2 authentication dependencies.
 from skladischer_auth.token_bearer import JWTBearer
@@ -14,6 +15,7 @@ from ..schemas import storage_schemas as schema
 from ..services import storage_utils as utils
 from ..models.storage import Storage
 from ..helpers.error import ErrorResponse as Err
+from ..services import transfer_utils
 
 
 # Logging default library.
@@ -28,14 +30,14 @@ router = APIRouter(
 )
 
 @router.post("/{username}/create-storage", status_code=200, response_class=PlainTextResponse)
-async def create_storage(username: str, storage_schema : schema.StorageCreate, token : str = Depends(token_bearer)):
+async def create_storage(username: str, storage_schema : schema.StorageCreate, claims : dict = Depends(token_bearer)):
     """
     This endpoint allows the creation of a storage in a user's account.
 
     Args:
         username (str): The username of the user.
         storage_schema (StorageCreate): The storage details to create.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during storage creation.
@@ -45,7 +47,7 @@ async def create_storage(username: str, storage_schema : schema.StorageCreate, t
     """
 
     logger.debug("Create storage endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.create_storage(username, storage_schema)
@@ -55,14 +57,23 @@ async def create_storage(username: str, storage_schema : schema.StorageCreate, t
     return result
 
 @router.get("/{username}/{storage_name}", response_model=Storage)
-async def get_storage(username: str, storage_name: str, token : str = Depends(token_bearer)):
+async def get_storage(username: str, storage_name: str,
+                      format: Optional[str] = Query(default=None, pattern="^(json|ndjson)$"),
+                      fields: Optional[str] = None,
+                      claims : dict = Depends(token_bearer)):
     """
     This endpoint fetches the details of a specific storage for a user.
 
+    If ``format`` is set the storage is streamed as JSON or as NDJSON with one item
+    per line, which keeps memory use low for large storages. Streamed items can be
+    limited to a comma separated list of ``fields``.
+
     Args:
         username (str): The username of the user.
         storage_name (str): The name of the storage to retrieve.
-        token (str): Access token generated at login time.
+        format (str): Stream the storage as 'json' or 'ndjson'.
+        fields (str): The item fields included in the stream, all by default.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during storage retrieval.
@@ -72,9 +83,17 @@ async def get_storage(username: str, storage_name: str, token : str = Depends(to
     """
 
     logger.debug("Get storage endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
+    if format:
+        media_type = transfer_utils.MEDIA_TYPES[format]
+        result = await transfer_utils.stream_storage(username, storage_name, media_type,
+                                                     fields.split(",") if fields else None)
+        if isinstance(result, Err):
+            raise HTTPException(status_code=result.code, detail=result.message)
+        return StreamingResponse(result, media_type=media_type)
+
     result = await utils.get_storage(username, storage_name)
     if isinstance(result, Err):
         raise HTTPException(status_code=result.code, detail=result.message)
@@ -82,14 +101,14 @@ async def get_storage(username: str, storage_name: str, token : str = Depends(to
     return result
 
 @router.delete("/{username}/{storage_name}", status_code=200, response_class=PlainTextResponse)
-async def delete_storage(username: str, storage_name: str, token : str = Depends(token_bearer)):
+async def delete_storage(username: str, storage_name: str, claims : dict = Depends(token_bearer)):
     """
     This endpoint removes a storage from a user's account by its name.
 
     Args:
         username (str): The username of the user.
         storage_name (str): The name of the storage to delete.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during storage deletion.
@@ -99,7 +118,7 @@ async def delete_storage(username: str, storage_name: str, token : str = Depends
     """
 
     logger.debug("Delete storage endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.delete_storage(username, storage_name)
@@ -109,7 +128,7 @@ async def delete_storage(username: str, storage_name: str, token : str = Depends
     return result
 
 @router.put("/{username}/{storage_name}/update-name", status_code=200, response_class=PlainTextResponse)
-async def update_storage_name(username: str, storage_name: str, new_name : str, token : str = Depends(token_bearer)):
+async def update_storage_name(username: str, storage_name: str, new_name : str, claims : dict = Depends(token_bearer)):
     """
     This endpoint allows renaming an existing storage in a user's account.
 
@@ -117,7 +136,7 @@ async def update_storage_name(username: str, storage_name: str, new_name : str,
         username (str): The username of the user.
         storage_name (str): The current name of the storage.
         new_name (str): The new name for the storage.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during storage name update.
@@ -127,7 +146,7 @@ async def update_storage_name(username: str, storage_name: str, new_name : str,
     """
 
     logger.debug("Update storage endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.update_storage_name(username, storage_name, new_name)
@@ -137,14 +156,14 @@ async def update_storage_name(username: str, storage_name: str, new_name : str,
     return result
 
 @router.put("/{username}/{storage_name}/empty-storage", status_code=200, response_class=PlainTextResponse)
-async def empty_storage(username: str, storage_name: str, token : str = Depends(token_bearer)):
+async def empty_storage(username: str, storage_name: str, claims : dict = Depends(token_bearer)):
     """
     This endpoint clears all items from a specified storage.
 
     Args:
         username (str): The username of the user.
         storage_name (str): The name of the storage to empty.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during storage clearing.
@@ -154,7 +173,7 @@ async def empty_storage(username: str, storage_name: str, token : str = Depends(
     """
 
     logger.debug("Empty storage endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.empty_storage(username, storage_name)
@@ -2,8 +2,9 @@
 # Date created: 5.12.2024
 
 # REST FastAPI dependencies.
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import PlainTextResponse
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import Optional, List
 
 # OAuth2 authentication dependencies.
 from skladischer_auth.token_bearer import JWTBearer
@@ -14,6 +15,9 @@ from ..schemas import user_schemas as schema
 from ..services import user_utils as utils
 from ..models.user import User
 from ..helpers.error import ErrorResponse as Err
+from ..services import transfer_utils, search_utils
+from ..schemas.item_schemas import ItemMatch
+from ..config import SEARCH_LIMIT, SEARCH_MAX_LIMIT
 
 # Logging default library.
 from ..logger_setup import get_logger
@@ -27,13 +31,13 @@ router = APIRouter(
 )
 
 @router.post("/create-user", status_code=200, response_class=PlainTextResponse)
-async def create_user(user_schema : schema.UserCreate, token : str = Depends(token_bearer)):
+async def create_user(user_schema : schema.UserCreate, claims : dict = Depends(token_bearer)):
     """
     This endpoint allows creating a new user in the system.
 
     Args:
         user_schema (UserCreate): The details of the user to create.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during user creation.
@@ -50,13 +54,22 @@ async def create_user(user_schema : schema.UserCreate, token : str = Depends(tok
     return result
 
 @router.get("/{username}", response_model=User)
-async def get_user(username: str, token : str = Depends(token_bearer)):
+async def get_user(username: str,
+                   format: Optional[str] = Query(default=None, pattern="^(json|ndjson)$"),
+                   fields: Optional[str] = None,
+                   claims : dict = Depends(token_bearer)):
     """
     This endpoint fetches the details of a user from the system.
 
+    If ``format`` is set the user is streamed as JSON or as NDJSON with one item
+    per line, which keeps memory use low for large inventories. Streamed items can
+    be limited to a comma separated list of ``fields``.
+
     Args:
         username (str): The username of the user to retrieve.
-        token (str): Access token generated at login time.
+        format (str): Stream the user as 'json' or 'ndjson'.
+        fields (str): The item fields included in the stream, all by default.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during user retrieval.
@@ -66,23 +79,63 @@ async def get_user(username: str, token : str = Depends(token_bearer)):
     """
 
     logger.debug("Get user endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
+    if format:
+        media_type = transfer_utils.MEDIA_TYPES[format]
+        result = await transfer_utils.stream_user(username, media_type, fields.split(",") if fields else None)
+        if isinstance(result, Err):
+            raise HTTPException(status_code=result.code, detail=result.message)
+        return StreamingResponse(result, media_type=media_type)
+
     result = await utils.get_user(username)
     if isinstance(result, Err):
         raise HTTPException(status_code=result.code, detail=result.message)
 
     return result
 
+@router.get("/{username}/search-items", response_model=List[ItemMatch])
+async def search_items(username: str, text: str = Query(min_length=1),
+                       storage_name: Optional[str] = None,
+                       limit: int = Query(default=SEARCH_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+                       claims : dict = Depends(token_bearer)):
+    """
+    This endpoint searches the items of a user by their name and description.
+    Misspelled and partial words match too, the best matches are returned first.
+
+    Args:
+        username (str): The username of the user.
+        text (str): The searched text.
+        storage_name (str): Only items in this storage are searched, all storages by default.
+        limit (int): The maximum number of items returned.
+        claims (dict): Claims of the access token generated at login time.
+
+    Raises:
+        HTTPException: If an error occurs during searching.
+
+    Returns:
+        List[ItemMatch]: The matching items with their storage and score.
+    """
+
+    logger.debug("Search items endpoint request.")
+    if not await validate_token_with_username(username, claims):
+        raise HTTPException(status_code=401, detail="Token username missmatch.")
+
+    result = await search_utils.search_items(username, text, storage_name, limit)
+    if isinstance(result, Err):
+        raise HTTPException(status_code=result.code, detail=result.message)
+
+    return result
+
 @router.delete("/{username}", status_code=200, response_class=PlainTextResponse)
-async def delete_user(username: str, token : str = Depends(token_bearer)):
+async def delete_user(username: str, claims : dict = Depends(token_bearer)):
     """
     This endpoint removes a user from the system by their username.
 
     Args:
         username (str): The username of the user to delete.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during user deletion.
@@ -92,7 +145,7 @@ async def delete_user(username: str, token : str = Depends(token_bearer)):
     """
 
     logger.debug("Delete user endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.delete_user(username)
@@ -102,14 +155,14 @@ async def delete_user(username: str, token : str = Depends(token_bearer)):
     return result
 
 @router.put("/{username}/update-name", status_code=200, response_class=PlainTextResponse)
-async def update_display_name(username: str, new_name : str, token : str = Depends(token_bearer)):
+async def update_display_name(username: str, new_name : str, claims : dict = Depends(token_bearer)):
     """
     This endpoint allows updating the display name of a user.
 
     Args:
         username (str): The username of the user to update.
         new_name (str): The new display name for the user.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during display name update.
@@ -119,7 +172,7 @@ async def update_display_name(username: str, new_name : str, token : str = Depen
     """
 
     logger.debug("Update user endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.update_display_name(username, new_name)
@@ -129,13 +182,13 @@ async def update_display_name(username: str, new_name : str, token : str = Depen
     return result
 
 @router.put("/{username}/empty-storages", status_code=200, response_class=PlainTextResponse)
-async def empty_storages(username: str, token : str = Depends(token_bearer)):
+async def empty_storages(username: str, claims : dict = Depends(token_bearer)):
     """
     This endpoint clears all storages in a user's account.
 
     Args:
         username (str): The username of the user whose storages will be emptied.
-        token (str): Access token generated at login time.
+        claims (dict): Claims of the access token generated at login time.
 
     Raises:
         HTTPException: If an error occurs during storages clearing.
@@ -145,7 +198,7 @@ async def empty_storages(username: str, token : str = Depends(token_bearer)):
     """
 
     logger.debug("Empty user storages endpoint request.")
-    if not await validate_token_with_username(username, token):
+    if not await validate_token_with_username(username, claims):
         raise HTTPException(status_code=401, detail="Token username missmatch.")
 
     result = await utils.empty_storages(username)
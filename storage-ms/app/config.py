@@ -14,10 +14,52 @@ import os
 MONGO_URL = os.getenv("DATABASE_URL")
 DATABASE_NAME = os.getenv("DATABASE_NAME")
 COLLECTION = os.getenv("COLLECTION")
+STORAGES_COLLECTION = os.getenv("STORAGES_COLLECTION", "storages")
+ITEMS_COLLECTION = os.getenv("ITEMS_COLLECTION", "items")
+
+# Item images stored in GridFS.
+IMAGES_BUCKET = os.getenv("IMAGES_BUCKET", "images")
+IMAGE_CACHE_MAX_AGE = int(os.getenv("IMAGE_CACHE_MAX_AGE", 365 * 24 * 3600))
+
+# Bulk item import.
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", 10000))
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", 16 * 1024 * 1024))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 500))
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", 4))
+
+# Users created or deleted together over a streaming RPC are written in batches of this size.
+USER_BATCH_SIZE = int(os.getenv("USER_BATCH_SIZE", 500))
+
+# Item pagination. Totals are counted exactly up to the count limit.
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", 50))
+PAGE_MAX_SIZE = int(os.getenv("PAGE_MAX_SIZE", 200))
+PAGE_COUNT_LIMIT = int(os.getenv("PAGE_COUNT_LIMIT", 10000))
+
+# Item search. Items match if they score at least the minimum score,
+# descriptions contribute at most the maximum number of search terms.
+SEARCH_LIMIT = int(os.getenv("SEARCH_LIMIT", 20))
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", 100))
+SEARCH_MIN_SCORE = float(os.getenv("SEARCH_MIN_SCORE", 0.3))
+SEARCH_MAX_TERMS = int(os.getenv("SEARCH_MAX_TERMS", 512))
+
+# Streamed responses are sent in chunks of about this many bytes.
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", 64 * 1024))
+
+# Database connection pool.
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 60000))
 
 # Other microservices communiacting over RPC.
 CODES_MS_HOST = os.getenv("CODES_MS_HOST")
 
+# GRPC client channels.
+GRPC_TIMEOUT = float(os.getenv("GRPC_TIMEOUT", 5.0))
+GRPC_KEEPALIVE_TIME_MS = int(os.getenv("GRPC_KEEPALIVE_TIME_MS", 30000))
+GRPC_KEEPALIVE_TIMEOUT_MS = int(os.getenv("GRPC_KEEPALIVE_TIMEOUT_MS", 10000))
+GRPC_MAX_ATTEMPTS = int(os.getenv("GRPC_MAX_ATTEMPTS", 3))
+GRPC_BATCH_TIMEOUT = float(os.getenv("GRPC_BATCH_TIMEOUT", 300.0))
+
 # Authorization.
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
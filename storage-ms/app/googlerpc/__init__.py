@@ -3,8 +3,15 @@ The `googlerpc` module provides GRPC integration for communication between micro
 """
 
 from .grpc_client import (
-    create_code)
+    create_code,
+    create_codes)
 
 from .grpc_server import (
     StorageService,
-    serve)
\ No newline at end of file
+    serve)
+
+from .grpc_channels import (
+    get_channel,
+    open_channels,
+    check_channels,
+    close_channels)
\ No newline at end of file
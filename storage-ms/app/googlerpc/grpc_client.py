@@ -2,7 +2,9 @@
 # Date created: 5.12.2024
 
 # Internal dependencies.
-from ..config import CODES_MS_HOST
+from ..config import CODES_MS_HOST, GRPC_TIMEOUT, GRPC_BATCH_TIMEOUT
+from ..helpers.error import ErrorResponse as Err
+from .grpc_channels import get_channel
 
 # GRPC Logic.
 import asyncio
@@ -15,22 +17,59 @@ import grpc
 from ..logger_setup import get_logger
 logger = get_logger("storage-ms.googlerpc")
 
-async def create_code(item_code : str) -> str:
+CODES_MS_TARGET = f"{CODES_MS_HOST}:{PORT_CODE}"
+
+async def create_code(item_code : str) -> Err | str:
     """
     Sends a GRPC request to the CodeService to create a code for a given item.
+    The request is sent over the pooled channel to the Code microservice.
 
     Args:
         item_code (str): The unique identifier of the item for which the code is created.
 
     Returns:
-        str: The generated code image in Base64 format.
+        ErrorResponse | str: The generated code image in Base64 format or an error response if an error occurred.
     """
 
     try:
-        async with grpc.aio.insecure_channel(f"{CODES_MS_HOST}:{PORT_CODE}") as channel:
-            stub = pb_grpc.CodeServiceStub(channel)
-            response = await stub.CreateCode(pb.CodeRequest(item_code=item_code))
+        stub = pb_grpc.CodeServiceStub(get_channel(CODES_MS_TARGET))
+        response = await stub.CreateCode(pb.CodeRequest(item_code=item_code), timeout=GRPC_TIMEOUT)
         return response.image_base64
     except Exception as e:
         logger.warning(f"RPC failure: {e}")
         return Err(message=f"RPC Client Error: {e}", code=400)
+
+async def create_codes(item_codes : list[str]) -> Err | dict[str, Err | str]:
+    """
+    Sends a streaming GRPC request to the CodeService to create codes for many items.
+    All codes are sent over a single call and the images are collected as they are created.
+
+    Args:
+        item_codes (list[str]): The unique identifiers of the items for which the codes are created.
+
+    Returns:
+        ErrorResponse | dict[str, ErrorResponse | str]: An error response if the call failed, or the
+            generated code image in Base64 format or an error response for every item code otherwise.
+    """
+
+    async def requests():
+        for item_code in item_codes:
+            yield pb.CodeRequest(item_code=item_code)
+
+    try:
+        stub = pb_grpc.CodeServiceStub(get_channel(CODES_MS_TARGET))
+        images = {}
+        async for response in stub.CreateCodes(requests(), timeout=GRPC_BATCH_TIMEOUT):
+            if response.error:
+                images[response.item_code] = Err(message=f"RPC Server Error: {response.error}", code=400)
+            else:
+                images[response.item_code] = response.image_base64
+
+        for item_code in item_codes:
+            if item_code not in images:
+                images[item_code] = Err(message=f"RPC Server Error: No code created for '{item_code}'.", code=400)
+        return images
+
+    except Exception as e:
+        logger.warning(f"RPC failure: {e}")
+        return Err(message=f"RPC Client Error: {e}", code=400)
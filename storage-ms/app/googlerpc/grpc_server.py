@@ -5,6 +5,7 @@
 from ..schemas import user_schemas as schema
 from ..helpers.error import ErrorResponse as Err
 from ..services import user_utils as utils
+from ..config import USER_BATCH_SIZE
 
 # GRPC Logic.
 import asyncio
@@ -18,6 +19,53 @@ import grpc
 from ..logger_setup import get_logger
 logger = get_logger("storage-ms.googlerpc")
 
+async def batches(request_iterator, size: int):
+    """
+    Collects the usernames of a stream of requests into batches.
+
+    Args:
+        request_iterator: The stream of requests, each containing a `username`.
+        size (int): The maximum number of usernames in a batch.
+
+    Yields:
+        list[str]: The usernames of the next batch.
+    """
+
+    batch = []
+    async for request in request_iterator:
+        batch.append(request.username)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def user_responses(usernames: list[str], result: Err | dict[str, Err | str] | list[str]):
+    """
+    Builds a response for every user of a batch.
+
+    Args:
+        usernames (list[str]): The usernames of the batch.
+        result (ErrorResponse | dict | list[str]): The error response if the whole batch failed, the username
+            or an error response for every user, or the usernames if every user succeeded.
+
+    Yields:
+        pb.UserResponse: A response with the username and an error message if the user failed.
+    """
+
+    if isinstance(result, Err):
+        logger.warning(f"RPC Server failure for {len(usernames)} users: {result.message}")
+        result = {username: result for username in usernames}
+    elif isinstance(result, list):
+        result = {username: username for username in result}
+
+    for username in usernames:
+        outcome = result.get(username, Err(message=f"No result for user '{username}'."))
+        if isinstance(outcome, Err):
+            yield pb.UserResponse(username=username, error=outcome.message)
+        else:
+            yield pb.UserResponse(username=username)
+
 class StorageService(pb_grpc.StorageServiceServicer):
     """
     Handles the GRPC request for creating a user.
@@ -72,6 +120,44 @@ class StorageService(pb_grpc.StorageServiceServicer):
             return pb.UserResponse()
         return pb.UserResponse(username=result)
 
+    async def CreateUsers(self, request_iterator, context):
+        """
+        Handles the streaming gRPC request to create many users.
+
+        Requests are read in batches of ``USER_BATCH_SIZE`` users and every batch is
+        inserted with a single database write. A response is sent for every user.
+
+        Args:
+            request_iterator: The stream of requests, each containing the `username` to create.
+            context: The gRPC context for managing request metadata and status.
+
+        Yields:
+            pb.UserResponse: A response with the username, and an error message if the user was not created.
+        """
+
+        async for usernames in batches(request_iterator, USER_BATCH_SIZE):
+            for response in user_responses(usernames, await utils.create_users(usernames)):
+                yield response
+
+    async def DeleteUsers(self, request_iterator, context):
+        """
+        Handles the streaming gRPC request to delete many users.
+
+        Requests are read in batches of ``USER_BATCH_SIZE`` users and every batch is
+        removed with a single database write. A response is sent for every user.
+
+        Args:
+            request_iterator: The stream of requests, each containing the `username` to delete.
+            context: The gRPC context for managing request metadata and status.
+
+        Yields:
+            pb.UserResponse: A response with the username, and an error message if the user was not deleted.
+        """
+
+        async for usernames in batches(request_iterator, USER_BATCH_SIZE):
+            for response in user_responses(usernames, await utils.delete_users(usernames)):
+                yield response
+
 async def serve():
     """
     Starts the GRPC server to handle storage microservice internal requests.
@@ -5,10 +5,15 @@
 from ariadne import QueryType, ObjectType
 from typing import List, Dict, Optional
 
+# OAuth2 authentication dependencies.
+from skladischer_auth.token_utils import validate_token_with_username
+
 # Internal dependencies.
 from ..helpers.error import ErrorResponse as Err
 from ..services import item_utils as utils
+from ..services import search_utils
 from ..schemas import item_schemas
+from ..config import PAGE_SIZE, SEARCH_LIMIT, SEARCH_MAX_LIMIT
 
 # logger default library.
 from ..logger_setup import get_logger
@@ -17,8 +22,53 @@ logger = get_logger("storage-ms.graphql")
 query = QueryType()
 items = ObjectType("Item")
 
+def selected_fields(info, path: tuple[str, ...] = ()) -> list[str] | None:
+    """
+    Return the fields selected in the query, so only those are fetched from the database.
+
+    Args:
+        info (GraphQLResolveInfo): Metadata about the query.
+        path (tuple[str, ...]): The names of the nested fields holding the selection.
+
+    Returns:
+        list[str] | None: The selected field names, or None if they cannot be determined,
+            for example because fragments are used.
+    """
+
+    selection_set = info.field_nodes[0].selection_set
+    for name in path:
+        nodes = [node for node in selection_set.selections if getattr(node, "name", None) and node.name.value == name]
+        if len(nodes) != 1 or nodes[0].selection_set is None:
+            return None
+        selection_set = nodes[0].selection_set
+
+    fields = []
+    for node in selection_set.selections:
+        if node.kind != "field":
+            return None
+        fields.append(node.name.value)
+    return fields
+
+async def authorized(info, username: str) -> bool:
+    """
+    Check that the bearer token of the GraphQL request belongs to ``username``.
+
+    Args:
+        info (GraphQLResolveInfo): Metadata about the query.
+        username (str): The username the query accesses.
+
+    Returns:
+        bool: True if the token is valid and belongs to the user, False otherwise.
+    """
+
+    scheme, _, token = info.context["request"].headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    return await validate_token_with_username(username, token)
+
 @query.field("items")
-async def resolve_items(_, info, username: str, storage_name: str, filtering: dict):
+async def resolve_items(_, info, username: str, storage_name: str, filtering: dict,
+                        sort: Optional[str] = None, order: Optional[str] = None, limit: Optional[int] = None):
     """
     Resolver for fetching and filtering items in a storage.
     This resolver processes a GraphQL query to retrieve items stored in a specific
@@ -33,8 +83,13 @@ async def resolve_items(_, info, username: str, storage_name: str, filtering: di
         storage_name (str): The name of the storage to fetch items from.
         filtering (dict): A dictionary containing filtering criteria for items.
             This is validated against the `ItemFilter` schema.
+        sort (str): The field the items are sorted by, 'date_added' if only ``order`` is given
+            and unsorted if both are missing.
+        order (str): The sort order, 'asc' or 'desc', 'asc' if missing.
+        limit (int): The maximum number of items returned, all if missing.
 
     Raises:
+        Exception: If the bearer token does not belong to the user.
         Exception: If the filtering criteria do not match the `ItemFilter` schema.
         Exception: If the utility function `filter_items` returns an error.
 
@@ -43,13 +98,93 @@ async def resolve_items(_, info, username: str, storage_name: str, filtering: di
             is represented as a dictionary, adhering to the `Item` GraphQL schema.
     """
 
+    if not await authorized(info, username):
+        raise Exception(f"Token username missmatch.")
+
     try:
         flt = item_schemas.ItemFilter(**filtering)
     except Exception as e:
         logger.warning(f"Failed to resolve GraphQL schema: {e}")
         raise Exception(f"This filter does not adhere to the filtering possibilities.")
 
-    result = await utils.filter_items(username, storage_name, flt)
+    result = await utils.filter_items(username, storage_name, flt, selected_fields(info), sort, order, limit)
+    if isinstance(result, Err):
+        raise Exception(f"{result.message}")
+    return result
+
+@query.field("item_page")
+async def resolve_item_page(_, info, username: str, storage_name: str, filtering: Optional[dict] = None,
+                            sort: str = "date_added", order: str = "asc",
+                            limit: Optional[int] = None, cursor: Optional[str] = None):
+    """
+    Resolver for fetching a page of items in a storage.
+    Items are sorted by ``sort`` with ties broken by their code, and the
+    ``next_cursor`` of a page is passed as ``cursor`` to fetch the following page.
+
+    Args:
+        _ (Any): Placeholder for the parent resolver.
+        info (GraphQLResolveInfo): Metadata about the query.
+        username (str): The username of the user owning the storage.
+        storage_name (str): The name of the storage to fetch items from.
+        filtering (dict): Optional filtering criteria, validated against the `ItemFilter` schema.
+        sort (str): The field the items are sorted by.
+        order (str): The sort order, 'asc' or 'desc'.
+        limit (int): The maximum number of items on the page.
+        cursor (str): The cursor returned with the previous page.
+
+    Raises:
+        Exception: If the bearer token does not belong to the user.
+        Exception: If the filtering criteria do not match the `ItemFilter` schema.
+        Exception: If the utility function `list_items` returns an error.
+
+    Returns:
+        dict: The page of items, adhering to the `ItemPage` GraphQL schema.
+    """
+
+    if not await authorized(info, username):
+        raise Exception(f"Token username missmatch.")
+
+    try:
+        flt = item_schemas.ItemFilter(**(filtering or {}))
+    except Exception as e:
+        logger.warning(f"Failed to resolve GraphQL schema: {e}")
+        raise Exception(f"This filter does not adhere to the filtering possibilities.")
+
+    page_fields = selected_fields(info)
+    count = page_fields is None or "total" in page_fields or "total_exact" in page_fields
+    result = await utils.list_items(username, storage_name, flt, sort, order, limit or PAGE_SIZE, cursor,
+                                    fields=selected_fields(info, ("items",)), count=count)
+    if isinstance(result, Err):
+        raise Exception(f"{result.message}")
+    return result
+
+@query.field("search_items")
+async def resolve_search_items(_, info, username: str, text: str,
+                               storage_name: Optional[str] = None, limit: Optional[int] = None):
+    """
+    Resolver for searching the items of a user by their name and description.
+
+    Args:
+        _ (Any): Placeholder for the parent resolver.
+        info (GraphQLResolveInfo): Metadata about the query.
+        username (str): The username of the user owning the items.
+        text (str): The searched text.
+        storage_name (str): Only items in this storage are searched, all storages if missing.
+        limit (int): The maximum number of items returned.
+
+    Raises:
+        Exception: If the bearer token does not belong to the user.
+        Exception: If the utility function `search_items` returns an error.
+
+    Returns:
+        list[dict]: The matching items, adhering to the `ItemMatch` GraphQL schema.
+    """
+
+    if not await authorized(info, username):
+        raise Exception(f"Token username missmatch.")
+
+    result = await search_utils.search_items(username, text, storage_name,
+                                             min(limit or SEARCH_LIMIT, SEARCH_MAX_LIMIT))
     if isinstance(result, Err):
         raise Exception(f"{result.message}")
     return result
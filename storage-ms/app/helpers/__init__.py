@@ -3,7 +3,19 @@ The `helpers` module provides generic helper functions for managing the database
 """
 
 from .database_helpers import (
-    get_collection)
+    get_collection,
+    resolve_collection,
+    invalidate_collection,
+    ping_collection,
+    collection_dependency,
+    ensure_indexes,
+    layout_collections,
+    close_client)
+
+from .search_helpers import (
+    SEARCH_FIELD,
+    trigrams,
+    search_terms)
 
 from .error import (
     ErrorResponse)
\ No newline at end of file
@@ -0,0 +1,65 @@
+# Author: Nina Mislej
+# Date created: 14.01.2025
+
+import re
+import unicodedata
+from ..config import SEARCH_MAX_TERMS
+
+# NOTE: Every item keeps the trigrams of its name and description in 'search_terms',
+#       prefixed with 'n:' and 'd:', so matches in names can be ranked higher.
+#       The terms are written together with the item, so deleting an item needs no extra work.
+#       Misspelled words still share most of their trigrams with the correct ones.
+SEARCH_FIELD = "search_terms"
+NAME_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+
+def normalize(text: str | None) -> list[str]:
+    """
+    Split text into lowercase words without accents.
+
+    Args:
+        text (str | None): The text.
+
+    Returns:
+        list[str]: The words of the text.
+    """
+
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return re.findall(r"\w+", text.casefold())
+
+def trigrams(text: str | None) -> set[str]:
+    """
+    Return the trigrams of the words in a text. Words are padded with spaces,
+    so short words and the starts and ends of words have trigrams too.
+
+    Args:
+        text (str | None): The text.
+
+    Returns:
+        set[str]: The trigrams.
+    """
+
+    grams = set()
+    for word in normalize(text):
+        word = f" {word} "
+        grams.update(word[index:index + 3] for index in range(len(word) - 2))
+    return grams
+
+def search_terms(name: str | None, description: str | None) -> list[str]:
+    """
+    Build the search terms stored with an item.
+
+    Args:
+        name (str | None): The name of the item.
+        description (str | None): The description of the item.
+
+    Returns:
+        list[str]: The prefixed trigrams of the name and the description.
+    """
+
+    terms = sorted(f"n:{gram}" for gram in trigrams(name))
+    terms += sorted(f"d:{gram}" for gram in trigrams(description))[:SEARCH_MAX_TERMS]
+    return terms
@@ -5,6 +5,7 @@
 import asyncio
 import uvicorn
 from fastapi import FastAPI
+from contextlib import asynccontextmanager
 from .googlerpc.grpc_server import serve
 
 # GraphQL dependencies.
@@ -19,12 +20,32 @@ from .api import (
     item_api,
     storage_api,
     health_check_api)
+from .helpers.database_helpers import resolve_collection, ensure_indexes, close_client
+from .googlerpc.grpc_channels import open_channels, close_channels
+from .googlerpc.grpc_client import CODES_MS_TARGET
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Resolves the shared database collection, ensures its indexes and opens the RPC channels at startup.
+    Closes the connection pool and the channels on shutdown.
+    """
+
+    if await resolve_collection() is None:
+        logger.warning("Database collection could not be resolved at startup.")
+    elif not await ensure_indexes():
+        logger.warning("Database indexes could not be ensured at startup.")
+    open_channels(CODES_MS_TARGET)
+    yield
+    await close_channels(grace=5)
+    close_client()
 
 app = FastAPI(
     title="Storage Managment Microservice",
     docs_url="/users/docs-api",             # Swagger UI
     redoc_url="/users/redoc",           # Redoc UI
-    openapi_url="/users/openapi.json"   # OpenAPI schema URL
+    openapi_url="/users/openapi.json",  # OpenAPI schema URL
+    lifespan=lifespan
 )
 
 # Logging default library.
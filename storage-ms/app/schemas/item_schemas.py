@@ -1,8 +1,10 @@
 # Author: Nina Mislej
 # Date created: 07.01.2024
 
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from ..models.item import Item
+from datetime import datetime
+from typing import Optional, List
 
 # These are pydantic models used by FastAPI.
 
@@ -27,9 +29,70 @@ class ItemUpdate(BaseModel):
 class ItemFilter(BaseModel):
     """
     This schema defines the fields that can be used for filetring an existing item.
+    Plain fields match exactly, suffixed fields match lists, prefixes and ranges.
+    All set fields must match, filters can be composed with ``and``, ``or`` and ``not``.
     """
 
+    model_config = ConfigDict(populate_by_name=True)
+
     code_id: Optional[str] = None
     name: Optional[str] = None
     amount: Optional[int] = None
-    description: Optional[str] = None
\ No newline at end of file
+    description: Optional[str] = None
+
+    code_id_in: Optional[List[str]] = None
+    name_in: Optional[List[str]] = None
+    name_prefix: Optional[str] = None
+    # Makes 'name' and 'name_prefix' case-insensitive.
+    name_insensitive: Optional[bool] = None
+
+    amount_in: Optional[List[int]] = None
+    amount_gt: Optional[int] = None
+    amount_gte: Optional[int] = None
+    amount_lt: Optional[int] = None
+    amount_lte: Optional[int] = None
+    date_added_gte: Optional[datetime] = None
+    date_added_lt: Optional[datetime] = None
+
+    and_: Optional[List["ItemFilter"]] = Field(default=None, alias="and")
+    or_: Optional[List["ItemFilter"]] = Field(default=None, alias="or")
+    not_: Optional["ItemFilter"] = Field(default=None, alias="not")
+
+class ItemImportError(BaseModel):
+    """
+    This schema describes why a row of an item import was not created.
+    Rows are numbered from one, the CSV header is not counted.
+    """
+
+    row: int
+    message: str
+
+class ItemImportResult(BaseModel):
+    """
+    This schema defines the result of an item import, the codes of the created
+    items in the order of their rows and the errors of the rows that failed.
+    """
+
+    created: List[str] = []
+    errors: List[ItemImportError] = []
+
+class ItemPage(BaseModel):
+    """
+    This schema defines a page of items. The ``next_cursor`` is passed to request the
+    following page and is missing on the last page. The ``total`` counts all matching
+    items and is a lower bound if ``total_exact`` is false.
+    """
+
+    items: List[Item]
+    next_cursor: Optional[str] = None
+    total: int
+    total_exact: bool
+
+class ItemMatch(Item):
+    """
+    This schema defines an item found by searching, with the storage holding it
+    and its score between zero and one, where higher scores match better.
+    """
+
+    storage_name: str
+    score: float
@@ -5,14 +5,19 @@ It serves as communication between models and the database.
 
 from .item_utils import (
     create_item,
+    create_items,
     delete_item,
     update_item,
-    get_item)
+    get_item,
+    get_item_image,
+    list_items)
 
 from .user_utils import (
     create_user,
     update_display_name,
     delete_user, get_user,
+    create_users,
+    delete_users,
     empty_storages)
 
 from .storage_utils import (
@@ -21,3 +26,24 @@ from .storage_utils import (
     empty_storage,
     update_storage_name,
     delete_storage)
+
+from .migration_utils import (
+    migrate_user,
+    migrate_all,
+    ensure_migrated,
+    extract_images)
+
+from .transfer_utils import (
+    import_items,
+    export_items,
+    stream_storage,
+    stream_user)
+
+from .search_utils import (
+    search_items,
+    index_items)
+
+from .image_utils import (
+    store_image,
+    get_image,
+    release_images)
@@ -0,0 +1,199 @@
+# Author: Nina Mislej
+# Date created: 13.01.2025
+
+import base64
+import binascii
+import hashlib
+from collections import Counter
+from gridfs.errors import FileExists, NoFile
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorGridFSBucket
+
+from ..helpers.database_helpers import layout_collections
+from ..helpers.error import ErrorResponse as Err
+from ..config import IMAGES_BUCKET
+
+# logger default library.
+from ..logger_setup import get_logger
+logger = get_logger("storage-ms.services")
+
+# NOTE: Images are stored once in GridFS under the SHA-256 of their content,
+#       items only keep this digest in their 'image_id' field.
+#       Storing an image takes a hold on it, counted in 'metadata.holds' of its file,
+#       until the item referencing it is written. Images are only deleted if no item
+#       references them and nobody holds them, so an image that is being reused is never
+#       deleted between storing it and inserting its item.
+
+# Attempts to store an image that is deleted at the same time.
+STORE_ATTEMPTS = 3
+
+# Leading bytes of the image formats that can be returned by the Code microservice.
+SIGNATURES = {
+    b"\x89PNG\r\n\x1a\n": "image/png",
+    b"\xff\xd8\xff": "image/jpeg",
+    b"GIF8": "image/gif",
+    b"<svg": "image/svg+xml",
+    b"<?xml": "image/svg+xml"}
+
+def image_bucket(db_users: AsyncIOMotorCollection) -> AsyncIOMotorGridFSBucket:
+    """
+    Return the GridFS bucket holding the item images.
+
+    Args:
+        db_users (Collection): The users collection, the bucket is kept in the same database.
+
+    Returns:
+        AsyncIOMotorGridFSBucket: The images bucket.
+    """
+
+    return AsyncIOMotorGridFSBucket(db_users.database, bucket_name=IMAGES_BUCKET)
+
+def decode_image(image_base64: str) -> bytes:
+    """
+    Decode a Base64 image, optionally given as a data URL.
+
+    Args:
+        image_base64 (str): The encoded image.
+
+    Returns:
+        bytes: The raw image.
+
+    Raises:
+        ValueError: If the image is not valid Base64.
+    """
+
+    if image_base64.startswith("data:") and "," in image_base64:
+        image_base64 = image_base64.split(",", 1)[1]
+    try:
+        return base64.b64decode(image_base64, validate=True)
+    except binascii.Error as e:
+        raise ValueError(f"Image is not Base64 encoded: {e}")
+
+def content_type(image: bytes) -> str:
+    """
+    Guess the media type of a raw image from its leading bytes.
+    """
+
+    for signature, media_type in SIGNATURES.items():
+        if image.startswith(signature):
+            return media_type
+    return "application/octet-stream"
+
+async def store_image(db_users: AsyncIOMotorCollection, image_base64: str) -> Err | str:
+    """
+    Store an image once, keyed by the hash of its content.
+    Storing an image that already exists only returns its identifier.
+    The image is held until ``release_images`` is called for it with ``stored`` set,
+    which has to happen after the item referencing it was written or failed to be.
+
+    Args:
+        db_users (Collection): The users collection.
+        image_base64 (str): The Base64 encoded image.
+
+    Returns:
+        ErrorResponse | str: The error response if an error occurred, or the image identifier otherwise.
+    """
+
+    try:
+        image = decode_image(image_base64)
+        image_id = hashlib.sha256(image).hexdigest()
+
+        files = db_users.database[f"{IMAGES_BUCKET}.files"]
+        for _ in range(STORE_ATTEMPTS):
+            held = await files.update_one({"_id": image_id}, {"$inc": {"metadata.holds": 1}})
+            if held.matched_count > 0:
+                return image_id
+
+            try:
+                await image_bucket(db_users).upload_from_stream_with_id(
+                    image_id, image_id, image, metadata={"content_type": content_type(image), "holds": 1})
+                return image_id
+            except FileExists:
+                # NOTE: The same image was stored or is being deleted concurrently.
+                continue
+
+        return Err(message=f"Could not store image '{image_id}'.", code=500)
+
+    except ValueError as e:
+        return Err(message=f"Could not store image: {e}", code=502)
+    except Exception as e:
+        logger.warning(f"Could not store image: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
+async def get_image(db_users: AsyncIOMotorCollection, image_id: str) -> Err | tuple[bytes, str]:
+    """
+    Retrieve a stored image.
+
+    Args:
+        db_users (Collection): The users collection.
+        image_id (str): The identifier of the image.
+
+    Returns:
+        ErrorResponse | tuple[bytes, str]: The error response if an error occurred, or the raw image and its media type.
+    """
+
+    try:
+        stream = await image_bucket(db_users).open_download_stream(image_id)
+        metadata = stream.metadata or {}
+        return await stream.read(), metadata.get("content_type", "application/octet-stream")
+
+    except NoFile:
+        return Err(message=f"Image '{image_id}' not found.", code=404)
+    except Exception as e:
+        logger.warning(f"Could not get image: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
+async def release_images(db_users: AsyncIOMotorCollection, image_ids: list[str], stored: bool = False):
+    """
+    Delete images that are no longer referenced or held by any item.
+    Should be called after items were deleted with the identifiers of their images,
+    and after items were written with the identifiers returned by ``store_image``.
+
+    Args:
+        db_users (Collection): The users collection.
+        image_ids (list[str]): The identifiers of the images the deleted or written items referenced.
+        stored (bool): Whether the images were stored by the caller, one hold is dropped for every identifier.
+    """
+
+    try:
+        _, db_items = layout_collections(db_users)
+        files = db_users.database[f"{IMAGES_BUCKET}.files"]
+        chunks = db_users.database[f"{IMAGES_BUCKET}.chunks"]
+        counts = Counter(image_id for image_id in image_ids if image_id)
+        if stored:
+            for image_id, count in counts.items():
+                await files.update_one({"_id": image_id}, {"$inc": {"metadata.holds": -count}})
+
+        for image_id in counts:
+            if await db_items.count_documents({"image_id": image_id}, limit=1) == 0:
+                result = await files.delete_one({"_id": image_id, "metadata.holds": {"$not": {"$gt": 0}}})
+                if result.deleted_count > 0:
+                    await chunks.delete_many({"files_id": image_id})
+
+    except Exception as e:
+        logger.warning(f"Could not release images: {e}")
+
+async def extract_image(db_users: AsyncIOMotorCollection, item: dict) -> Err | dict:
+    """
+    Move an image embedded in an item into the image store.
+    Items without an embedded image are returned unchanged, the image of other items
+    is held until ``release_images`` is called for it with ``stored`` set.
+
+    Args:
+        db_users (Collection): The users collection.
+        item (dict): The item document.
+
+    Returns:
+        ErrorResponse | dict: The error response if an error occurred, or the item referencing its image.
+    """
+
+    image_base64 = item.get("image_base64")
+    if not image_base64:
+        return item
+
+    image_id = await store_image(db_users, image_base64)
+    if isinstance(image_id, Err):
+        return image_id
+
+    item = {field: value for field, value in item.items() if field != "image_base64"}
+    item["image_id"] = image_id
+    return item
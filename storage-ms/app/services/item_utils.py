@@ -1,11 +1,23 @@
 # Author: Jure
 # Date created: 4.12.2024
 
+import re
+import json
+import base64
+import binascii
+import asyncio
+from datetime import datetime
 from ..schemas import item_schemas as schema
 from ..models.item import Item
-from ..helpers.database_helpers import get_collection
+from ..helpers.database_helpers import get_collection, layout_collections
 from ..helpers.error import ErrorResponse as Err
-from ..googlerpc.grpc_client import create_code
+from ..googlerpc.grpc_client import create_code, create_codes
+from .migration_utils import ensure_migrated
+from .image_utils import store_image, get_image, release_images
+from .storage_utils import ITEM_PROJECTION, ITEM_FIELDS
+from ..helpers.search_helpers import SEARCH_FIELD, search_terms
+from .search_utils import refresh_search_terms
+from ..config import PAGE_SIZE, PAGE_MAX_SIZE, PAGE_COUNT_LIMIT
 
 # logger default library.
 from ..logger_setup import get_logger
@@ -23,7 +35,8 @@ async def create_item(username : str, storage_name : str, item : schema.ItemCrea
     an error response is returned.
 
     When creating the item another microservice is called using GRPC to
-    create the 'base64' encoding of the item code image.
+    create the 'base64' encoding of the item code image. The image is kept in
+    the image store and the item only references it.
 
     Args:
         username (str): The username of the user creating the item.
@@ -42,16 +55,32 @@ async def create_item(username : str, storage_name : str, item : schema.ItemCrea
         if item.amount == 0:
             return Err(message=f"Cannot create new item with zero instances.")
 
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
+
+        db_storages, db_items = layout_collections(db_users)
+        if await db_storages.count_documents({"username": username, "name": storage_name}, limit=1) == 0:
+            return Err(message=f"Creating item failed.")
+
         item_model = Item(name=item.name, amount=item.amount, description=item.description)
         image_base64 = await create_code(item_code=item_model.code_id)
-        item_model.image_base64 = image_base64
+        if isinstance(image_base64, Err):
+            return image_base64
 
-        item_dict = item_model.model_dump(by_alias=True)
-        result = await db_users.update_one(
-            {"username": username, "storages.name": storage_name},
-            {"$push": {"storages.$.content": item_dict}})
+        image_id = await store_image(db_users, image_base64)
+        if isinstance(image_id, Err):
+            return image_id
+        item_model.image_id = image_id
 
-        if result.modified_count == 0:
+        # NOTE: The image is deleted when it is released if the item was not inserted.
+        item_dict = item_model.model_dump(by_alias=True)
+        try:
+            result = await db_items.insert_one({**item_dict, "username": username, "storage_name": storage_name,
+                                                SEARCH_FIELD: search_terms(item_model.name, item_model.description)})
+        finally:
+            await release_images(db_users, [image_id], stored=True)
+        if not result.acknowledged:
             return Err(message=f"Creating item failed.")
 
         logger.debug(f"New item {item.name} created.")
@@ -61,6 +90,82 @@ async def create_item(username : str, storage_name : str, item : schema.ItemCrea
         logger.warning(f"Could not create item: {e}")
         return Err(message=f"Unknown  exception: {e}", code=500)
 
+async def create_items(username : str, storage_name : str, items : list[schema.ItemCreate]) -> Err | list[str]:
+    """
+    Create many items in a specific storage of a user.
+
+    The item code images are created with a single streaming GRPC call to the
+    Code microservice and the items are inserted together. Either all items are
+    created or, if any of them fails validation or its code cannot be created,
+    none of them and an error response is returned. Images stored for items that
+    are not created are released.
+
+    Args:
+        username (str): The username of the user creating the items.
+        storage_name (str): The name of the storage where the items are being added.
+        items (list[ItemCreate]): The details of the items to be created, adhering to the schema.
+
+    Returns:
+        ErrorResponse | list[str]: The error response if an error occurred or the ``code_id`` of every item otherwise.
+    """
+
+    try:
+        db_users = await get_collection()
+        if db_users is None:
+            return Err(message=f"Cannot get DB collection.")
+
+        if any(item.amount == 0 for item in items):
+            return Err(message=f"Cannot create new item with zero instances.")
+
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
+
+        db_storages, db_items = layout_collections(db_users)
+        if await db_storages.count_documents({"username": username, "name": storage_name}, limit=1) == 0:
+            return Err(message=f"Creating items failed.")
+
+        item_models = [Item(name=item.name, amount=item.amount, description=item.description) for item in items]
+        if not item_models:
+            return []
+
+        images = await create_codes([item_model.code_id for item_model in item_models])
+        if isinstance(images, Err):
+            return images
+        for image_base64 in images.values():
+            if isinstance(image_base64, Err):
+                return image_base64
+
+        distinct_images = list(set(images.values()))
+        image_ids = await asyncio.gather(*(store_image(db_users, image_base64) for image_base64 in distinct_images))
+        stored = [image_id for image_id in image_ids if not isinstance(image_id, Err)]
+        for image_id in image_ids:
+            if isinstance(image_id, Err):
+                await release_images(db_users, stored, stored=True)
+                return image_id
+        image_ids = dict(zip(distinct_images, image_ids))
+
+        documents = []
+        for item_model in item_models:
+            item_model.image_id = image_ids[images[item_model.code_id]]
+            documents.append({**item_model.model_dump(by_alias=True), "username": username, "storage_name": storage_name,
+                              SEARCH_FIELD: search_terms(item_model.name, item_model.description)})
+
+        # NOTE: Images are deleted when they are released if their items were not inserted.
+        try:
+            result = await db_items.insert_many(documents, ordered=False)
+        finally:
+            await release_images(db_users, stored, stored=True)
+        if not result.acknowledged:
+            return Err(message=f"Creating items failed.")
+
+        logger.debug(f"{len(documents)} new items created.")
+        return [item_model.code_id for item_model in item_models]
+
+    except Exception as e:
+        logger.warning(f"Could not create items: {e}")
+        return Err(message=f"Unknown  exception: {e}", code=500)
+
 async def get_item(username : str, storage_name : str, item_code : str) -> Err | dict:
     """
     Retrieve an item from a user's storage by its unique code.
@@ -83,31 +188,62 @@ async def get_item(username : str, storage_name : str, item_code : str) -> Err |
         if db_users is None:
             return Err(message=f"Cannot get DB collection.")
 
-        # A cleaner way of finding all matchings and a sanity check that there are unique.
-        pipeline = [
-            {"$match":
-                {"username": username,
-                "storages.name": storage_name,
-                "storages.content.code_id": item_code}},
-            {"$unwind": "$storages"},  # Deconstruct the storages array.
-            {"$match": {"storages.name": storage_name}},  # Match the specific storage.
-            {"$unwind": "$storages.content"},  # Deconstruct the content array.
-            {"$match": { "storages.content.code_id": item_code}}, # Match the specific item.
-            {"$replaceRoot": {"newRoot": "$storages.content"}}  # Replace the root document with the storage object.
-        ]
-
-        result = await db_users.aggregate(pipeline).to_list()
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
+
+        _, db_items = layout_collections(db_users)
+        result = await db_items.find_one(
+            {"code_id": item_code, "username": username, "storage_name": storage_name}, ITEM_PROJECTION)
         if not result:
             return Err(message=f"Getting item '{item_code}' failed.")
-
-        if len(result) > 1:
-            return Err(message=f"Item '{item_code}' has more than one storage entry.")
-        return result[0]
+        return result
 
     except Exception as e:
         logger.warning(f"Could not get item: {e}")
         return Err(message=f"Unknown exception: {e}", code=500)
 
+async def get_item_image(username : str, storage_name : str, item_code : str) -> Err | tuple[bytes, str, str]:
+    """
+    Retrieve the code image of an item from a user's storage.
+
+    Args:
+        username (str): The username of the user who owns the storage.
+        storage_name (str): The name of the storage where the item is located.
+        item_code (str): The unique code of the item.
+
+    Returns:
+        ErrorResponse | tuple[bytes, str, str]: The error response if an error occurred,
+            or the raw image, its media type and its identifier.
+    """
+
+    try:
+        db_users = await get_collection()
+        if db_users is None:
+            return Err(message=f"Cannot get DB collection.")
+
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
+
+        _, db_items = layout_collections(db_users)
+        item = await db_items.find_one(
+            {"code_id": item_code, "username": username, "storage_name": storage_name},
+            {"_id": 0, "image_id": 1})
+        if not item:
+            return Err(message=f"Getting item '{item_code}' failed.")
+        if not item.get("image_id"):
+            return Err(message=f"Item '{item_code}' has no image.", code=404)
+
+        image = await get_image(db_users, item["image_id"])
+        if isinstance(image, Err):
+            return image
+        return *image, item["image_id"]
+
+    except Exception as e:
+        logger.warning(f"Could not get item image: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
 async def delete_item(username : str, storage_name : str, item_code : str) -> Err | str:
     """
     Delete an item from a user's storage.
@@ -129,13 +265,20 @@ async def delete_item(username : str, storage_name : str, item_code : str) -> Er
         if db_users is None:
             return Err(message=f"Cannot get DB collection.")
 
-        result = await db_users.update_one(
-            {"username": username, "storages.name": storage_name},
-            {"$pull": {"storages.$.content": {"code_id": item_code}}})
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
 
-        if not result.acknowledged or result.modified_count == 0:
+        _, db_items = layout_collections(db_users)
+        item = await db_items.find_one_and_delete(
+            {"code_id": item_code, "username": username, "storage_name": storage_name},
+            {"image_id": 1})
+
+        if not item:
             return Err(message=f"Deleting item '{item_code}' from '{storage_name}' failed.")
 
+        await release_images(db_users, [item.get("image_id")])
+
         logger.debug(f"Item {item_code} deleted.")
         return item_code
 
@@ -172,37 +315,118 @@ async def update_item(username : str, storage_name : str, item_code : str, item
         if item.amount == 0:
             return Err(message=f"Cannot update an item with zero instances.")
 
-        # Loop through fields and construct the update operation for the content array.
-        fields_to_update = {
-            f"storages.$[storage].content.$[item].{field}": value
-            for field, value in item_dict.items()}
-
-        # NOTE: This the way to loop through multiple positional arguments.
-        # You cannot use multiple '$' such arguments, 'array_filters' is the correct way.
-        result = await db_users.update_one(
-            {"username": username},
-            {"$set": fields_to_update},
-            array_filters = [
-                {"storage.name": storage_name},
-                {"item.code_id": item_code}
-            ])
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
+
+        _, db_items = layout_collections(db_users)
+        result = await db_items.update_one(
+            {"code_id": item_code, "username": username, "storage_name": storage_name},
+            {"$set": item_dict})
 
         if not result.acknowledged or result.modified_count == 0:
             return Err(message=f"Updating item '{item_code}' failed.")
+
+        if "name" in item_dict or "description" in item_dict:
+            await refresh_search_terms(db_items, item_code)
         return item_code
 
     except Exception as e:
         logger.warning(f"Could not update item: {e}")
         return Err(message=f"Unknown exception: {e}", code=500)
 
-async def filter_items(username: str, storage_name: str, flt: schema.ItemFilter) -> list[Item] | Err:
+def selection_projection(fields: list[str] | None, required: tuple[str, ...] = ("code_id",)) -> dict:
+    """
+    Build the projection of items that only returns the fields selected in a query.
+    Fields that are not item fields are ignored and the required fields are always included.
+
+    Args:
+        fields (list[str] | None): The selected item fields, all fields if missing.
+        required (tuple[str, ...]): Fields that are always returned.
+
+    Returns:
+        dict: The projection.
+    """
+
+    if fields is None:
+        return ITEM_PROJECTION
+    return {"_id": 0, **{field: 1 for field in (*required, *fields) if field in ITEM_FIELDS}}
+
+def filter_query(flt: schema.ItemFilter) -> dict:
+    """
+    Translate the filtering criteria into a Mongo query.
+
+    Equality, list, range and case-sensitive prefix conditions can use the item
+    indexes after the username and storage name. Case-insensitive conditions are
+    matched with a regular expression within the storage.
+
+    Args:
+        flt (ItemFilter): The filtering criteria.
+
+    Returns:
+        dict: The query, empty if no criteria are set.
+    """
+
+    query, clauses = {}, []
+    def add(field: str, condition):
+        current = query.get(field)
+        if field not in query:
+            query[field] = condition
+        elif isinstance(current, dict) and isinstance(condition, dict) and not current.keys() & condition.keys():
+            current.update(condition)
+        else:
+            clauses.append({field: condition})
+
+    flags = "i" if flt.name_insensitive else ""
+    for field in ("code_id", "amount", "description"):
+        if getattr(flt, field) is not None:
+            add(field, getattr(flt, field))
+    if flt.name is not None:
+        add("name", {"$regex": f"^{re.escape(flt.name)}$", "$options": flags} if flags else flt.name)
+    if flt.name_prefix is not None:
+        add("name", {"$regex": f"^{re.escape(flt.name_prefix)}", "$options": flags})
+
+    for field in ("code_id", "name", "amount"):
+        values = getattr(flt, f"{field}_in")
+        if values is not None:
+            add(field, {"$in": values})
+    for operator in ("gt", "gte", "lt", "lte"):
+        value = getattr(flt, f"amount_{operator}")
+        if value is not None:
+            add("amount", {f"${operator}": value})
+    for operator in ("gte", "lt"):
+        value = getattr(flt, f"date_added_{operator}")
+        if value is not None:
+            add("date_added", {f"${operator}": value})
+
+    if flt.and_:
+        clauses.extend(filter_query(sub_filter) for sub_filter in flt.and_)
+    if flt.or_:
+        clauses.append({"$or": [filter_query(sub_filter) for sub_filter in flt.or_]})
+    if flt.not_ is not None:
+        clauses.append({"$nor": [filter_query(flt.not_)]})
+
+    clauses = [clause for clause in clauses if clause]
+    if clauses:
+        query["$and"] = clauses
+    return query
+
+async def filter_items(username: str, storage_name: str, flt: schema.ItemFilter,
+                       fields: list[str] | None = None, sort: str | None = None,
+                       order: str | None = None, limit: int | None = None) -> list[Item] | Err:
     """
     Retrieve and filter items in a user's storage.
+    The filtering criteria, the selected fields, the order and the limit are applied by the database.
 
     Args:
         username (str): The storag owner's username.
         storage_name (str): The name of the storage.
         flt (dict): The filtering criteria.
+        fields (list[str] | None): The item fields to return, all fields if missing.
+        sort (str | None): The field the items are sorted by, 'date_added' if only ``order`` is given
+            and unsorted if both are missing.
+        order (str | None): The sort order, 'asc' or 'desc', 'asc' if missing.
+        limit (int | None): The maximum number of items returned, all if missing.
 
     Returns:
         ErrorResponse | List[Item]: A list of items matching the filter criteria, which can be an empty list.
@@ -216,30 +440,149 @@ async def filter_items(username: str, storage_name: str, flt: schema.ItemFilter)
         flt_dict = flt.model_dump(by_alias=True, exclude_unset=True)
         if not flt_dict:
             return Err(message=f"All filtering values are empty.")
-
-        fields_to_match = {
-            f"storages.content.{field}": value
-            for field, value in flt_dict.items()}
-
-        # A cleaner way of finding all matchings and a sanity check that there are unique.
-        pipeline = [
-            {"$match":
-                {"username": username,
-                "storages.name": storage_name}},
-            {"$unwind": "$storages"},  # Deconstruct the storages array.
-            {"$match": {"storages.name": storage_name}},  # Match the specific storage.
-            {"$unwind": "$storages.content"},  # Deconstruct the content array.
-            {"$match": fields_to_match}, # Match the specific item.
-            {"$replaceRoot": {"newRoot": "$storages.content"}}  # Replace the root document with the storage object.
-        ]
-
-        result = await db_users.aggregate(pipeline).to_list()
-        if not result:
-            return []
-
-        return result
+        if sort is not None and sort not in SORT_FIELDS:
+            return Err(message=f"Items can only be sorted by {', '.join(SORT_FIELDS)}.")
+        if order is not None and order not in SORT_ORDERS:
+            return Err(message=f"Sort order must be one of {', '.join(SORT_ORDERS)}.")
+        if limit is not None and limit < 1:
+            return Err(message=f"Limit must be at least 1.")
+
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
+
+        _, db_items = layout_collections(db_users)
+        found = db_items.find(
+            {**filter_query(flt), "username": username, "storage_name": storage_name},
+            selection_projection(fields))
+        if sort or order:
+            direction = -1 if order == "desc" else 1
+            found = found.sort([(sort or "date_added", direction), ("code_id", direction)])
+        if limit is not None:
+            found = found.limit(limit)
+        return await found.to_list()
 
     except Exception as e:
         logger.warning(f"Could not filetr items: {e}")
         return Err(message=f"Unknown exception: {e}", code=500)
 
+
+# Fields items can be sorted by, 'code_id' is added to break ties.
+SORT_FIELDS = ("name", "amount", "date_added")
+SORT_ORDERS = ("asc", "desc")
+
+def encode_cursor(sort: str, order: str, item: dict) -> str:
+    """
+    Encode the position after ``item`` as an opaque cursor.
+
+    Args:
+        sort (str): The field the items are sorted by.
+        order (str): The sort order, 'asc' or 'desc'.
+        item (dict): The last item of a page.
+
+    Returns:
+        str: The cursor.
+    """
+
+    value = item.get(sort)
+    if isinstance(value, datetime):
+        value = {"$date": value.isoformat()}
+    position = {"sort": sort, "order": order, "value": value, "code_id": item["code_id"]}
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(",", ":")).encode()).decode()
+
+def decode_cursor(cursor: str, sort: str, order: str) -> Err | tuple:
+    """
+    Decode a cursor created by ``encode_cursor``.
+
+    Args:
+        cursor (str): The cursor.
+        sort (str): The field the items are sorted by, it must match the cursor.
+        order (str): The sort order, it must match the cursor.
+
+    Returns:
+        ErrorResponse | tuple: The error response if the cursor is not valid, or the sort value
+            and the ``code_id`` of the last item of the previous page otherwise.
+    """
+
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value = position["value"]
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["$date"])
+        if position["sort"] != sort or position["order"] != order:
+            return Err(message=f"Cursor was created for a different sort order.")
+        return value, position["code_id"]
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        return Err(message=f"Cursor is not valid.")
+
+async def list_items(username: str, storage_name: str, flt: schema.ItemFilter | None = None,
+                     sort: str = "date_added", order: str = "asc",
+                     limit: int = PAGE_SIZE, cursor: str | None = None,
+                     fields: list[str] | None = None, count: bool = True) -> Err | dict:
+    """
+    Retrieve a page of items in a user's storage.
+
+    Items are sorted by ``sort`` and then by ``code_id``, so the order is stable even
+    for equal values. A page continues after the position stored in ``cursor`` instead
+    of skipping items, so every page is read from the index at the same cost.
+
+    Args:
+        username (str): The storage owner's username.
+        storage_name (str): The name of the storage.
+        flt (ItemFilter | None): The filtering criteria, all items if missing.
+        sort (str): The field the items are sorted by, 'name', 'amount' or 'date_added'.
+        order (str): The sort order, 'asc' or 'desc'.
+        limit (int): The maximum number of items on the page.
+        cursor (str | None): The cursor returned with the previous page, the first page if missing.
+        fields (list[str] | None): The item fields to return, all fields if missing.
+        count (bool): Whether the matching items are counted, the total is zero otherwise.
+
+    Returns:
+        ErrorResponse | dict: The error response if an error occurred, or the page of items
+            adhering to the ``ItemPage`` schema otherwise.
+    """
+
+    try:
+        if sort not in SORT_FIELDS:
+            return Err(message=f"Items can only be sorted by {', '.join(SORT_FIELDS)}.")
+        if order not in SORT_ORDERS:
+            return Err(message=f"Sort order must be one of {', '.join(SORT_ORDERS)}.")
+        if not 1 <= limit <= PAGE_MAX_SIZE:
+            return Err(message=f"Page size must be between 1 and {PAGE_MAX_SIZE}.")
+
+        db_users = await get_collection()
+        if db_users is None:
+            return Err(message=f"Cannot get DB collection.")
+
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
+
+        query = {**(filter_query(flt) if flt else {}), "username": username, "storage_name": storage_name}
+        page_query = query
+        if cursor:
+            position = decode_cursor(cursor, sort, order)
+            if isinstance(position, Err):
+                return position
+            value, code_id = position
+            after = "$gt" if order == "asc" else "$lt"
+            page_query = {"$and": [query, {"$or": [{sort: {after: value}},
+                                                   {sort: value, "code_id": {after: code_id}}]}]}
+
+        direction = 1 if order == "asc" else -1
+        _, db_items = layout_collections(db_users)
+        items = await db_items.find(page_query, selection_projection(fields, required=("code_id", sort))).sort(
+            [(sort, direction), ("code_id", direction)]).limit(limit + 1).to_list()
+        total = await db_items.count_documents(query, limit=PAGE_COUNT_LIMIT) if count else 0
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_cursor(sort, order, items[-1])
+
+        return {"items": items, "next_cursor": next_cursor,
+                "total": total, "total_exact": total < PAGE_COUNT_LIMIT}
+
+    except Exception as e:
+        logger.warning(f"Could not list items: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
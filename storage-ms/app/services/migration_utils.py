@@ -0,0 +1,207 @@
+# Author: Nina Mislej
+# Date created: 13.01.2025
+
+import asyncio
+from pymongo import ReplaceOne, UpdateOne
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from ..helpers.database_helpers import layout_collections
+from ..helpers.error import ErrorResponse as Err
+from ..helpers.search_helpers import SEARCH_FIELD, search_terms
+from .image_utils import extract_image, release_images
+
+# logger default library.
+from ..logger_setup import get_logger
+logger = get_logger("storage-ms.services")
+
+# Users known to be in the normalized layout, so they are not checked again.
+_migrated: set[str] = set()
+
+# NOTE: In the embedded layout every user document holds a 'storages' array with all items.
+#       In the normalized layout the field is missing and storages and items are kept
+#       in their own collections. Migrating a user moves the array and then removes it.
+
+async def migrate_user(db_users: AsyncIOMotorCollection, username: str, attempts: int = 3) -> Err | bool:
+    """
+    Move the storages and items of a user from the embedded to the normalized layout.
+
+    The storages and items are upserted, so an interrupted migration can be repeated.
+    Images embedded in the items are moved to the image store.
+    The embedded array is removed only if it did not change since it was read,
+    otherwise the migration is repeated with the new contents.
+
+    Args:
+        db_users (Collection): The users collection.
+        username (str): The username of the user to migrate.
+        attempts (int): How many times the migration is tried if the user is changed meanwhile.
+
+    Returns:
+        ErrorResponse | bool: The error response if an error occurred, True if the user was migrated
+            and False if there was nothing to migrate.
+    """
+
+    held = []
+    try:
+        db_storages, db_items = layout_collections(db_users)
+        for _ in range(attempts):
+            user = await db_users.find_one({"username": username, "storages": {"$exists": True}},
+                                           {"_id": 1, "storages": 1})
+            if user is None:
+                _migrated.add(username)
+                return False
+
+            storages = user["storages"]
+            storage_ops = [UpdateOne({"username": username, "name": storage["name"]},
+                                     {"$setOnInsert": {"username": username, "name": storage["name"]}},
+                                     upsert=True)
+                           for storage in storages]
+            item_ops = []
+            for storage in storages:
+                for item in storage.get("content", []):
+                    extracted = await extract_image(db_users, item)
+                    if isinstance(extracted, Err):
+                        return extracted
+                    if extracted is not item:
+                        held.append(extracted["image_id"])
+                    item = extracted
+                    item_ops.append(ReplaceOne({"code_id": item["code_id"]},
+                                               {**item, "username": username, "storage_name": storage["name"],
+                                                SEARCH_FIELD: search_terms(item.get("name"), item.get("description"))},
+                                               upsert=True))
+
+            if storage_ops:
+                await db_storages.bulk_write(storage_ops, ordered=False)
+            if item_ops:
+                await db_items.bulk_write(item_ops, ordered=False)
+
+            result = await db_users.update_one({"_id": user["_id"], "storages": storages},
+                                               {"$unset": {"storages": ""}})
+            if result.modified_count == 1:
+                _migrated.add(username)
+                logger.info(f"Migrated user '{username}' with {len(item_ops)} items.")
+                return True
+
+        return Err(message=f"User '{username}' kept changing during migration.", code=409)
+
+    except Exception as e:
+        logger.warning(f"Could not migrate user: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+    finally:
+        if held:
+            await release_images(db_users, held, stored=True)
+
+async def ensure_migrated(db_users: AsyncIOMotorCollection, username: str) -> Err | None:
+    """
+    Make sure a user is in the normalized layout before it is read or written.
+    The database is only checked the first time a user is seen by this process.
+
+    Args:
+        db_users (Collection): The users collection.
+        username (str): The username of the user.
+
+    Returns:
+        ErrorResponse | None: The error response if the user could not be migrated, None otherwise.
+    """
+
+    if username in _migrated:
+        return None
+
+    result = await migrate_user(db_users, username)
+    if isinstance(result, Err):
+        return result
+    return None
+
+def mark_migrated(username: str):
+    """
+    Remember that a user is in the normalized layout, for example because it was just created.
+
+    Args:
+        username (str): The username of the user.
+    """
+
+    _migrated.add(username)
+
+def forget_migrated(username: str):
+    """
+    Forget a user, for example because it was deleted and may be created again.
+
+    Args:
+        username (str): The username of the user.
+    """
+
+    _migrated.discard(username)
+
+async def migrate_all(db_users: AsyncIOMotorCollection, concurrency: int = 8) -> Err | int:
+    """
+    Migrate every user that is still in the embedded layout.
+    The service can keep running meanwhile, users it touches are migrated on first access.
+
+    Args:
+        db_users (Collection): The users collection.
+        concurrency (int): How many users are migrated at the same time.
+
+    Returns:
+        ErrorResponse | int: The error response if an error occurred, or the number of migrated users.
+    """
+
+    try:
+        semaphore = asyncio.Semaphore(concurrency)
+        migrated = 0
+        failed = 0
+
+        async def migrate(username: str):
+            nonlocal migrated, failed
+            async with semaphore:
+                result = await migrate_user(db_users, username)
+            if isinstance(result, Err):
+                failed += 1
+                logger.warning(f"Migrating user '{username}' failed: {result.message}")
+            elif result:
+                migrated += 1
+
+        tasks = set()
+        async for user in db_users.find({"storages": {"$exists": True}}, {"_id": 0, "username": 1}):
+            tasks.add(asyncio.create_task(migrate(user["username"])))
+            tasks = {task for task in tasks if not task.done()}
+            if len(tasks) >= concurrency * 2:
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        await asyncio.gather(*tasks)
+
+        if failed:
+            return Err(message=f"Migrated {migrated} users, {failed} failed.", code=500)
+        return migrated
+
+    except Exception as e:
+        logger.warning(f"Could not migrate users: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
+async def extract_images(db_users: AsyncIOMotorCollection) -> Err | int:
+    """
+    Move images still embedded in documents of the items collection to the image store.
+
+    Args:
+        db_users (Collection): The users collection.
+
+    Returns:
+        ErrorResponse | int: The error response if an error occurred, or the number of updated items.
+    """
+
+    try:
+        _, db_items = layout_collections(db_users)
+        updated = 0
+        async for item in db_items.find({"image_base64": {"$exists": True}}, {"_id": 1, "image_base64": 1}):
+            result = await extract_image(db_users, item)
+            if isinstance(result, Err):
+                return result
+
+            try:
+                await db_items.update_one({"_id": item["_id"], "image_base64": item["image_base64"]},
+                                          {"$set": {"image_id": result["image_id"]}, "$unset": {"image_base64": ""}})
+            finally:
+                await release_images(db_users, [result["image_id"]], stored=True)
+            updated += 1
+        return updated
+
+    except Exception as e:
+        logger.warning(f"Could not extract images: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
@@ -0,0 +1,122 @@
+# Author: Nina Mislej
+# Date created: 14.01.2025
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+
+from ..helpers.database_helpers import get_collection, layout_collections
+from ..helpers.error import ErrorResponse as Err
+from ..helpers.search_helpers import SEARCH_FIELD, NAME_WEIGHT, DESCRIPTION_WEIGHT, trigrams, search_terms
+from .migration_utils import ensure_migrated
+from ..config import SEARCH_LIMIT, SEARCH_MIN_SCORE, IMPORT_BATCH_SIZE
+
+# logger default library.
+from ..logger_setup import get_logger
+logger = get_logger("storage-ms.services")
+
+async def refresh_search_terms(db_items: AsyncIOMotorCollection, code_id: str):
+    """
+    Rebuild the search terms of an item after its name or description changed.
+    The terms are only written if the item did not change again meanwhile.
+
+    Args:
+        db_items (Collection): The items collection.
+        code_id (str): The code of the item.
+    """
+
+    item = await db_items.find_one({"code_id": code_id}, {"_id": 0, "name": 1, "description": 1})
+    if item is None:
+        return
+    await db_items.update_one(
+        {"code_id": code_id, "name": item.get("name"), "description": item.get("description")},
+        {"$set": {SEARCH_FIELD: search_terms(item.get("name"), item.get("description"))}})
+
+async def search_items(username: str, text: str, storage_name: str | None = None,
+                       limit: int = SEARCH_LIMIT) -> Err | list[dict]:
+    """
+    Search the items of a user by their name and description.
+
+    Items sharing trigrams with the searched text are ranked by the share of
+    the trigrams found in their name, where trigrams found in the description
+    count half. Items scoring below ``SEARCH_MIN_SCORE`` are left out.
+
+    Args:
+        username (str): The username of the user.
+        text (str): The searched text.
+        storage_name (str | None): Only items in this storage are searched, all storages if missing.
+        limit (int): The maximum number of items returned.
+
+    Returns:
+        ErrorResponse | list[dict]: The error response if an error occurred, or the matching
+            items with their storage name and score, best matches first.
+    """
+
+    try:
+        db_users = await get_collection()
+        if db_users is None:
+            return Err(message=f"Cannot get DB collection.")
+
+        grams = sorted(trigrams(text))
+        if not grams:
+            return Err(message=f"The searched text has no words.")
+
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
+
+        name_terms = [f"n:{gram}" for gram in grams]
+        description_terms = [f"d:{gram}" for gram in grams]
+        match = {"username": username, SEARCH_FIELD: {"$in": name_terms + description_terms}}
+        if storage_name is not None:
+            match["storage_name"] = storage_name
+
+        hits = lambda terms: {"$size": {"$filter": {"input": terms, "cond": {"$in": ["$$this", f"${SEARCH_FIELD}"]}}}}
+        pipeline = [
+            {"$match": match},
+            {"$addFields": {"score": {"$min": [1, {"$divide": [
+                {"$add": [{"$multiply": [NAME_WEIGHT, hits(name_terms)]},
+                          {"$multiply": [DESCRIPTION_WEIGHT, hits(description_terms)]}]},
+                NAME_WEIGHT * len(grams)]}]}}},
+            {"$match": {"score": {"$gte": SEARCH_MIN_SCORE}}},
+            {"$sort": {"score": -1, "code_id": 1}},
+            {"$limit": limit},
+            {"$project": {"_id": 0, "username": 0, SEARCH_FIELD: 0}}]
+
+        _, db_items = layout_collections(db_users)
+        return await db_items.aggregate(pipeline).to_list()
+
+    except Exception as e:
+        logger.warning(f"Could not search items: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
+async def index_items(db_users: AsyncIOMotorCollection) -> Err | int:
+    """
+    Add search terms to items created before searching was supported.
+
+    Args:
+        db_users (Collection): The users collection.
+
+    Returns:
+        ErrorResponse | int: The error response if an error occurred, or the number of updated items.
+    """
+
+    try:
+        _, db_items = layout_collections(db_users)
+        updated = 0
+        operations = []
+        async for item in db_items.find({SEARCH_FIELD: {"$exists": False}},
+                                        {"_id": 1, "name": 1, "description": 1}):
+            operations.append(UpdateOne(
+                {"_id": item["_id"], SEARCH_FIELD: {"$exists": False}},
+                {"$set": {SEARCH_FIELD: search_terms(item.get("name"), item.get("description"))}}))
+            if len(operations) >= IMPORT_BATCH_SIZE:
+                updated += (await db_items.bulk_write(operations, ordered=False)).modified_count
+                operations = []
+
+        if operations:
+            updated += (await db_items.bulk_write(operations, ordered=False)).modified_count
+        return updated
+
+    except Exception as e:
+        logger.warning(f"Could not index items: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
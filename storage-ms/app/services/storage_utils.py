@@ -2,14 +2,26 @@
 # Date created: 4.12.2024
 
 from ..schemas import storage_schemas as schema
-from ..models.storage import Storage
-from ..helpers.database_helpers import get_collection
+from ..models.item import Item
+from ..helpers.database_helpers import get_collection, layout_collections
 from ..helpers.error import ErrorResponse as Err
+from .migration_utils import ensure_migrated
+from .image_utils import release_images
+from pymongo.errors import DuplicateKeyError
 
 # logger default library.
 from ..logger_setup import get_logger
 logger = get_logger("storage-ms.services")
 
+# Fields of an item document that are not part of the item itself.
+ITEM_PROJECTION = {"_id": 0, "username": 0, "storage_name": 0, "search_terms": 0}
+
+# Fields of an item that can be selected in queries and streamed responses.
+ITEM_FIELDS = tuple(Item.model_fields)
+
+# Storage names taken by user endpoints, a storage with such a name could not be fetched.
+RESERVED_STORAGE_NAMES = ("search-items",)
+
 async def create_storage(username : str, storage : schema.StorageCreate) -> Err | str:
     """
     Create a new storage for a specific user.
@@ -30,27 +42,34 @@ async def create_storage(username : str, storage : schema.StorageCreate) -> Err
         if db_users is None:
             return Err(message=f"Cannot get DB collection.")
 
-        # NOTE: No need to check whether the user exists or not,
-        # the database query does not throw but rahter returns 0 in case of no matchings.
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
+
         name = storage.name
-        storage_dict = Storage(name=name,
-                               content=[]).model_dump(by_alias=True)
+        if name in RESERVED_STORAGE_NAMES:
+            return Err(message=f"Storage name '{name}' is reserved.")
+
+        db_storages, _ = layout_collections(db_users)
+        if await db_users.count_documents({"username": username}, limit=1) == 0:
+            return Err(message=f"Creating storage '{name}' modified zero entries.")
 
-        if not isinstance(await get_storage(username, name), Err):
+        if await db_storages.count_documents({"username": username, "name": name}, limit=1) > 0:
             return Err(message=f"Storage name '{name}' already exists and cannot be created.", code=409)
 
-        # Update the 'user' document's field 'storages',
-        # using the operator '$push' to add a value to an array.
+        # NOTE: The unique index on username and name also rejects duplicates
+        # when two requests create the same storage at once.
         # Before accessing any attributes of the 'pymongo.results' objects
         # aknowledged needs to be checked:
         # if false all other attributes of this class will raise InvalidOperation when accessed.
-        result = await db_users.update_one({"username": username}, {"$push": {"storages": storage_dict}})
+        try:
+            result = await db_storages.insert_one({"username": username, "name": name})
+        except DuplicateKeyError:
+            return Err(message=f"Storage name '{name}' already exists and cannot be created.", code=409)
+
         if not result.acknowledged:
             return Err(message=f"Creating storage '{name}' failed.")
 
-        if result.modified_count == 0:
-            return Err(message=f"Creating storage '{name}' modified zero entries.")
-
         logger.debug(f"New storage '{name}' created.")
         return name
 
@@ -79,21 +98,18 @@ async def get_storage(username : str, storage_name : str) -> Err | dict:
         if db_users is None:
             return Err(message=f"Cannot get DB collection.")
 
-        # A cleaner way of finding all matchings and a sanity check that there are unique.
-        pipeline = [
-            {"$match": {"username": username}}, # Finds the user.
-            {"$unwind": "$storages"},  # Deconstruct the storages array.
-            {"$match": {"storages.name": storage_name}}, # Match the specific storage.
-            {"$replaceRoot": {"newRoot": "$storages"}}  # Replace the root document with the storage object.
-        ]
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
 
-        result = await db_users.aggregate(pipeline).to_list()
-        if not result:
+        db_storages, db_items = layout_collections(db_users)
+        storage = await db_storages.find_one({"username": username, "name": storage_name}, {"_id": 0, "name": 1})
+        if not storage:
             return Err(message=f"Getting storage '{storage_name}' failed.")
 
-        if len(result) > 1:
-            return Err(message=f"Storage '{storage_name}' has more than one storage entry.")
-        return result[0]
+        storage["content"] = await db_items.find(
+            {"username": username, "storage_name": storage_name}, ITEM_PROJECTION).to_list()
+        return storage
 
     except Exception as e:
         logger.warning(f"Could not get storage: {e}")
@@ -120,12 +136,18 @@ async def delete_storage(username : str, storage_name : str) -> Err | str:
         if db_users is None:
             return Err(message=f"Cannot get DB collection.")
 
-        result = await db_users.update_one(
-            {"username": username},
-            {"$pull": {"storages": {"name": storage_name}}})
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
 
-        if not result.acknowledged or result.modified_count == 0:
+        db_storages, db_items = layout_collections(db_users)
+        result = await db_storages.delete_one({"username": username, "name": storage_name})
+        if not result.acknowledged or result.deleted_count == 0:
             return Err(message=f"Deleting storage '{storage_name}' failed.")
+
+        image_ids = await db_items.distinct("image_id", {"username": username, "storage_name": storage_name})
+        await db_items.delete_many({"username": username, "storage_name": storage_name})
+        await release_images(db_users, image_ids)
         return storage_name
 
     except Exception as e:
@@ -153,15 +175,30 @@ async def update_storage_name(username : str, storage_name : str, new_name : str
         if db_users is None:
             return Err(message=f"Cannot get DB collection.")
 
-        if not isinstance(await get_storage(username, new_name), Err):
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
+
+        if new_name in RESERVED_STORAGE_NAMES:
+            return Err(message=f"Storage name '{new_name}' is reserved.")
+
+        db_storages, db_items = layout_collections(db_users)
+        if await db_storages.count_documents({"username": username, "name": new_name}, limit=1) > 0:
             return Err(message=f"Storage name '{new_name}' already exists.", code=409)
 
-        result = await db_users.update_one(
-            {"username": username, "storages.name": storage_name},
-            {"$set": {"storages.$.name": new_name}})
+        try:
+            result = await db_storages.update_one(
+                {"username": username, "name": storage_name},
+                {"$set": {"name": new_name}})
+        except DuplicateKeyError:
+            return Err(message=f"Storage name '{new_name}' already exists.", code=409)
 
         if not result.acknowledged or result.modified_count == 0:
             return Err(message=f"Updating storage name '{storage_name}' with '{new_name}' failed.")
+
+        await db_items.update_many(
+            {"username": username, "storage_name": storage_name},
+            {"$set": {"storage_name": new_name}})
         return new_name
 
     except Exception as e:
@@ -187,15 +224,20 @@ async def empty_storage(username : str, storage_name : str) -> Err | str:
         if db_users is None:
             return Err(message=f"Cannot get DB collection.")
 
-        result = await db_users.update_one(
-            {"username": username, "storages.name": storage_name},
-            {"$set": {"storages.$.content": []}})
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
+
+        db_storages, db_items = layout_collections(db_users)
+        if await db_storages.count_documents({"username": username, "name": storage_name}, limit=1) == 0:
+            return Err(message=f"Couldnt match to any record in datbabase.")
 
+        image_ids = await db_items.distinct("image_id", {"username": username, "storage_name": storage_name})
+        result = await db_items.delete_many({"username": username, "storage_name": storage_name})
         if not result.acknowledged:
             return Err(message=f"Emptying '{storage_name}' contents failed.")
 
-        if result.matched_count == 0:
-            return Err(message=f"Couldnt match to any record in datbabase.")
+        await release_images(db_users, image_ids)
 
         logger.debug(f"Deleted storage '{storage_name}'.")
         return storage_name
@@ -0,0 +1,502 @@
+# Author: Nina Mislej
+# Date created: 14.01.2025
+
+import io
+import csv
+import json
+import asyncio
+from datetime import datetime
+from typing import AsyncIterator
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from ..schemas import item_schemas as schema
+from ..models.item import Item
+from ..helpers.database_helpers import get_collection, layout_collections
+from ..helpers.error import ErrorResponse as Err
+from ..helpers.search_helpers import SEARCH_FIELD, search_terms
+from ..googlerpc.grpc_client import create_codes
+from ..config import IMPORT_MAX_ROWS, IMPORT_MAX_BYTES, IMPORT_BATCH_SIZE, IMPORT_WORKERS, STREAM_CHUNK_SIZE
+from .migration_utils import ensure_migrated
+from .image_utils import store_image, release_images
+from .storage_utils import ITEM_PROJECTION, ITEM_FIELDS
+
+# logger default library.
+from ..logger_setup import get_logger
+logger = get_logger("storage-ms.services")
+
+# Supported media types of imported and exported items.
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+CSV = "text/csv"
+MEDIA_TYPES = {"json": JSON, "ndjson": NDJSON, "csv": CSV}
+
+# Columns of exported CSV files. Imports only read the 'name', 'amount' and 'description' columns.
+CSV_FIELDS = ["code_id", "name", "amount", "description", "date_added", "image_id"]
+
+async def read_body(chunks: AsyncIterator[bytes]) -> Err | bytes:
+    """
+    Read imported content, stopping as soon as it exceeds ``IMPORT_MAX_BYTES``.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The streamed request body.
+
+    Returns:
+        ErrorResponse | bytes: The error response if the content is too large, or the content otherwise.
+    """
+
+    body = bytearray()
+    async for chunk in chunks:
+        body += chunk
+        if len(body) > IMPORT_MAX_BYTES:
+            return Err(message=f"Cannot import more than {IMPORT_MAX_BYTES} bytes at once.", code=413)
+    return bytes(body)
+
+def parse_rows(body: bytes, media_type: str) -> Err | list[dict | Err]:
+    """
+    Parse imported items in JSON array, NDJSON or CSV format.
+    A row that cannot be parsed is replaced with an error response, so other rows can still be imported.
+
+    Args:
+        body (bytes): The imported content.
+        media_type (str): The media type of the content.
+
+    Returns:
+        ErrorResponse | list[dict | ErrorResponse]: The error response if the content cannot be parsed
+            at all, or the fields or error response of every row otherwise.
+    """
+
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return Err(message=f"Imported items must be UTF-8 encoded.")
+
+    if media_type == JSON:
+        try:
+            rows = json.loads(text)
+        except json.JSONDecodeError as e:
+            return Err(message=f"Imported items are not valid JSON: {e}")
+        if not isinstance(rows, list):
+            return Err(message=f"Imported items must be a JSON array.")
+
+    elif media_type == NDJSON:
+        rows = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                rows.append(Err(message=f"Not valid JSON: {e}"))
+
+    elif media_type == CSV:
+        # NOTE: Empty cells are treated as missing values.
+        rows = [{field: value for field, value in row.items() if field and value not in (None, "")}
+                for row in csv.DictReader(io.StringIO(text))]
+
+    else:
+        return Err(message=f"Unsupported media type '{media_type}', use one of {', '.join(MEDIA_TYPES.values())}.", code=415)
+
+    if len(rows) > IMPORT_MAX_ROWS:
+        return Err(message=f"Cannot import more than {IMPORT_MAX_ROWS} items at once.", code=413)
+    return [row if isinstance(row, (dict, Err)) else Err(message=f"Row must be an object.") for row in rows]
+
+def validate_row(row: dict) -> Err | Item:
+    """
+    Build a new item from the fields of an imported row.
+    Missing amounts default to one, codes and dates of the row are ignored.
+
+    Args:
+        row (dict): The fields of the row.
+
+    Returns:
+        ErrorResponse | Item: The error response if the row is not valid, or the new item otherwise.
+    """
+
+    try:
+        item = schema.ItemCreate.model_validate(row)
+    except ValidationError as e:
+        return Err(message="; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()))
+
+    if item.amount == 0:
+        return Err(message=f"Cannot create new item with zero instances.")
+    return Item(**item.model_dump(exclude_none=True))
+
+async def import_batch(db_users, username: str, storage_name: str,
+                       batch: list[tuple[int, Item]], result: schema.ItemImportResult) -> dict[int, str]:
+    """
+    Create the codes of a batch of items, store their images and insert them.
+    Errors are added to ``result`` per row, the images of rows that are not inserted are released.
+
+    Args:
+        db_users (Collection): The users collection.
+        username (str): The username of the user importing the items.
+        storage_name (str): The name of the storage where the items are being added.
+        batch (list[tuple[int, Item]]): The row numbers and the new items.
+        result (ItemImportResult): The import result the errors are added to.
+
+    Returns:
+        dict[int, str]: The codes of the created items by their row number.
+    """
+
+    images = await create_codes([item.code_id for _, item in batch])
+    if isinstance(images, Err):
+        result.errors.extend(schema.ItemImportError(row=row, message=images.message) for row, _ in batch)
+        return {}
+
+    distinct_images = list({image for image in images.values() if not isinstance(image, Err)})
+    image_ids = dict(zip(distinct_images, await asyncio.gather(*(store_image(db_users, image) for image in distinct_images))))
+    stored = [image_id for image_id in image_ids.values() if not isinstance(image_id, Err)]
+
+    rows, documents = [], []
+    for row, item in batch:
+        image_id = images[item.code_id]
+        if not isinstance(image_id, Err):
+            image_id = image_ids[image_id]
+        if isinstance(image_id, Err):
+            result.errors.append(schema.ItemImportError(row=row, message=image_id.message))
+            continue
+
+        item.image_id = image_id
+        rows.append((row, item.code_id))
+        documents.append({**item.model_dump(by_alias=True), "username": username, "storage_name": storage_name,
+                          SEARCH_FIELD: search_terms(item.name, item.description)})
+
+    if not documents:
+        return {}
+
+    _, db_items = layout_collections(db_users)
+    failed = {}
+    try:
+        await db_items.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        failed = {error["index"]: error["errmsg"] for error in e.details.get("writeErrors", [])}
+    finally:
+        # NOTE: Images of rows that were not inserted are deleted unless other items use them.
+        await release_images(db_users, stored, stored=True)
+
+    created = {}
+    for index, (row, code_id) in enumerate(rows):
+        if index in failed:
+            result.errors.append(schema.ItemImportError(row=row, message=f"Creating item failed: {failed[index]}"))
+        else:
+            created[row] = code_id
+    return created
+
+async def import_items(username: str, storage_name: str, body: bytes, media_type: str) -> Err | schema.ItemImportResult:
+    """
+    Import many items into a specific storage of a user.
+
+    Rows are validated first and valid rows are imported in batches. The codes of a
+    batch are created with a single streaming GRPC call and its items are inserted
+    together. At most ``IMPORT_WORKERS`` batches are imported at the same time.
+    Rows that fail are reported with their row number while the other rows are created.
+
+    Args:
+        username (str): The username of the user importing the items.
+        storage_name (str): The name of the storage where the items are being added.
+        body (bytes): The imported items in JSON array, NDJSON or CSV format.
+        media_type (str): The media type of the imported items.
+
+    Returns:
+        ErrorResponse | ItemImportResult: The error response if the import failed as a whole,
+            or the created item codes and the errors of failed rows otherwise.
+    """
+
+    try:
+        db_users = await get_collection()
+        if db_users is None:
+            return Err(message=f"Cannot get DB collection.")
+
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
+
+        db_storages, _ = layout_collections(db_users)
+        if await db_storages.count_documents({"username": username, "name": storage_name}, limit=1) == 0:
+            return Err(message=f"Importing items failed.")
+
+        rows = parse_rows(body, media_type)
+        if isinstance(rows, Err):
+            return rows
+
+        result = schema.ItemImportResult()
+        valid = []
+        for row, fields in enumerate(rows, start=1):
+            item = fields if isinstance(fields, Err) else validate_row(fields)
+            if isinstance(item, Err):
+                result.errors.append(schema.ItemImportError(row=row, message=item.message))
+            else:
+                valid.append((row, item))
+
+        semaphore = asyncio.Semaphore(IMPORT_WORKERS)
+        async def worker(batch):
+            async with semaphore:
+                return await import_batch(db_users, username, storage_name, batch, result)
+
+        batches = [valid[start:start + IMPORT_BATCH_SIZE] for start in range(0, len(valid), IMPORT_BATCH_SIZE)]
+        created = {}
+        for codes in await asyncio.gather(*(worker(batch) for batch in batches)):
+            created.update(codes)
+
+        result.created = [created[row] for row in sorted(created)]
+        result.errors.sort(key=lambda error: error.row)
+        logger.debug(f"Imported {len(result.created)} items, {len(result.errors)} rows failed.")
+        return result
+
+    except Exception as e:
+        logger.warning(f"Could not import items: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
+async def export_items(username: str, storage_name: str, media_type: str) -> Err | AsyncIterator[bytes]:
+    """
+    Export all items of a specific storage of a user.
+    Items are read from the database in batches and encoded as they arrive,
+    so the whole storage is never held in memory.
+
+    Args:
+        username (str): The username of the user who owns the storage.
+        storage_name (str): The name of the storage.
+        media_type (str): The media type of the export, JSON array, NDJSON or CSV.
+
+    Returns:
+        ErrorResponse | AsyncIterator[bytes]: The error response if an error occurred,
+            or the encoded items in chunks otherwise.
+    """
+
+    try:
+        if media_type not in MEDIA_TYPES.values():
+            return Err(message=f"Unsupported media type '{media_type}', use one of {', '.join(MEDIA_TYPES.values())}.", code=415)
+
+        db_users = await get_collection()
+        if db_users is None:
+            return Err(message=f"Cannot get DB collection.")
+
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
+
+        db_storages, db_items = layout_collections(db_users)
+        if await db_storages.count_documents({"username": username, "name": storage_name}, limit=1) == 0:
+            return Err(message=f"Exporting items failed.")
+
+        cursor = db_items.find({"username": username, "storage_name": storage_name},
+                               ITEM_PROJECTION).sort("name", 1).batch_size(IMPORT_BATCH_SIZE)
+
+    except Exception as e:
+        logger.warning(f"Could not export items: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
+    async def encode() -> AsyncIterator[bytes]:
+        if media_type == CSV:
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        elif media_type == JSON:
+            yield b"["
+
+        first = True
+        async for document in cursor:
+            item = Item.model_validate(document)
+            if media_type == CSV:
+                writer.writerow(item.model_dump(mode="json"))
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+            elif media_type == JSON:
+                yield (b"" if first else b",") + item.model_dump_json().encode()
+            else:
+                yield item.model_dump_json().encode() + b"\n"
+            first = False
+
+        if media_type == JSON:
+            yield b"]"
+
+    return encode()
+
+def item_projection(fields: list[str] | None) -> Err | dict:
+    """
+    Build the projection of streamed items.
+
+    Args:
+        fields (list[str] | None): The item fields to include, or None for all fields.
+
+    Returns:
+        ErrorResponse | dict: The error response if a field is unknown, or the projection otherwise.
+    """
+
+    if not fields:
+        return {"_id": 0, "username": 0, "search_terms": 0}
+
+    unknown = set(fields) - set(ITEM_FIELDS)
+    if unknown:
+        return Err(message=f"Unknown item fields {', '.join(sorted(unknown))}, use any of {', '.join(ITEM_FIELDS)}.")
+    return {"_id": 0, "storage_name": 1, **{field: 1 for field in fields}}
+
+def encode(document: dict) -> bytes:
+    """
+    Encode a document as compact JSON, dates are written in ISO 8601 format.
+    """
+
+    return json.dumps(document, separators=(",", ":"), default=lambda value: value.isoformat()
+                      if isinstance(value, datetime) else str(value)).encode()
+
+async def chunked(parts: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Join small encoded parts into chunks of about ``STREAM_CHUNK_SIZE`` bytes.
+    """
+
+    buffer, size = [], 0
+    async for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= STREAM_CHUNK_SIZE:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+async def stream_storage(username: str, storage_name: str, media_type: str,
+                         fields: list[str] | None = None) -> Err | AsyncIterator[bytes]:
+    """
+    Stream a storage of a user with its items.
+
+    As JSON the storage has the same shape as returned by ``get_storage``. As NDJSON
+    every line holds one item. Items are read from a cursor and encoded one by one,
+    so the storage is never held in memory as a whole.
+
+    Args:
+        username (str): The username of the user who owns the storage.
+        storage_name (str): The name of the storage.
+        media_type (str): The media type of the response, JSON or NDJSON.
+        fields (list[str] | None): The item fields to include, or None for all fields.
+
+    Returns:
+        ErrorResponse | AsyncIterator[bytes]: The error response if an error occurred,
+            or the encoded storage in chunks otherwise.
+    """
+
+    try:
+        if media_type not in (JSON, NDJSON):
+            return Err(message=f"Unsupported media type '{media_type}', use one of {JSON}, {NDJSON}.", code=415)
+
+        projection = item_projection(fields)
+        if isinstance(projection, Err):
+            return projection
+
+        db_users = await get_collection()
+        if db_users is None:
+            return Err(message=f"Cannot get DB collection.")
+
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
+
+        db_storages, db_items = layout_collections(db_users)
+        if await db_storages.count_documents({"username": username, "name": storage_name}, limit=1) == 0:
+            return Err(message=f"Getting storage '{storage_name}' failed.")
+
+        cursor = db_items.find({"username": username, "storage_name": storage_name},
+                               projection).sort("name", 1).batch_size(IMPORT_BATCH_SIZE)
+
+    except Exception as e:
+        logger.warning(f"Could not stream storage: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
+    async def parts() -> AsyncIterator[bytes]:
+        if media_type == JSON:
+            yield encode({"name": storage_name})[:-1] + b',"content":['
+
+        first = True
+        async for item in cursor:
+            item.pop("storage_name", None)
+            if media_type == JSON:
+                yield (b"" if first else b",") + encode(item)
+            else:
+                yield encode(item) + b"\n"
+            first = False
+
+        if media_type == JSON:
+            yield b"]}"
+
+    return chunked(parts())
+
+async def stream_user(username: str, media_type: str, fields: list[str] | None = None) -> Err | AsyncIterator[bytes]:
+    """
+    Stream a user with all storages and items.
+
+    As JSON the user has the same shape as returned by ``get_user``. As NDJSON
+    every line holds one item together with its 'storage_name', so empty storages
+    are left out. Storages and items are read from cursors sorted by storage name
+    and merged while they are encoded, so the user is never held in memory as a whole.
+
+    Args:
+        username (str): The username of the user.
+        media_type (str): The media type of the response, JSON or NDJSON.
+        fields (list[str] | None): The item fields to include, or None for all fields.
+
+    Returns:
+        ErrorResponse | AsyncIterator[bytes]: The error response if an error occurred,
+            or the encoded user in chunks otherwise.
+    """
+
+    try:
+        if media_type not in (JSON, NDJSON):
+            return Err(message=f"Unsupported media type '{media_type}', use one of {JSON}, {NDJSON}.", code=415)
+
+        projection = item_projection(fields)
+        if isinstance(projection, Err):
+            return projection
+
+        db_users = await get_collection()
+        if db_users is None:
+            return Err(message=f"Cannot get DB collection.")
+
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
+
+        user = await db_users.find_one({"username": username}, {"_id": 0, "storages": 0})
+        if not user:
+            return Err(message=f"Getting user '{username}' failed.")
+
+        db_storages, db_items = layout_collections(db_users)
+        items = db_items.find({"username": username}, projection).sort(
+            [("storage_name", 1), ("name", 1)]).batch_size(IMPORT_BATCH_SIZE)
+        storages = db_storages.find({"username": username}, {"_id": 0, "name": 1}).sort("name", 1)
+
+    except Exception as e:
+        logger.warning(f"Could not stream user: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
+    async def parts() -> AsyncIterator[bytes]:
+        if media_type == NDJSON:
+            async for item in items:
+                yield encode(item) + b"\n"
+            return
+
+        yield encode(user)[:-1] + b',"storages":['
+        remaining = aiter(items)
+        item = await anext(remaining, None)
+        first_storage = True
+        async for storage in storages:
+            # NOTE: Both cursors are sorted by storage name, items of missing storages are skipped.
+            while item is not None and item["storage_name"] < storage["name"]:
+                item = await anext(remaining, None)
+
+            yield (b"" if first_storage else b",") + encode({"name": storage["name"]})[:-1] + b',"content":['
+            first_item = True
+            while item is not None and item["storage_name"] == storage["name"]:
+                item.pop("storage_name")
+                yield (b"" if first_item else b",") + encode(item)
+                item = await anext(remaining, None)
+                first_item = False
+            yield b"]}"
+            first_storage = False
+
+        yield b"]}"
+
+    return chunked(parts())
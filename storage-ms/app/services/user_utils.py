@@ -2,11 +2,14 @@
 # Date created: 4.12.2024
 
 from typing import Any, Mapping
+from pymongo.errors import BulkWriteError
 
 from ..schemas import user_schemas as schema
 from ..models.user import User
-from ..helpers.database_helpers import get_collection
+from ..helpers.database_helpers import get_collection, layout_collections
 from ..helpers.error import ErrorResponse as Err
+from .migration_utils import ensure_migrated, mark_migrated, forget_migrated
+from .image_utils import release_images
 
 # logger default library.
 from ..logger_setup import get_logger
@@ -37,13 +40,16 @@ async def create_user(user : schema.UserCreate) -> Err | str:
         if not isinstance(result, Err):
             return Err(message=f"User with username {user.username} already exists.", code=402)
 
+        # NOTE: Storages are kept in their own collection and are not part of the user document.
         user_dict = User(username=user.username,
                          display_name=user.display_name,
-                         storages=[]).model_dump(by_alias=True)
+                         storages=[]).model_dump(by_alias=True, exclude={"storages"})
         result = await db_users.insert_one(user_dict)
         if not result.acknowledged:
             return Err(message=f"Creating user failed.")
 
+        mark_migrated(user.username)
+
         logger.debug(f"User '{user.username}' created.")
         return str(user.username)
 
@@ -58,6 +64,7 @@ async def get_user(username : str) -> Err | dict:
     Retrieve a user by their identifier.
 
     This function fetches a user's details from the database based on their ``username``.
+    The storages of the user and their contents are attached to the returned document.
     If the user does not exist or the operation fails, an error response is returned.
 
     Args:
@@ -72,9 +79,23 @@ async def get_user(username : str) -> Err | dict:
         if db_users is None:
             return Err(message=f"Cannot get DB collection.")
 
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
+
         result: dict | None = await db_users.find_one({"username": username})
         if not result:
             return Err(message=f"Getting user '{username}' failed.")
+
+        db_storages, db_items = layout_collections(db_users)
+        storages = {storage["name"]: {"name": storage["name"], "content": []}
+                    async for storage in db_storages.find({"username": username}, {"_id": 0, "name": 1})}
+        async for item in db_items.find({"username": username}, {"_id": 0, "username": 0, "search_terms": 0}):
+            storage = storages.get(item.pop("storage_name"))
+            if storage is not None:
+                storage["content"].append(item)
+
+        result["storages"] = list(storages.values())
         return result
 
     except Exception as e:
@@ -104,12 +125,113 @@ async def delete_user(username : str) -> Err | str:
         result = await db_users.delete_one({"username": username})
         if not result.acknowledged:
             return Err(message=f"Deleting user '{username}' failed.")
+
+        db_storages, db_items = layout_collections(db_users)
+        image_ids = await db_items.distinct("image_id", {"username": username})
+        await db_items.delete_many({"username": username})
+        await db_storages.delete_many({"username": username})
+        await release_images(db_users, image_ids)
+        forget_migrated(username)
         return username
 
     except Exception as e:
         logger.warning(f"Could not delete user: {e}")
         return Err(message=f"Unknown exception: {e}", code=500)
 
+async def create_users(usernames : list[str]) -> Err | dict[str, Err | str]:
+    """
+    Create many users in the database.
+
+    Existing users are looked up with a single query and the remaining users are
+    inserted together. Users that fail are reported while the others are created.
+
+    Args:
+        usernames (list[str]): The identifiers of the users to create.
+
+    Returns:
+        ErrorResponse | dict[str, ErrorResponse | str]: The error response if the database could not be
+            reached, or the username or an error response for every requested user otherwise.
+    """
+
+    try:
+        db_users = await get_collection()
+        if db_users is None:
+            return Err(message=f"Cannot get DB collection.")
+
+        usernames = list(dict.fromkeys(usernames))
+        existing = {user["username"] async for user in
+                    db_users.find({"username": {"$in": usernames}}, {"_id": 0, "username": 1})}
+
+        results = {}
+        pending = []
+        for username in usernames:
+            if username in existing:
+                results[username] = Err(message=f"User with username {username} already exists.", code=402)
+            else:
+                pending.append(username)
+
+        if not pending:
+            return results
+
+        # NOTE: Storages are kept in their own collection and are not part of the user document.
+        documents = [User(username=username, storages=[]).model_dump(by_alias=True, exclude={"storages"})
+                     for username in pending]
+        failed = {}
+        try:
+            await db_users.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error["errmsg"] for error in e.details.get("writeErrors", [])}
+
+        for index, username in enumerate(pending):
+            if index in failed:
+                results[username] = Err(message=f"Creating user failed: {failed[index]}")
+            else:
+                mark_migrated(username)
+                results[username] = username
+
+        logger.debug(f"Created {len(pending) - len(failed)} of {len(usernames)} users.")
+        return results
+
+    except Exception as e:
+        logger.warning(f"Could not create users: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
+async def delete_users(usernames : list[str]) -> Err | list[str]:
+    """
+    Delete many users together with their storages, items and images.
+
+    Like deleting a single user, users that do not exist are deleted successfully.
+
+    Args:
+        usernames (list[str]): The identifiers of the users to delete.
+
+    Returns:
+        ErrorResponse | list[str]: The error response if an error occurred, or the deleted usernames.
+    """
+
+    try:
+        db_users = await get_collection()
+        if db_users is None:
+            return Err(message=f"Cannot get DB collection.")
+
+        usernames = list(dict.fromkeys(usernames))
+        result = await db_users.delete_many({"username": {"$in": usernames}})
+        if not result.acknowledged:
+            return Err(message=f"Deleting users failed.")
+
+        db_storages, db_items = layout_collections(db_users)
+        image_ids = await db_items.distinct("image_id", {"username": {"$in": usernames}})
+        await db_items.delete_many({"username": {"$in": usernames}})
+        await db_storages.delete_many({"username": {"$in": usernames}})
+        await release_images(db_users, image_ids)
+        for username in usernames:
+            forget_migrated(username)
+        return usernames
+
+    except Exception as e:
+        logger.warning(f"Could not delete users: {e}")
+        return Err(message=f"Unknown exception: {e}", code=500)
+
 async def update_display_name(username : str, new_name : str) -> Err | str:
     """
     Update the display name of a user.
@@ -161,15 +283,21 @@ async def empty_storages(username : str) -> Err | str:
         if db_users is None:
             return Err(message=f"Cannot get DB collection.")
 
-        result = await db_users.update_one(
-            {"username": username},
-            {"$set": {"storages": []}})
+        migrated = await ensure_migrated(db_users, username)
+        if isinstance(migrated, Err):
+            return migrated
 
+        if await db_users.count_documents({"username": username}, limit=1) == 0:
+            return Err(message=f"Couldnt match to any record in datbabase.")
+
+        db_storages, db_items = layout_collections(db_users)
+        image_ids = await db_items.distinct("image_id", {"username": username})
+        await db_items.delete_many({"username": username})
+        result = await db_storages.delete_many({"username": username})
         if not result.acknowledged:
             return Err(message=f"Emptying '{username}' contents failed.")
 
-        if result.matched_count == 0:
-            return Err(message=f"Couldnt match to any record in datbabase.")
+        await release_images(db_users, image_ids)
 
         logger.debug(f"User '{username}' deleted.")
         return username
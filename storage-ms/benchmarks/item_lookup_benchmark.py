@@ -0,0 +1,115 @@
+# Author: Nina Mislej
+# Date created: 13.01.2025
+
+"""
+Benchmark of item lookups in a large storage.
+
+Seeds a temporary user with one storage holding ``--items`` items and measures the latency
+of looking up single items and filtering items. The embedded layout is measured with the
+``$unwind`` pipelines used first and with the indexed ``$filter`` pipelines, the normalized
+layout with queries on the items collection. Needs the same database configuration as the
+service. Run from the `storage-ms` directory:
+
+    python -m benchmarks.item_lookup_benchmark --items 10000 --lookups 200
+"""
+
+import argparse
+import asyncio
+import random
+import secrets
+import statistics
+import time
+
+from app.helpers import get_collection, ensure_indexes, layout_collections, close_client
+from app.models.item import Item
+
+STORAGE_NAME = "benchmark"
+
+def unwind_pipeline(username: str, match: dict) -> list:
+    """
+    The pipeline used before, unwinding every storage and item of the user.
+    """
+
+    return [
+        {"$match": {"username": username, "storages.name": STORAGE_NAME}},
+        {"$unwind": "$storages"},
+        {"$match": {"storages.name": STORAGE_NAME}},
+        {"$unwind": "$storages.content"},
+        {"$match": {f"storages.content.{field}": value for field, value in match.items()}},
+        {"$replaceRoot": {"newRoot": "$storages.content"}}
+    ]
+
+def filter_pipeline(username: str, match: dict) -> list:
+    """
+    The pipeline selecting matching items of the embedded layout with '$filter'.
+    """
+
+    return [
+        {"$match":
+            {"username": username,
+             "storages": {"$elemMatch": {"name": STORAGE_NAME,
+                                         **{f"content.{field}": value for field, value in match.items()}}}}},
+        {"$project": {"_id": 0, "storages": {"$filter": {
+            "input": "$storages",
+            "as": "storage",
+            "cond": {"$eq": ["$$storage.name", STORAGE_NAME]}}}}},
+        {"$unwind": "$storages"},
+        {"$project": {"matches": {"$filter": {
+            "input": "$storages.content",
+            "as": "item",
+            "cond": {"$and": [{"$eq": [f"$$item.{field}", value]} for field, value in match.items()]}}}}}
+    ]
+
+async def measure(run, queries: list) -> list[float]:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        await run(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def report(label: str, latencies: list[float]):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:>22}: p50 {statistics.median(latencies):8.2f} ms  p95 {p95:8.2f} ms")
+
+async def main(items: int, lookups: int):
+    collection = await get_collection()
+    if collection is None:
+        raise SystemExit("Cannot get DB collection.")
+    await ensure_indexes()
+    _, db_items = layout_collections(collection)
+
+    username = f"benchmark-{secrets.token_hex(8)}"
+    content = [Item(name=f"item-{index % 100}", amount=index % 10 + 1).model_dump(by_alias=True)
+               for index in range(items)]
+    await collection.insert_one({"username": username,
+                                 "display_name": username,
+                                 "storages": [{"name": STORAGE_NAME, "content": content}]})
+    await db_items.insert_many([{**item, "username": username, "storage_name": STORAGE_NAME} for item in content])
+
+    def embedded(build):
+        return lambda match: collection.aggregate(build(username, match)).to_list()
+
+    def normalized(match: dict):
+        return db_items.find({**match, "username": username, "storage_name": STORAGE_NAME}).to_list()
+
+    try:
+        codes = [{"code_id": random.choice(content)["code_id"]} for _ in range(lookups)]
+        names = [{"name": f"item-{random.randrange(100)}"} for _ in range(lookups)]
+        for label, run in (("unwind", embedded(unwind_pipeline)),
+                           ("filter", embedded(filter_pipeline)),
+                           ("collection", normalized)):
+            report(f"{label} get_item", await measure(run, codes))
+            report(f"{label} filter", await measure(run, names))
+    finally:
+        await collection.delete_one({"username": username})
+        await db_items.delete_many({"username": username})
+        close_client()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark item lookups in a large storage.")
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.items, args.lookups))
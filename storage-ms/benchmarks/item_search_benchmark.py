@@ -0,0 +1,109 @@
+# Author: Nina Mislej
+# Date created: 14.01.2025
+
+"""
+Benchmark of searching items by name and description.
+
+Seeds a temporary user with ``--items`` items spread over ``--storages`` storages and
+measures the latency of the trigram search for exact, misspelled and partial words,
+compared with a case-insensitive regular expression scan which cannot use an index
+and does not tolerate typos. Needs the same database configuration as the service.
+Run from the `storage-ms` directory:
+
+    python -m benchmarks.item_search_benchmark --items 100000 --searches 200
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import secrets
+import statistics
+import time
+
+from app.helpers import get_collection, ensure_indexes, layout_collections, close_client, search_terms, SEARCH_FIELD
+from app.helpers.error import ErrorResponse as Err
+from app.models.item import Item
+from app.services import search_utils
+
+WORDS = ["cheese", "milk", "butter", "yogurt", "apple", "banana", "carrot", "potato", "onion", "garlic",
+         "pepper", "tomato", "rice", "pasta", "flour", "sugar", "coffee", "tea", "juice", "water",
+         "screw", "bolt", "nail", "hammer", "drill", "cable", "battery", "bulb", "tape", "glue"]
+ADJECTIVES = ["red", "green", "large", "small", "fresh", "frozen", "organic", "spare", "old", "new"]
+
+def misspell(word: str) -> str:
+    """
+    Swap two neighbouring letters of a word.
+    """
+
+    index = random.randrange(len(word) - 1)
+    return word[:index] + word[index + 1] + word[index] + word[index + 2:]
+
+async def measure(run, queries: list) -> list[float]:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        await run(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def report(label: str, latencies: list[float]):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:>22}: p50 {statistics.median(latencies):8.2f} ms  p95 {p95:8.2f} ms")
+
+async def main(items: int, storages: int, searches: int):
+    collection = await get_collection()
+    if collection is None:
+        raise SystemExit("Cannot get DB collection.")
+    await ensure_indexes()
+    _, db_items = layout_collections(collection)
+
+    username = f"benchmark-{secrets.token_hex(8)}"
+    start = time.perf_counter()
+    documents = []
+    for index in range(items):
+        item = Item(name=f"{random.choice(ADJECTIVES)} {random.choice(WORDS)} {index}",
+                    description=" ".join(random.choices(WORDS + ADJECTIVES, k=8)))
+        documents.append({**item.model_dump(by_alias=True), "username": username,
+                          "storage_name": f"storage-{index % storages}",
+                          SEARCH_FIELD: search_terms(item.name, item.description)})
+    print(f"Built search terms of {items} items in {time.perf_counter() - start:.2f} s.")
+    for offset in range(0, items, 10000):
+        await db_items.insert_many(documents[offset:offset + 10000], ordered=False)
+
+    def search(storage_name: str | None):
+        return lambda text: search_utils.search_items(username, text, storage_name)
+
+    def scan(text: str):
+        pattern = {"$regex": re.escape(text), "$options": "i"}
+        return db_items.find({"username": username, "$or": [{"name": pattern}, {"description": pattern}]},
+                             {"_id": 0, SEARCH_FIELD: 0}).limit(20).to_list()
+
+    try:
+        exact = [random.choice(WORDS) for _ in range(searches)]
+        typos = [misspell(random.choice(WORDS)) for _ in range(searches)]
+        partial = [random.choice(WORDS)[:4] for _ in range(searches)]
+        phrases = [f"{random.choice(ADJECTIVES)} {misspell(random.choice(WORDS))}" for _ in range(searches)]
+
+        for label, queries in (("exact", exact), ("typo", typos), ("partial", partial), ("phrase", phrases)):
+            report(f"{label} search", await measure(search(None), queries))
+            report(f"{label} storage search", await measure(search("storage-0"), queries))
+            report(f"{label} regex scan", await measure(scan, queries))
+
+        found = 0
+        for text in typos:
+            result = await search_utils.search_items(username, text)
+            found += bool(result) and not isinstance(result, Err)
+        print(f"Misspelled words found: {found}/{searches}")
+    finally:
+        await db_items.delete_many({"username": username})
+        close_client()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark searching items by name and description.")
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--storages", type=int, default=10)
+    parser.add_argument("--searches", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.items, args.storages, args.searches))
@@ -0,0 +1,54 @@
+# Author: Nina Mislej
+# Date created: 13.01.2025
+
+"""
+Migration of users from the embedded layout, where every user document holds all storages
+and items, to the normalized layout with separate storages and items collections.
+
+Images embedded in items are moved to the image store and items get search terms on the way. The migration runs online: the service keeps serving requests and migrates every user it
+touches on first access, while this tool migrates the remaining users in the background.
+It can be interrupted and started again. Needs the same database configuration as the
+service. Run from the `storage-ms` directory:
+
+    python -m migrations.split_items --concurrency 8
+"""
+
+import argparse
+import asyncio
+
+from app.helpers import get_collection, ensure_indexes, close_client
+from app.helpers.error import ErrorResponse as Err
+from app.services.migration_utils import migrate_all, extract_images
+from app.services.search_utils import index_items
+
+async def main(concurrency: int):
+    db_users = await get_collection()
+    if db_users is None:
+        raise SystemExit("Cannot get DB collection.")
+
+    try:
+        if not await ensure_indexes():
+            raise SystemExit("Indexes could not be created, not migrating.")
+
+        result = await migrate_all(db_users, concurrency=concurrency)
+        if isinstance(result, Err):
+            raise SystemExit(result.message)
+        print(f"Migrated {result} users.")
+
+        result = await extract_images(db_users)
+        if isinstance(result, Err):
+            raise SystemExit(result.message)
+        print(f"Moved {result} item images to the image store.")
+
+        result = await index_items(db_users)
+        if isinstance(result, Err):
+            raise SystemExit(result.message)
+        print(f"Added search terms to {result} items.")
+    finally:
+        close_client()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move storages and items into their own collections.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency))
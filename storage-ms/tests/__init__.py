@@ -10,17 +10,27 @@ from .test_users import (
     test_get_user,
     test_delete_user,
     test_delete_user_storages,
-    test_update_user_name)
+    test_update_user_name,
+    test_create_delete_users)
 
 from .test_storage import (
     test_get_storage,
     test_delete_storage,
     test_create_storage,
     test_delete_storage_items,
-    test_update_storage_name)
+    test_update_storage_name,
+    test_migrate_storage,
+    test_stream_storage)
 
 from .test_item import (
     test_get_item,
     test_delete_item,
     test_create_item,
-    test_update_item)
\ No newline at end of file
+    test_update_item,
+    test_get_item_image,
+    test_create_items,
+    test_import_export_items,
+    test_list_items,
+    test_filter_items_composed,
+    test_search_items,
+    test_release_images)
\ No newline at end of file
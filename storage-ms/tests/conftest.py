@@ -16,6 +16,7 @@ from app.api import users_api
 from app.api import storage_api
 from app.api import item_api
 from app.graphql import resolvers
+from app.helpers import layout_collections
 from .helpers import get_collection
 
 app = FastAPI(title="Storage Managment Microservice - Test")
@@ -79,5 +80,8 @@ async def cleanup():
         print(f" Database cleanup unsuccessful.")
         return
 
+    for collection in layout_collections(db_users):
+        await collection.delete_many({"username": {"$in": usernames}})
+
     print(f" Database cleanup successful.")
     return
@@ -4,6 +4,7 @@
 from app.helpers import get_collection as gc
 from pathlib import Path
 import secrets
+import base64
 
 USERNAME = str(secrets.token_hex(32))
 DISPLAYNAME = str(secrets.token_hex(32))
@@ -29,10 +30,10 @@ def generate_item_code():
     that is routed to another microservice.
 
     Returns:
-        str: 'This is a test code id.' string used for testing.
+        str: A Base64 encoded test image.
     """
 
-    return "This is a test code id."
+    return base64.b64encode(b"\x89PNG\r\n\x1a\nThis is a test code id.").decode()
 
 def get_filter_vars(username, storage_name, name, amount):
     return {
@@ -3,10 +3,15 @@
 
 # Enable async testing.
 import pytest
-from unittest.mock import AsyncMock, patch
+import json
+import base64
+import hashlib
+from unittest.mock import AsyncMock, MagicMock, patch
+from pymongo.errors import BulkWriteError
 
 # Internal app dependencies.
-from app.services import storage_utils, user_utils, item_utils
+from app.services import storage_utils, user_utils, item_utils, transfer_utils, image_utils
+from app.config import IMAGES_BUCKET
 from app.schemas import storage_schemas, user_schemas, item_schemas
 from app.helpers import ErrorResponse as Err
 from app.helpers import get_collection as gc
@@ -191,3 +196,366 @@ async def test_filter_item(client, cleanup):
                                  headers={"Authorization": f"Bearer {token}"},
                                  json={"query": query, "variables": variables})
     assert response.status_code == 200
+
+@pytest.mark.anyio
+@patch("app.services.user_utils.get_collection", get_collection)
+@patch("app.services.storage_utils.get_collection", get_collection)
+@patch("app.services.item_utils.get_collection", get_collection)
+@patch("app.services.item_utils.create_code", AsyncMock(return_value=generate_item_code()))
+async def test_get_item_image(client, cleanup):
+    """
+    Test retrieving the code image of an item.
+
+    Asserts:
+        - The image API responds with a 200 status code and the image bytes.
+        - The image is stored once for items with the same image.
+        - The image API responds with a 304 status code if the client has the image.
+    """
+
+    # Test successful request.
+    username = await user_utils.create_user(user_schemas.UserCreate(username=USERNAME))
+    assert not isinstance(username, Err)
+    cleanup.append(username)
+
+    token = await create_access_token({"username": USERNAME})
+    storage_name = await storage_utils.create_storage(username, storage_schemas.StorageCreate(name="Fridge"))
+    assert not isinstance(storage_name, Err)
+    item = item_schemas.ItemCreate(name="Cheese", amount=2, description="Cheddar.")
+    item_code = await item_utils.create_item(username, storage_name, item)
+    assert not isinstance(item_code, Err)
+    other_code = await item_utils.create_item(username, storage_name, item)
+    assert not isinstance(other_code, Err)
+
+    first = await item_utils.get_item(username, storage_name, item_code)
+    second = await item_utils.get_item(username, storage_name, other_code)
+    assert first["image_id"] == second["image_id"]
+
+    response = await client.get(url=f"/users/{username}/{storage_name}/{item_code}/image",
+                                headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert response.content == base64.b64decode(generate_item_code())
+
+    response = await client.get(url=f"/users/{username}/{storage_name}/{item_code}/image",
+                                headers={"Authorization": f"Bearer {token}",
+                                         "If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+
+@pytest.mark.anyio
+@patch("app.services.user_utils.get_collection", get_collection)
+@patch("app.services.storage_utils.get_collection", get_collection)
+@patch("app.services.item_utils.get_collection", get_collection)
+@patch("app.services.item_utils.create_codes",
+       AsyncMock(side_effect=lambda item_codes: {item_code: generate_item_code() for item_code in item_codes}))
+async def test_create_items(client, cleanup):
+    """
+    Test creating many items in a user's storage at once.
+
+    Asserts:
+        - The items creation API responds with a 200 status code and a code for every item.
+        - The created items can be retrieved.
+        - Stored images are released if the items cannot be created.
+    """
+
+    # Test successful request.
+    username = await user_utils.create_user(user_schemas.UserCreate(username=USERNAME))
+    assert not isinstance(username, Err)
+    cleanup.append(username)
+
+    token = await create_access_token({"username": USERNAME})
+    storage_name = await storage_utils.create_storage(username, storage_schemas.StorageCreate(name="Fridge"))
+    assert not isinstance(storage_name, Err)
+    items = [item_schemas.ItemCreate(name=f"Cheese {i}", amount=i + 1).model_dump() for i in range(5)]
+    response = await client.post(url=f"/users/{username}/{storage_name}/create-items",
+                                 headers={"Authorization": f"Bearer {token}"},
+                                 json=items)
+    assert response.status_code == 200
+    item_codes = response.json()
+    assert len(item_codes) == 5
+
+    item = await item_utils.get_item(username, storage_name, item_codes[4])
+    assert item["name"] == "Cheese 4"
+    assert item["amount"] == 5
+
+    # Images already stored are released if another image cannot be stored.
+    images = AsyncMock(side_effect=lambda item_codes: {item_code: base64.b64encode(item_code.encode()).decode()
+                                                       for item_code in item_codes})
+    store = AsyncMock(side_effect=["stored", Err(message="Could not store image.", code=500)])
+    with patch("app.services.item_utils.create_codes", images), \
+         patch("app.services.item_utils.store_image", store), \
+         patch("app.services.item_utils.release_images", AsyncMock()) as release:
+        result = await item_utils.create_items(username, storage_name, [
+            item_schemas.ItemCreate(name="Milk", amount=1), item_schemas.ItemCreate(name="Eggs", amount=1)])
+    assert isinstance(result, Err)
+    assert release.await_args.args[1] == ["stored"]
+
+@pytest.mark.anyio
+@patch("app.services.user_utils.get_collection", get_collection)
+@patch("app.services.storage_utils.get_collection", get_collection)
+@patch("app.services.transfer_utils.get_collection", get_collection)
+@patch("app.services.transfer_utils.create_codes",
+       AsyncMock(side_effect=lambda item_codes: {item_code: generate_item_code() for item_code in item_codes}))
+async def test_import_export_items(client, cleanup):
+    """
+    Test importing items from CSV and exporting them as NDJSON.
+
+    Asserts:
+        - The import API responds with a 200 status code, creates valid rows and reports invalid rows.
+        - The export API responds with a 200 status code and streams every item.
+        - The import API responds with a 413 status code for a body over the size limit.
+        - Images of rows that fail to insert are released.
+    """
+
+    # Test successful request.
+    username = await user_utils.create_user(user_schemas.UserCreate(username=USERNAME))
+    assert not isinstance(username, Err)
+    cleanup.append(username)
+
+    token = await create_access_token({"username": USERNAME})
+    storage_name = await storage_utils.create_storage(username, storage_schemas.StorageCreate(name="Fridge"))
+    assert not isinstance(storage_name, Err)
+    content = "name,amount,description\nCheese,2,Cheddar.\nMilk,,\nEggs,many,\n"
+    response = await client.post(url=f"/users/{username}/{storage_name}/import-items",
+                                 headers={"Authorization": f"Bearer {token}", "Content-Type": "text/csv"},
+                                 content=content)
+    assert response.status_code == 200
+    result = response.json()
+    assert len(result["created"]) == 2
+    assert [error["row"] for error in result["errors"]] == [3]
+
+    response = await client.get(url=f"/users/{username}/{storage_name}/export-items?format=ndjson",
+                                headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    items = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(item["code_id"] for item in items) == sorted(result["created"])
+
+    # Test unsuccessful request with a body over the size limit.
+    with patch("app.services.transfer_utils.IMPORT_MAX_BYTES", 16):
+        response = await client.post(url=f"/users/{username}/{storage_name}/import-items",
+                                     headers={"Authorization": f"Bearer {token}", "Content-Type": "text/csv"},
+                                     content=content)
+    assert response.status_code == 413
+
+    # Images of rows that are not inserted are released.
+    image = b"\x89PNG\r\n\x1a\nThis image is not imported."
+    db_users = await get_collection()
+    result = item_schemas.ItemImportResult()
+    failing = MagicMock(insert_many=AsyncMock(side_effect=BulkWriteError(
+        {"writeErrors": [{"index": 0, "errmsg": "Duplicate key."}]})))
+    with patch("app.services.transfer_utils.create_codes",
+               AsyncMock(side_effect=lambda item_codes: {item_code: base64.b64encode(image).decode()
+                                                         for item_code in item_codes})), \
+         patch("app.services.transfer_utils.layout_collections", return_value=(None, failing)), \
+         patch("app.services.transfer_utils.release_images", AsyncMock()) as release:
+        created = await transfer_utils.import_batch(
+            db_users, username, storage_name, [(1, transfer_utils.validate_row({"name": "Cheese"}))], result)
+    assert created == {}
+    assert [error.row for error in result.errors] == [1]
+    release.assert_awaited_once_with(db_users, [hashlib.sha256(image).hexdigest()], stored=True)
+
+@pytest.mark.anyio
+@patch("app.services.user_utils.get_collection", get_collection)
+@patch("app.services.storage_utils.get_collection", get_collection)
+@patch("app.services.item_utils.get_collection", get_collection)
+@patch("app.services.item_utils.create_code", AsyncMock(return_value=generate_item_code()))
+async def test_list_items(client, cleanup):
+    """
+    Test paging through the items of a storage.
+
+    Asserts:
+        - The list API responds with a 200 status code for every page.
+        - Every item is listed once and in the requested order.
+        - The GraphQL page is only returned with a token of the user.
+    """
+
+    # Test successful request.
+    username = await user_utils.create_user(user_schemas.UserCreate(username=USERNAME))
+    assert not isinstance(username, Err)
+    cleanup.append(username)
+
+    token = await create_access_token({"username": USERNAME})
+    storage_name = await storage_utils.create_storage(username, storage_schemas.StorageCreate(name="Fridge"))
+    assert not isinstance(storage_name, Err)
+    for amount in (3, 1, 2, 1, 3):
+        item_code = await item_utils.create_item(username, storage_name, item_schemas.ItemCreate(name="Cheese", amount=amount))
+        assert not isinstance(item_code, Err)
+
+    listed, cursor = [], None
+    while True:
+        params = {"sort": "amount", "order": "desc", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = await client.get(url=f"/users/{username}/{storage_name}/list-items",
+                                    headers={"Authorization": f"Bearer {token}"}, params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert page["total"] == 5
+        listed += page["items"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert [item["amount"] for item in listed] == [3, 3, 2, 1, 1]
+    assert len({item["code_id"] for item in listed}) == 5
+
+    # The GraphQL page requires a token of the user.
+    page = {"query": "query Page($username: String!, $storage_name: String!) "
+                     "{ item_page(username: $username, storage_name: $storage_name) { items { code_id } } }",
+            "variables": {"username": username, "storage_name": storage_name}}
+    response = await client.post(url=f"/users/", json=page)
+    assert response.json()["errors"][0]["message"] == "Token username missmatch."
+    response = await client.post(url=f"/users/", headers={"Authorization": f"Bearer {token}"}, json=page)
+    assert len(response.json()["data"]["item_page"]["items"]) == 5
+
+@pytest.mark.anyio
+@patch("app.services.user_utils.get_collection", get_collection)
+@patch("app.services.storage_utils.get_collection", get_collection)
+@patch("app.services.item_utils.get_collection", get_collection)
+@patch("app.services.item_utils.create_code", AsyncMock(return_value=generate_item_code()))
+async def test_filter_items_composed(client, cleanup):
+    """
+    Test filtering items with ranges, prefixes, lists and composed filters.
+
+    Asserts:
+        - The GraphQL API responds with a 200 status code.
+        - Only the matching items are returned with only the selected fields.
+        - The GraphQL items are only returned with a token of the user.
+    """
+
+    # Test successful request.
+    username = await user_utils.create_user(user_schemas.UserCreate(username=USERNAME))
+    assert not isinstance(username, Err)
+    cleanup.append(username)
+
+    token = await create_access_token({"username": USERNAME})
+    storage_name = await storage_utils.create_storage(username, storage_schemas.StorageCreate(name="Fridge"))
+    assert not isinstance(storage_name, Err)
+    for name, amount in (("Cheese", 1), ("cheddar", 4), ("Milk", 2), ("Chives", 8)):
+        item_code = await item_utils.create_item(username, storage_name, item_schemas.ItemCreate(name=name, amount=amount))
+        assert not isinstance(item_code, Err)
+
+    with open(QUERY_PATH, "r") as file:
+        query = file.read()
+
+    filtering = {
+        "name_prefix": "ch",
+        "name_insensitive": True,
+        "or": [{"amount_gte": 2, "amount_lt": 8}, {"name_in": ["Cheese", "Milk"]}],
+        "not": {"name": "Chives"}}
+    response = await client.post(url=f"/users/",
+                                 headers={"Authorization": f"Bearer {token}"},
+                                 json={"query": query, "variables": {
+                                     "username": username, "storage_name": storage_name, "filtering": filtering}})
+    assert response.status_code == 200
+    listed = response.json()["data"]["items"]
+    assert sorted(item["amount"] for item in listed) == [1, 4]
+
+    # The GraphQL items require a token of the user.
+    response = await client.post(url=f"/users/",
+                                 json={"query": query, "variables": {
+                                     "username": username, "storage_name": storage_name, "filtering": filtering}})
+    assert response.json()["errors"][0]["message"] == "Token username missmatch."
+
+    # Fields that are not selected are not fetched.
+    result = await item_utils.filter_items(username, storage_name, item_schemas.ItemFilter(amount_gt=2), ["name"])
+    assert not isinstance(result, Err)
+    assert sorted(item["name"] for item in result) == ["Chives", "cheddar"]
+    assert all(set(item) == {"code_id", "name"} for item in result)
+
+    # Sorting and limits are applied, without a limit all matching items are returned.
+    result = await item_utils.filter_items(username, storage_name, item_schemas.ItemFilter(amount_gt=0),
+                                           ["amount"], order="desc")
+    assert not isinstance(result, Err)
+    assert [item["amount"] for item in result] == [8, 2, 4, 1]
+    result = await item_utils.filter_items(username, storage_name, item_schemas.ItemFilter(amount_gt=0),
+                                           ["amount"], sort="amount", order="desc", limit=2)
+    assert not isinstance(result, Err)
+    assert [item["amount"] for item in result] == [8, 4]
+    result = await item_utils.filter_items(username, storage_name, item_schemas.ItemFilter(amount_gt=0), limit=0)
+    assert isinstance(result, Err)
+
+@pytest.mark.anyio
+@patch("app.services.user_utils.get_collection", get_collection)
+@patch("app.services.storage_utils.get_collection", get_collection)
+@patch("app.services.item_utils.get_collection", get_collection)
+@patch("app.services.search_utils.get_collection", get_collection)
+@patch("app.services.item_utils.create_code", AsyncMock(return_value=generate_item_code()))
+async def test_search_items(client, cleanup):
+    """
+    Test searching items across storages with misspelled words.
+
+    Asserts:
+        - The search API responds with a 200 status code.
+        - Matching names rank above matching descriptions, unrelated items are left out.
+        - Renamed items are found by their new name.
+        - The GraphQL search only responds to a token of the user.
+        - Storages named after the search endpoint are rejected.
+    """
+
+    # Test successful request.
+    username = await user_utils.create_user(user_schemas.UserCreate(username=USERNAME))
+    assert not isinstance(username, Err)
+    cleanup.append(username)
+
+    token = await create_access_token({"username": USERNAME})
+    for storage in ("Fridge", "Pantry"):
+        storage_name = await storage_utils.create_storage(username, storage_schemas.StorageCreate(name=storage))
+        assert not isinstance(storage_name, Err)
+    cheese = await item_utils.create_item(username, "Fridge", item_schemas.ItemCreate(name="Cheddar cheese", amount=1))
+    crackers = await item_utils.create_item(username, "Pantry", item_schemas.ItemCreate(name="Crackers", amount=1, description="Go well with cheese."))
+    milk = await item_utils.create_item(username, "Fridge", item_schemas.ItemCreate(name="Milk", amount=1))
+    assert not any(isinstance(code, Err) for code in (cheese, crackers, milk))
+
+    response = await client.get(url=f"/users/{username}/search-items",
+                                headers={"Authorization": f"Bearer {token}"}, params={"text": "chese"})
+    assert response.status_code == 200
+    found = response.json()
+    assert [item["code_id"] for item in found] == [cheese, crackers]
+    assert [item["storage_name"] for item in found] == ["Fridge", "Pantry"]
+    assert found[0]["score"] > found[1]["score"]
+
+    result = await item_utils.update_item(username, "Fridge", milk, item_schemas.ItemUpdate(name="Oat milk"))
+    assert not isinstance(result, Err)
+    response = await client.get(url=f"/users/{username}/search-items",
+                                headers={"Authorization": f"Bearer {token}"},
+                                params={"text": "oat", "storage_name": "Fridge"})
+    assert response.status_code == 200
+    assert [item["code_id"] for item in response.json()] == [milk]
+
+    # The GraphQL search requires a token of the user.
+    search = {"query": "query Search($username: String!, $text: String!) "
+                       "{ search_items(username: $username, text: $text) { code_id } }",
+              "variables": {"username": username, "text": "chese"}}
+    response = await client.post(url=f"/users/", json=search)
+    assert response.json()["data"] is None
+    response = await client.post(url=f"/users/", headers={"Authorization": f"Bearer {token}"}, json=search)
+    assert [item["code_id"] for item in response.json()["data"]["search_items"]] == [cheese, crackers]
+
+    # Storages cannot be named after the search endpoint.
+    result = await storage_utils.create_storage(username, storage_schemas.StorageCreate(name="search-items"))
+    assert isinstance(result, Err)
+    result = await storage_utils.update_storage_name(username, "Pantry", "search-items")
+    assert isinstance(result, Err)
+
+@pytest.mark.anyio
+async def test_release_images():
+    """
+    Test that images are not deleted while they are held.
+
+    Asserts:
+        - Storing an existing image takes a hold on it.
+        - A held image is not deleted when it is released by someone else.
+        - The image is deleted once it is neither held nor referenced.
+    """
+
+    db_users = await get_collection()
+    files = db_users.database[f"{IMAGES_BUCKET}.files"]
+    image = b"\x89PNG\r\n\x1a\nThis image is held."
+    image_id = hashlib.sha256(image).hexdigest()
+    await files.insert_one({"_id": image_id, "metadata": {"content_type": "image/png", "holds": 0}})
+
+    assert await image_utils.store_image(db_users, base64.b64encode(image).decode()) == image_id
+    await image_utils.release_images(db_users, [image_id])
+    stored = await files.find_one({"_id": image_id})
+    assert stored["metadata"]["holds"] == 1
+
+    await image_utils.release_images(db_users, [image_id], stored=True)
+    assert await files.count_documents({"_id": image_id}) == 0
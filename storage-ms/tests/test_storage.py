@@ -3,14 +3,16 @@
 
 # Enable async testing.
 import pytest
+import json
 from unittest.mock import AsyncMock, patch
 
 # Internal app dependencies.
-from app.services import storage_utils, user_utils
-from app.schemas import storage_schemas, user_schemas
+from app.services import storage_utils, user_utils, item_utils, migration_utils
+from app.models.item import Item
+from app.schemas import storage_schemas, user_schemas, item_schemas
 from app.helpers import ErrorResponse as Err
 from app.helpers import get_collection as gc
-from .helpers import get_collection, USERNAME
+from .helpers import get_collection, generate_item_code, USERNAME
 
 from skladischer_auth.token_utils import create_access_token
 
@@ -147,4 +149,72 @@ async def test_delete_storage_items(client, cleanup):
     assert not isinstance(storage_name, Err)
     response = await client.put(url=f"/users/{username}/Fridge/empty-storage",
                                 headers={"Authorization": f"Bearer {token}"})
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+
+@pytest.mark.anyio
+@patch("app.services.user_utils.get_collection", get_collection)
+@patch("app.services.storage_utils.get_collection", get_collection)
+async def test_migrate_storage(cleanup):
+    """
+    Test that a user stored in the embedded layout is migrated on first access.
+
+    Asserts:
+        - The storage and its items can be read after the migration.
+        - The embedded storages are removed from the user document.
+    """
+
+    db_users = await get_collection()
+    item = Item(name="Kladivo").model_dump(by_alias=True)
+    await db_users.insert_one({"username": USERNAME,
+                               "display_name": None,
+                               "storages": [{"name": "Garaza", "content": [item]}]})
+    cleanup.append(USERNAME)
+    migration_utils.forget_migrated(USERNAME)
+
+    storage = await storage_utils.get_storage(USERNAME, "Garaza")
+    assert not isinstance(storage, Err)
+    assert [content["code_id"] for content in storage["content"]] == [item["code_id"]]
+
+    user = await db_users.find_one({"username": USERNAME})
+    assert "storages" not in user
+
+@pytest.mark.anyio
+@patch("app.services.user_utils.get_collection", get_collection)
+@patch("app.services.storage_utils.get_collection", get_collection)
+@patch("app.services.item_utils.get_collection", get_collection)
+@patch("app.services.transfer_utils.get_collection", get_collection)
+@patch("app.services.item_utils.create_code", AsyncMock(return_value=generate_item_code()))
+async def test_stream_storage(client, cleanup):
+    """
+    Test streaming a storage as JSON and NDJSON.
+
+    Asserts:
+        - The storage API responds with a 200 status code and the same storage as without streaming.
+        - Streamed items only include the selected fields.
+    """
+
+    # Test successful request.
+    username = await user_utils.create_user(user_schemas.UserCreate(username=USERNAME))
+    assert not isinstance(username, Err)
+    cleanup.append(username)
+
+    token = await create_access_token({"username": USERNAME})
+    storage_name = await storage_utils.create_storage(username, storage_schemas.StorageCreate(name="Fridge"))
+    assert not isinstance(storage_name, Err)
+    for name in ("Milk", "Cheese"):
+        item_code = await item_utils.create_item(username, storage_name, item_schemas.ItemCreate(name=name, amount=1))
+        assert not isinstance(item_code, Err)
+
+    response = await client.get(url=f"/users/{username}/{storage_name}",
+                                headers={"Authorization": f"Bearer {token}"})
+    streamed = await client.get(url=f"/users/{username}/{storage_name}?format=json",
+                                headers={"Authorization": f"Bearer {token}"})
+    assert streamed.status_code == 200
+    assert sorted(item["code_id"] for item in streamed.json()["content"]) == \
+           sorted(item["code_id"] for item in response.json()["content"])
+
+    streamed = await client.get(url=f"/users/{username}/{storage_name}?format=ndjson&fields=name,amount",
+                                headers={"Authorization": f"Bearer {token}"})
+    assert streamed.status_code == 200
+    items = [json.loads(line) for line in streamed.text.splitlines()]
+    assert items == [{"name": "Cheese", "amount": 1}, {"name": "Milk", "amount": 1}]